@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+from app.astrocast.models import AstrocastCacheStats
+import asyncio
+import time
+
+
+class TTLCache:
+    def __init__(
+        self,
+        ttl_seconds: float,
+        stale_seconds: float = 0,
+        max_size: int = 128,
+    ) -> None:
+        """In-process cache of upstream results with stale-while-revalidate
+
+        ttl_seconds : float
+            How long an entry is served without contacting upstream
+        stale_seconds : float
+            How long after expiry an entry is still served while it is
+            refreshed in the background
+        max_size : int
+            The number of entries to keep, least recently used are evicted
+        """
+
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_size = max_size
+
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.inflight: dict[Hashable, asyncio.Task] = {}
+
+        self.hits: int = 0
+        self.stale_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Get a value from the cache, loading it from upstream if needed
+
+        Concurrent misses for the same key share a single call to loader.
+        """
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl_seconds:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return value
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                self.entries.move_to_end(key)
+                self.refresh(key, loader)
+                return value
+
+        self.misses += 1
+
+        # Shield so a cancelled request does not cancel the shared load
+        return await asyncio.shield(self.refresh(key, loader))
+
+    def refresh(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> asyncio.Task:
+        """Start loading a key from upstream unless a load is in flight"""
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            task.add_done_callback(self._log_failure)
+            self.inflight[key] = task
+
+        return task
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+    ) -> None:
+        """Store a value, evicting the least recently used if full"""
+
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(
+        self,
+        key: Hashable | None = None,
+    ) -> None:
+        """Remove a key from the cache, or every key if none is given"""
+
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    @property
+    def stats(
+        self,
+    ) -> AstrocastCacheStats:
+        """Get the hit, miss and size counters of the cache"""
+
+        return AstrocastCacheStats(
+            hits=self.hits,
+            stale_hits=self.stale_hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self.entries),
+            max_size=self.max_size,
+            ttl_seconds=self.ttl_seconds,
+        )
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error refreshing Astrocast cache: {task.exception()}")
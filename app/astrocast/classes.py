@@ -1,18 +1,29 @@
 import aiohttp
 from app.config import config
 from app.astrocast.models import (
-    AstrocastMessageCreate,
-    AstrocastMessage,
+    AstrocastIngestResult,
+    AstrocastBackfillCreate,
+    AstrocastBackfillRead,
+    AstrocastStatus,
     AstrocastDeviceSummary,
-    AstrocastDevice,
+    AstrocastDeviceRead,
 )
 import tenacity
 from tenacity import AsyncRetrying, retry_if_result
-from sqlmodel import select
 import asyncio
 import datetime
-import sqlalchemy
 from app.db import async_session
+from app.astrocast.utils import (
+    insert_messages,
+    get_checkpoint,
+    advance_checkpoint,
+    backfill_checkpoint_name,
+    split_date_range,
+    upsert_devices,
+)
+from app.astrocast.cache import TTLCache
+from app.astrocast.leader import LeaderElection
+from app.astrocast.scheduler import PollingScheduler
 from uuid import UUID
 from functools import lru_cache
 
@@ -26,13 +37,62 @@ class AstrocastAPI:
         self.api_token: str = api_token
         self.api_url: str = api_url
         self.poll_messages: bool = True
+        self.is_collecting: bool = False  # Only in the leader process
         self.last_polling_time: datetime.datetime | None = None
         self.device_types = {}
+        self.client: aiohttp.ClientSession | None = None
+        self.backfill_task: asyncio.Task | None = None
+        self.backfill_lock = LeaderElection(  # One backfill across workers
+            lock_id=config.ASTROCAST_BACKFILL_LOCK_ID,
+            lock_file=config.ASTROCAST_BACKFILL_LOCK_FILE,
+        )
+        self.last_received_date: datetime.datetime | None = None
+        self.scheduler = PollingScheduler(
+            interval_seconds=config.ASTROCAST_POLLING_INTERVAL_SECONDS,
+            min_interval_seconds=config.ASTROCAST_POLLING_MIN_INTERVAL_SECONDS,
+            max_interval_seconds=config.ASTROCAST_POLLING_MAX_INTERVAL_SECONDS,
+            backoff_factor=config.ASTROCAST_POLLING_BACKOFF_FACTOR,
+        )
+        self.device_cache = TTLCache(
+            ttl_seconds=config.ASTROCAST_DEVICE_CACHE_TTL_SECONDS,
+            stale_seconds=config.ASTROCAST_DEVICE_CACHE_STALE_SECONDS,
+            max_size=config.ASTROCAST_DEVICE_CACHE_MAX_SIZE,
+        )
+
+    async def get_client(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP client, creating it on first use
+
+        A single client session is kept for the lifetime of the application so
+        that connections (and their TLS handshakes) to the Astrocast API are
+        pooled and reused between polls and requests.
+        """
+        if self.client is None or self.client.closed:
+            self.client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=config.ASTROCAST_CONNECTION_POOL_SIZE,
+                    keepalive_timeout=config.ASTROCAST_KEEPALIVE_SECONDS,
+                    ttl_dns_cache=config.ASTROCAST_DNS_CACHE_TTL_SECONDS,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=config.ASTROCAST_REQUEST_TIMEOUT_SECONDS
+                ),
+                headers={"X-Api-Key": str(self.api_token)},
+            )
+
+        return self.client
+
+    async def close(self) -> None:
+        """Stop polling and close the shared HTTP client"""
+        self.poll_messages = False
+
+        if self.client is not None and not self.client.closed:
+            await self.client.close()
+        self.client = None
 
     async def get_messages(
         self,
         only_new_messages: bool = True,
-    ):
+    ) -> int:
         """Get the latest messages from the Astrocast API
 
         Parameters
@@ -41,6 +101,11 @@ class AstrocastAPI:
             Only get messages that have not been previously retrieved,
             by default True. This uses the `get_time_of_last_saved_message()`
             to determine the last time a message was retrieved from the API.
+
+        Returns
+        -------
+        int
+            The number of new messages added to the database
         """
         async for attempt in AsyncRetrying(
             wait=tenacity.wait_random(
@@ -54,42 +119,226 @@ class AstrocastAPI:
                 # Set the last polling time in the state of the class
                 self.last_polling_time = datetime.datetime.utcnow()
 
-                print(f"Getting messages ({self.last_polling_time})...")
+                print(
+                    f"Getting messages ({self.last_polling_time}), last "
+                    f"message retrieved at: {self.last_received_date}..."
+                )
 
-                # Get the last retrieved message time that we saved locally
+                # Get the last retrieved message time that we saved locally,
+                # re-reading an overlap window to catch late arrivals
                 if only_new_messages:
                     last_db_message_time = (
                         await self.get_time_of_last_saved_message()
                     )
                     if last_db_message_time:
+                        start_date = last_db_message_time - datetime.timedelta(
+                            seconds=config.ASTROCAST_POLLING_OVERLAP_SECONDS
+                        )
                         formed_api_url = (
                             f"{self.api_url}/messages?startReceivedDate="
-                            f'{last_db_message_time.strftime("%Y-%m-%dT%H:%M:%S")}Z'
+                            f'{start_date.strftime("%Y-%m-%dT%H:%M:%S")}Z'
                         )
                     else:
                         formed_api_url = f"{self.api_url}/messages"
                 else:
                     formed_api_url = f"{self.api_url}/messages"
 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        formed_api_url,
-                        headers={"X-Api-Key": str(self.api_token)},
-                    ) as response:
-                        if response.status == 200:
-                            messages = await response.json()
-                            if len(messages) > 0:
-                                print(f"Got {len(messages)} messages.")
-
-                                # Compile message into objects
-                                for message in messages:
-                                    await self.add_message_to_db(message)
-                            else:
-                                print("There is no message.")
+                inserted = 0
+                client = await self.get_client()
+                async with client.get(
+                    formed_api_url,
+                    timeout=aiohttp.ClientTimeout(
+                        total=config.ASTROCAST_MESSAGES_TIMEOUT_SECONDS
+                    ),
+                ) as response:
+                    if response.status == 200:
+                        messages = await response.json()
+                        if len(messages) > 0:
+                            print(f"Got {len(messages)} messages.")
+                            result = await self.add_messages_to_db(messages)
+                            inserted = result.inserted
                         else:
-                            print("Error, something is wrong in the request.")
+                            print("There is no message.")
+                    else:
+                        print("Error, something is wrong in the request.")
+
+                return inserted
+
+    async def fetch_messages(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+    ) -> list[dict]:
+        """Get the messages received by Astrocast within a date range"""
+
+        params = {
+            "startReceivedDate": f'{start.strftime("%Y-%m-%dT%H:%M:%S")}Z',
+            "endReceivedDate": f'{end.strftime("%Y-%m-%dT%H:%M:%S")}Z',
+        }
+        async for attempt in AsyncRetrying(
+            wait=tenacity.wait_random(
+                min=config.ASTROCAST_RETRY_MIN_WAIT_SECONDS,
+                max=config.ASTROCAST_RETRY_MAX_WAIT_SECONDS,
+            ),
+            stop=tenacity.stop_after_attempt(
+                config.ASTROCAST_BACKFILL_MAX_ATTEMPTS
+            ),
+            reraise=True,
+        ):
+            with attempt:
+                client = await self.get_client()
+                async with client.get(
+                    f"{self.api_url}/messages",
+                    params=params,
+                    timeout=aiohttp.ClientTimeout(
+                        total=config.ASTROCAST_MESSAGES_TIMEOUT_SECONDS
+                    ),
+                ) as response:
+                    response.raise_for_status()
+                    return await response.json()
+
+    async def backfill_messages(
+        self,
+        windows: list[tuple[datetime.datetime, datetime.datetime]],
+        checkpoint: str,
+        concurrency: int = config.ASTROCAST_BACKFILL_CONCURRENCY,
+    ) -> AstrocastIngestResult:
+        """Fetch and ingest historical messages window by window
+
+        Windows are fetched concurrently, bounded by a semaphore, and each is
+        inserted through the batched ingest path as soon as it arrives. The
+        checkpoint is advanced to the end of the contiguous run of completed
+        windows, so an interrupted backfill resumes after it.
+        """
+
+        semaphore = asyncio.Semaphore(concurrency)
+        total = AstrocastIngestResult()
+        completed = set()
+        done = 0  # Number of contiguous windows completed from the start
+
+        async def backfill_window(index: int) -> None:
+            nonlocal done
+            start, end = windows[index]
+            async with semaphore:
+                messages = await self.fetch_messages(start, end)
+                async with async_session() as db_session:
+                    result = await insert_messages(
+                        db_session,
+                        messages,
+                        requested_at=datetime.datetime.utcnow(),
+                        checkpoint=None,  # Leave the polling watermark alone
+                    )
+                    await db_session.commit()
+
+                    completed.add(index)
+                    previously_done = done
+                    while done in completed:
+                        done += 1
+                    if done > previously_done:
+                        await advance_checkpoint(
+                            db_session, windows[done - 1][1], name=checkpoint
+                        )
+                        await db_session.commit()
 
-                return
+            total.inserted += result.inserted
+            total.skipped += result.skipped
+            print(
+                f"Backfilled {start} to {end}: {result.inserted} messages "
+                f"added, {result.skipped} skipped"
+            )
+
+        results = await asyncio.gather(
+            *[backfill_window(i) for i in range(len(windows))],
+            return_exceptions=True,
+        )
+        failures = [x for x in results if isinstance(x, Exception)]
+        if failures:
+            print(
+                f"Backfill {checkpoint} stopped with {len(failures)} failed "
+                f"windows, resume to retry: {failures[0]}"
+            )
+
+        return total
+
+    async def start_backfill(
+        self,
+        backfill: AstrocastBackfillCreate,
+    ) -> AstrocastBackfillRead | None:
+        """Start a backfill in the background, resuming from its checkpoint
+
+        A single backfill runs across all workers, it holds a dedicated lock
+        (a Postgres advisory lock, as for the leader election) until it ends.
+
+        Returns
+        -------
+        AstrocastBackfillRead | None
+            The started backfill, or None if one is already running
+
+        Raises
+        ------
+        ValueError
+            If the end of the date range is not after its start
+        """
+
+        end = backfill.endReceivedDate or datetime.datetime.utcnow()
+        if end <= backfill.startReceivedDate:
+            raise ValueError(
+                "The endReceivedDate must be after the startReceivedDate"
+            )
+
+        if self.is_backfilling or not await self.backfill_lock.acquire():
+            return None
+
+        try:
+            checkpoint = backfill_checkpoint_name(backfill.startReceivedDate)
+            async with async_session() as db_session:
+                done_until = await get_checkpoint(
+                    db_session, checkpoint, warm_start=False
+                )
+            start = backfill.startReceivedDate
+            if done_until is not None and done_until > start:
+                start = done_until
+
+            windows = split_date_range(
+                start, end, datetime.timedelta(hours=backfill.window_hours)
+            )
+            self.backfill_task = asyncio.create_task(
+                self.run_backfill(
+                    windows,
+                    checkpoint=checkpoint,
+                    concurrency=backfill.concurrency,
+                )
+            )
+        except Exception:
+            await self.backfill_lock.release()
+            raise
+
+        return AstrocastBackfillRead(
+            checkpoint=checkpoint,
+            resumed_from=start,
+            endReceivedDate=end,
+            windows=len(windows),
+        )
+
+    async def run_backfill(
+        self,
+        windows: list[tuple[datetime.datetime, datetime.datetime]],
+        checkpoint: str,
+        concurrency: int = config.ASTROCAST_BACKFILL_CONCURRENCY,
+    ) -> AstrocastIngestResult:
+        """Backfill the windows, then release the backfill lock"""
+
+        try:
+            return await self.backfill_messages(
+                windows, checkpoint=checkpoint, concurrency=concurrency
+            )
+        finally:
+            await self.backfill_lock.release()
+
+    @property
+    def is_backfilling(self) -> bool:
+        """Check if a backfill is currently running"""
+        return self.backfill_task is not None and not self.backfill_task.done()
 
     async def get_device(
         self,
@@ -101,59 +350,68 @@ class AstrocastAPI:
 
         api_url = f"{self.api_url}/devices/{device_id}"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                api_url,
-                headers={"X-Api-Key": str(self.api_token)},
-            ) as response:
-                if response.status == 200:
-                    message = await response.json()
-
-                    device_name = self.device_types.get(message["deviceType"])
-                    message["deviceTypeName"] = device_name
-                    message["id"] = message["deviceGuid"]
-                    device_obj = AstrocastDevice.model_validate(message)
-                else:
-                    print("Error, something is wrong in the request.")
+        client = await self.get_client()
+        async with client.get(
+            api_url,
+            timeout=aiohttp.ClientTimeout(
+                total=config.ASTROCAST_DEVICE_TIMEOUT_SECONDS
+            ),
+        ) as response:
+            if response.status == 200:
+                message = await response.json()
+
+                device_name = self.device_types.get(message["deviceType"])
+                message["deviceTypeName"] = device_name
+                message["id"] = message["deviceGuid"]
+                device_obj = AstrocastDeviceRead.model_validate(message)
+            else:
+                print(
+                    "Error, something is wrong in the request: "
+                    f"{response.status}."
+                )
+                response.raise_for_status()
 
         return device_obj
 
-    async def get_devices(self) -> list[AstrocastDevice]:
+    async def get_devices(self) -> list[AstrocastDeviceRead]:
         """Get devices from Astrocast"""
 
         print("Getting devices ...")
         api_url = f"{self.api_url}/devices"
         devices = []
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                api_url,
-                headers={"X-Api-Key": str(self.api_token)},
-                timeout=aiohttp.ClientTimeout(total=2),
-            ) as response:
-                if response.status == 200:
-                    messages = await response.json()
-                    if len(messages) > 0:
-                        print(f"Got {len(messages)} devices.")
-
-                        # Compile message into objects
-                        for message in messages:
-                            message_copy = message.copy()
-                            device_name = self.device_types.get(
-                                message["deviceType"]
-                            )
-                            message_copy["deviceTypeName"] = device_name
-                            message_copy["id"] = message["deviceGuid"]
-                            device = AstrocastDevice.model_validate(
-                                message_copy,
-                            )
-                            devices.append(device)
-                    else:
-                        print("There is no message.")
+        client = await self.get_client()
+        async with client.get(
+            api_url,
+            timeout=aiohttp.ClientTimeout(
+                total=config.ASTROCAST_DEVICE_TIMEOUT_SECONDS
+            ),
+        ) as response:
+            if response.status == 200:
+                messages = await response.json()
+                if len(messages) > 0:
+                    print(f"Got {len(messages)} devices.")
+
+                    # Compile message into objects
+                    for message in messages:
+                        message_copy = message.copy()
+                        device_name = self.device_types.get(
+                            message["deviceType"]
+                        )
+                        message_copy["deviceTypeName"] = device_name
+                        message_copy["id"] = message["deviceGuid"]
+                        device = AstrocastDeviceRead.model_validate(
+                            message_copy,
+                        )
+                        devices.append(device)
                 else:
-                    print(
-                        "Error, something is wrong in the request: "
-                        f"{response.status}."
-                    )
+                    print("There is no message.")
+            else:
+                # Raise rather than return no devices, which would be cached
+                print(
+                    "Error, something is wrong in the request: "
+                    f"{response.status}."
+                )
+                response.raise_for_status()
 
         return devices
 
@@ -163,24 +421,25 @@ class AstrocastAPI:
         print("Getting device types ...")
 
         api_url = f"{self.api_url}/enums/devicetypes"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                api_url,
-                headers={"X-Api-Key": str(self.api_token)},
-                timeout=aiohttp.ClientTimeout(total=2),
-            ) as response:
-                if response.status == 200:
-                    device_types = await response.json()
-                    for device_type in device_types:
-                        device_id = int(device_type["deviceTypeId"])
-                        self.device_types[device_id] = device_type["name"]
-
-                    print(f"Got {len(device_types)} device types")
-                else:
-                    print(
-                        "Error, something is wrong in the request: "
-                        f"{response.status}."
-                    )
+        client = await self.get_client()
+        async with client.get(
+            api_url,
+            timeout=aiohttp.ClientTimeout(
+                total=config.ASTROCAST_DEVICE_TIMEOUT_SECONDS
+            ),
+        ) as response:
+            if response.status == 200:
+                device_types = await response.json()
+                for device_type in device_types:
+                    device_id = int(device_type["deviceTypeId"])
+                    self.device_types[device_id] = device_type["name"]
+
+                print(f"Got {len(device_types)} device types")
+            else:
+                print(
+                    "Error, something is wrong in the request: "
+                    f"{response.status}."
+                )
 
     async def get_device_summaries(self) -> list[AstrocastDeviceSummary]:
         """Get device summaries from Astrocast"""
@@ -189,63 +448,96 @@ class AstrocastAPI:
 
         api_url = f"{self.api_url}/devices/summary"
         device_summaries = []
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                api_url,
-                headers={"X-Api-Key": str(self.api_token)},
-            ) as response:
-                if response.status == 200:
-                    messages = await response.json()
-                    if len(messages) > 0:
-                        print(f"Got {len(messages)} devices.")
-
-                        # Compile message into objects
-                        for message in messages:
-                            device_summary = (
-                                AstrocastDeviceSummary.model_validate(message)
-                            )
-                            device_summaries.append(device_summary)
-                    else:
-                        print("There is no message.")
+        client = await self.get_client()
+        async with client.get(
+            api_url,
+            timeout=aiohttp.ClientTimeout(
+                total=config.ASTROCAST_DEVICE_TIMEOUT_SECONDS
+            ),
+        ) as response:
+            if response.status == 200:
+                messages = await response.json()
+                if len(messages) > 0:
+                    print(f"Got {len(messages)} devices.")
+
+                    # Compile message into objects
+                    for message in messages:
+                        device_summary = (
+                            AstrocastDeviceSummary.model_validate(message)
+                        )
+                        device_summaries.append(device_summary)
                 else:
-                    print("Error, something is wrong in the request.")
+                    print("There is no message.")
+            else:
+                print(
+                    "Error, something is wrong in the request: "
+                    f"{response.status}."
+                )
+                response.raise_for_status()
 
         return device_summaries
 
-    async def add_message_to_db(
+    async def get_cached_device(
         self,
-        message: dict,
-    ) -> None:
-        """Add a message to the database"""
-
-        payload = AstrocastMessageCreate(
-            requested_at=self.last_polling_time,
-            messageGuid=message["messageGuid"],
-            deviceGuid=message["deviceGuid"],
-            createdDate=message["createdDate"],
-            receivedDate=message["receivedDate"],
-            latitude=message["latitude"],
-            longitude=message["longitude"],
-            data=message["data"],
-            messageSize=message["messageSize"],
-            callbackDeliveryStatus=message["callbackDeliveryStatus"],
+        device_id: UUID,
+    ) -> AstrocastDeviceRead:
+        """Get a device from the device cache, or Astrocast on a miss"""
+
+        return await self.device_cache.get(
+            ("device", device_id),
+            lambda: self.get_device(device_id),
         )
 
-        try:
-            async with async_session() as db_session:
-                obj_astrocast = AstrocastMessage.model_validate(payload)
+    async def get_cached_devices(self) -> list[AstrocastDeviceRead]:
+        """Get the devices from the device cache, or Astrocast on a miss"""
 
-                db_session.add(obj_astrocast)
-                await db_session.commit()
-                await db_session.refresh()
-        except sqlalchemy.exc.IntegrityError:
-            print(
-                f'Duplicate messageGuid ({message["messageGuid"]}), skipping...',
+        return await self.device_cache.get("devices", self.get_devices)
+
+    async def get_cached_device_summaries(
+        self,
+    ) -> list[AstrocastDeviceSummary]:
+        """Get device summaries from the cache, or Astrocast on a miss"""
+
+        return await self.device_cache.get(
+            "device_summaries", self.get_device_summaries
+        )
+
+    async def add_messages_to_db(
+        self,
+        messages: list[dict],
+    ) -> AstrocastIngestResult:
+        """Add a batch of messages to the database in a single transaction
+
+        Duplicate messageGuids are skipped by the database rather than by
+        catching an IntegrityError for each message. The ingest checkpoint is
+        advanced in the same transaction.
+
+        Returns
+        -------
+        AstrocastIngestResult
+            The number of inserted and skipped messages
+        """
+
+        async with async_session() as db_session:
+            result = await insert_messages(
+                db_session,
+                messages,
+                requested_at=self.last_polling_time,
             )
-        except Exception as e:
-            print(f"Error adding message to db: {e}")
-        finally:
-            print("Message added to db")
+            await db_session.commit()
+
+        if result.last_received_date is not None and (
+            self.last_received_date is None
+            or result.last_received_date > self.last_received_date
+        ):
+            self.last_received_date = result.last_received_date
+
+        print(
+            f"Added {result.inserted} messages to db, "
+            f"skipped {result.skipped} duplicates"
+        )
+
+        return result
 
     async def get_time_of_last_saved_message(
         self,
@@ -253,37 +545,92 @@ class AstrocastAPI:
         """Get the time of the last message to minimise API queries
 
         Time is based off of the receivedDate field in the Astrocast API spec.
+        The watermark is kept in memory and advanced by each ingest, the
+        checkpoint table is only read until a watermark is known.
         """
+        if self.last_received_date is None:
+            async with async_session() as db_session:
+                self.last_received_date = await get_checkpoint(db_session)
+
+        return self.last_received_date
+
+    async def sync_devices(self) -> int:
+        """Mirror the Astrocast devices into the local device registry"""
+
+        if not self.device_types:
+            await self.update_device_types()
+
+        devices = await self.get_devices()
         async with async_session() as db_session:
-            query = select(AstrocastMessage).order_by(
-                AstrocastMessage.receivedDate.desc(),
-            )
-            results = await db_session.execute(query)
-            last_message = results.scalars().first()
-            if last_message:
-                return last_message.receivedDate
-            else:
-                return None
+            synced = await upsert_devices(db_session, devices)
+            await db_session.commit()
+
+        print(f"Synced {synced} devices to db")
+
+        return synced
+
+    async def start_syncing_devices(
+        self,
+        interval_seconds: int = config.ASTROCAST_DEVICE_SYNC_INTERVAL_SECONDS,
+    ) -> None:
+        """Periodically mirror the Astrocast devices into the database"""
+
+        while self.poll_messages:
+            try:
+                await self.sync_devices()
+            except Exception as e:
+                print(f"Error syncing devices: {e}")
+            await asyncio.sleep(interval_seconds)
 
     async def start_collecting_messages(
         self,
         interval_seconds: int = config.ASTROCAST_POLLING_INTERVAL_SECONDS,
     ) -> None:
-        """Poll the Astrocast API for new messages"""
-        # Poll the Astrocast API for new messages
+        """Poll the Astrocast API for new messages
 
-        while self.poll_messages:
-            last_db_message_time = await self.get_time_of_last_saved_message()
-            print(f"Last message retrieved at: {last_db_message_time}")
-            await self.get_messages()  # Get the latest messages
-            await asyncio.sleep(interval_seconds)  # Wait before polling again
+        The wait between polls is adapted by the scheduler, starting from
+        interval_seconds, and can be cut short with `poll_now()`.
+        """
+
+        self.scheduler.reset(interval_seconds)
+        self.is_collecting = True
+        try:
+            while self.poll_messages:
+                inserted = await self.get_messages()  # Get the latest
+                interval = self.scheduler.record_poll(inserted)
+                print(f"Next poll for messages in {interval} seconds")
+                await self.scheduler.wait()  # Wait before polling again
+        finally:
+            self.is_collecting = False
+
+    def poll_now(self) -> None:
+        """Poll the Astrocast API for messages without waiting"""
+        self.scheduler.trigger()
+
+    @property
+    def status(
+        self,
+    ) -> AstrocastStatus:
+        """Get the state of the message poller and device cache"""
+        return AstrocastStatus(
+            is_polling_messages=self.is_polling_messages,
+            last_message_polling_time=self.last_message_polling_time,
+            next_message_polling_time=self.next_message_polling_time,
+            polling_interval_seconds=self.scheduler.interval_seconds,
+            is_backfilling=self.is_backfilling,
+            last_received_date=self.last_received_date,
+            device_cache=self.device_cache.stats,
+        )
 
     @property
     def is_polling_messages(
         self,
     ) -> bool:
-        """Check if the Astrocast API is currently polling for messages"""
-        return self.poll_messages
+        """Check if this process is currently polling for messages
+
+        Only the process elected as leader runs the poller.
+        """
+        return self.poll_messages and self.is_collecting
 
     @property
     def last_message_polling_time(
@@ -297,12 +644,7 @@ class AstrocastAPI:
         self,
     ) -> datetime.datetime | None:
         """Get the next time the Astrocast API will poll for messages"""
-        if self.last_polling_time:
-            return self.last_polling_time + datetime.timedelta(
-                seconds=config.ASTROCAST_POLLING_INTERVAL_SECONDS
-            )
-        else:
-            return None
+        return self.scheduler.next_poll_time
 
 
 @lru_cache
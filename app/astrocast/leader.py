@@ -0,0 +1,192 @@
+from app.config import config
+from app.db import engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.sql import text
+from functools import lru_cache
+from typing import Callable, TextIO
+import asyncio
+import fcntl
+import os
+import socket
+
+
+class LeaderElection:
+    def __init__(
+        self,
+        db_engine: AsyncEngine = engine,
+        lock_id: int = config.ASTROCAST_LEADER_LOCK_ID,
+        lock_file: str = config.ASTROCAST_LEADER_LOCK_FILE,
+        retry_seconds: int = config.ASTROCAST_LEADER_RETRY_SECONDS,
+    ) -> None:
+        """Elect a single process to poll Astrocast across workers/replicas
+
+        On PostgreSQL the leader holds a session-level advisory lock on a
+        dedicated connection, which the server releases if the process (or
+        its connection) dies. Other databases (SQLite in tests) fall back to
+        an exclusive lock on a local file.
+        """
+
+        self.engine = db_engine
+        self.lock_id = lock_id
+        self.lock_file = lock_file
+        self.retry_seconds = retry_seconds
+
+        self.instance_id: str = f"{socket.gethostname()}-{os.getpid()}"
+        self.is_leader: bool = False
+
+        self._connection: AsyncConnection | None = None
+        self._file: TextIO | None = None
+
+    @property
+    def uses_advisory_lock(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    async def acquire(self) -> bool:
+        """Try to become (or confirm still being) the leader without waiting"""
+
+        if self.uses_advisory_lock:
+            try:
+                if self._connection is None:
+                    # Autocommit, so the lock connection never idles in a
+                    # transaction. The application_name identifies the leader.
+                    self._connection = await self.engine.connect()
+                    await self._connection.execution_options(
+                        isolation_level="AUTOCOMMIT"
+                    )
+                    await self._connection.execute(
+                        text(
+                            "SELECT set_config("
+                            "'application_name', :name, false)"
+                        ),
+                        {"name": self.instance_id},
+                    )
+
+                if self.is_leader:  # Check the connection holding the lock
+                    await self._connection.execute(text("SELECT 1"))
+                else:
+                    res = await self._connection.execute(
+                        text("SELECT pg_try_advisory_lock(:lock_id)"),
+                        {"lock_id": self.lock_id},
+                    )
+                    self.is_leader = bool(res.scalar())
+            except Exception as e:
+                print(f"Lost connection holding the leader lock: {e}")
+                await self._close_connection()
+                self.is_leader = False
+        elif not self.is_leader:
+            if self._file is None:
+                self._file = open(self.lock_file, "a+")
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.is_leader = False
+            else:
+                self._file.seek(0)
+                self._file.truncate()
+                self._file.write(self.instance_id)
+                self._file.flush()
+                self.is_leader = True
+
+        return self.is_leader
+
+    async def release(self) -> None:
+        """Give up the leadership, if held"""
+
+        if self._connection is not None:
+            if self.is_leader:
+                try:
+                    await self._connection.execute(
+                        text("SELECT pg_advisory_unlock(:lock_id)"),
+                        {"lock_id": self.lock_id},
+                    )
+                except Exception as e:
+                    print(f"Error releasing the leader lock: {e}")
+            await self._close_connection()
+
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+        self.is_leader = False
+
+    async def get_leader(self) -> str | None:
+        """Get the instance id of the current leader, if any"""
+
+        if self.is_leader:
+            return self.instance_id
+
+        if self.uses_advisory_lock:
+            # A single bigint advisory key is split over classid and objid
+            async with self.engine.connect() as connection:
+                res = await connection.execute(
+                    text(
+                        "SELECT a.application_name FROM pg_locks l "
+                        "JOIN pg_stat_activity a ON a.pid = l.pid "
+                        "WHERE l.locktype = 'advisory' AND l.granted "
+                        "AND l.classid = :classid AND l.objid = :objid "
+                        "AND l.objsubid = 1"
+                    ),
+                    {
+                        "classid": self.lock_id >> 32,
+                        "objid": self.lock_id & 0xFFFFFFFF,
+                    },
+                )
+                return res.scalar_one_or_none()
+
+        try:
+            with open(self.lock_file) as f:
+                return f.read() or None
+        except FileNotFoundError:
+            return None
+
+    async def run(
+        self,
+        on_elected: Callable[[], list[asyncio.Task]],
+    ) -> None:
+        """Campaign for leadership until cancelled
+
+        on_elected is called to start the leader's tasks each time this
+        instance becomes the leader, they are cancelled if it is lost.
+        """
+
+        tasks = []
+        try:
+            while True:
+                was_leader = self.is_leader
+                await self.acquire()
+
+                if self.is_leader and not was_leader:
+                    print(f"Instance {self.instance_id} is now the leader")
+                    tasks = on_elected()
+                elif was_leader and not self.is_leader:
+                    print(f"Instance {self.instance_id} lost the leadership")
+                    await self._cancel(tasks)
+                    tasks = []
+
+                await asyncio.sleep(self.retry_seconds)
+        finally:
+            await self._cancel(tasks)
+            await self.release()
+
+    async def _close_connection(self) -> None:
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    @staticmethod
+    async def _cancel(tasks: list[asyncio.Task]) -> None:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@lru_cache
+def get_leader_election():
+    return LeaderElection()
+
+
+astrocast_leader = get_leader_election()
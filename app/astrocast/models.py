@@ -1,9 +1,11 @@
 from sqlmodel import SQLModel, Field, Column, Relationship, UniqueConstraint
 import datetime
-import base64
 from uuid import uuid4, UUID
-from pydantic import model_validator
+from app.db import trigram_index
+from pydantic import model_validator, field_validator
 from typing_extensions import Self
+from app.config import config
+from app.dates import to_naive_utc
 
 
 class AstrocastMessageBase(SQLModel):
@@ -18,7 +20,7 @@ class AstrocastMessageBase(SQLModel):
     messageGuid: UUID | None
     deviceGuid: UUID | None
     createdDate: datetime.datetime | None
-    receivedDate: datetime.datetime | None
+    receivedDate: datetime.datetime | None = Field(index=True)
     latitude: float | None
     longitude: float | None
     data: str | None
@@ -43,27 +45,97 @@ class AstrocastMessage(AstrocastMessageBase, table=True):
         index=True,
         nullable=False,
     )
+    decoded_data: str | None = Field(  # The data decoded once at ingest
+        default=None,
+    )
+
+
+class AstrocastIngestCheckpoint(SQLModel, table=True):
+    """The latest receivedDate ingested from the Astrocast API
+
+    Polls resume from this watermark instead of scanning the message table.
+    Stages that walk the message table in insertion order keep their
+    position in last_iterator instead.
+    """
+
+    __table_args__ = (
+        UniqueConstraint("name", name="ingest_checkpoint_name_constraint"),
+    )
+
+    iterator: int = Field(
+        default=None,
+        nullable=False,
+        primary_key=True,
+        index=True,
+    )
+    name: str = Field(nullable=False)
+    last_received_date: datetime.datetime | None = Field(default=None)
+    last_iterator: int | None = Field(default=None)  # For row cursors
+    updated_at: datetime.datetime = Field(
+        default_factory=datetime.datetime.utcnow,
+        nullable=False,
+    )
+
+
+class AstrocastIngestResult(SQLModel):
+    inserted: int = 0
+    skipped: int = 0
+    last_received_date: datetime.datetime | None = None
+
+
+class AstrocastCallbackMessage(SQLModel):
+    """A message delivered by an Astrocast callback"""
+
+    messageGuid: UUID
+    deviceGuid: UUID
+    createdDate: datetime.datetime | None = None
+    receivedDate: datetime.datetime | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    data: str | None = None
+    messageSize: int | None = None
+    callbackDeliveryStatus: int | None = None
+
+
+class AstrocastBackfillCreate(SQLModel):
+    startReceivedDate: datetime.datetime
+    endReceivedDate: datetime.datetime | None = None  # Until now if not set
+    window_hours: int = Field(
+        default=config.ASTROCAST_BACKFILL_WINDOW_HOURS, gt=0
+    )
+    concurrency: int = Field(
+        default=config.ASTROCAST_BACKFILL_CONCURRENCY, gt=0
+    )
+
+    @field_validator("startReceivedDate", "endReceivedDate")
+    def convert_to_naive_utc(
+        cls,
+        v: datetime.datetime | None,
+    ) -> datetime.datetime | None:
+        return to_naive_utc(v)
+
+
+class AstrocastBackfillRead(SQLModel):
+    checkpoint: str
+    resumed_from: datetime.datetime
+    endReceivedDate: datetime.datetime
+    windows: int
 
 
 class AstrocastMessageCreate(AstrocastMessageBase):
-    pass
+    @field_validator("createdDate", "receivedDate")
+    def convert_to_naive_utc(
+        cls,
+        v: datetime.datetime | None,
+    ) -> datetime.datetime | None:
+        """Astrocast dates are UTC (Z suffix), store them without timezone"""
+        return to_naive_utc(v)
 
 
 class AstrocastMessageRead(AstrocastMessageBase):
     id: UUID
     decoded_data: str | None = None
 
-    @model_validator(mode="after")
-    def decode_data(self) -> Self:
-        """Decode the data in data and place it into decoded_data"""
-        if self.data is not None:
-            decoded_data = base64.b64decode(self.data).decode("utf-8")
-
-            # values = dict(values)  # Make a copy of the values
-            self.decoded_data = decoded_data
-
-        return self
-
 
 class AstrocastDeviceSummary(SQLModel):
     id: UUID
@@ -82,38 +154,84 @@ class AstrocastDeviceSummary(SQLModel):
         """Set the device id from the deviceGuid
 
         Necessary for react-admin as it always needs an ID field"""
-        if values.get("deviceGuid") is not None:
+        if isinstance(values, dict) and values.get("deviceGuid") is not None:
             values = dict(values)
             values["id"] = values["deviceGuid"]
 
         return values
 
 
-class AstrocastDevice(SQLModel):
-    id: UUID | None
-    deviceGuid: UUID | None
-    name: str | None
-    description: str | None
-    deviceType: int | None
-    deviceTypeName: str | None
-    deviceState: int | None
-    disabledUntilDate: datetime.datetime | None
-    deviceGroupGuid: UUID | None
-    modelNumber: str | None
-    serialNumber: str | None
-    firmwareVersion: str | None
-    componentModelNumber: str | None
-    componentSerialNumber: str | None
-    componentFirmwareVersion: str | None
-    protocolVersion: int | None
-    lastMessageDate: datetime.datetime | None
-    lastCommandDate: datetime.datetime | None
-    lastLocationDate: datetime.datetime | None
-    fixedGeolocation: bool | None
-    lastLatitude: float | None
-    lastLongitude: float | None
-    registrationEnabled: bool | None
-    billingExcluded: bool | None
+class AstrocastDeviceBase(SQLModel):
+    deviceGuid: UUID | None = Field(default=None, index=True)
+    name: str | None = Field(default=None, index=True)
+    description: str | None = None
+    deviceType: int | None = None
+    deviceTypeName: str | None = None
+    deviceState: int | None = Field(default=None, index=True)
+    disabledUntilDate: datetime.datetime | None = None
+    deviceGroupGuid: UUID | None = None
+    modelNumber: str | None = None
+    serialNumber: str | None = Field(default=None, index=True)
+    firmwareVersion: str | None = None
+    componentModelNumber: str | None = None
+    componentSerialNumber: str | None = None
+    componentFirmwareVersion: str | None = None
+    protocolVersion: int | None = None
+    lastMessageDate: datetime.datetime | None = Field(default=None, index=True)
+    lastCommandDate: datetime.datetime | None = None
+    lastLocationDate: datetime.datetime | None = None
+    fixedGeolocation: bool | None = None
+    lastLatitude: float | None = None
+    lastLongitude: float | None = None
+    registrationEnabled: bool | None = None
+    billingExcluded: bool | None = None
+
+    @field_validator(
+        "disabledUntilDate",
+        "lastMessageDate",
+        "lastCommandDate",
+        "lastLocationDate",
+    )
+    def convert_to_naive_utc(
+        cls,
+        v: datetime.datetime | None,
+    ) -> datetime.datetime | None:
+        """Astrocast dates are UTC (Z suffix), store them without timezone"""
+        return to_naive_utc(v)
+
+
+class AstrocastDevice(AstrocastDeviceBase, table=True):
+    """Local mirror of the devices registered on Astrocast
+
+    Kept up to date by the device sync job, upserting on deviceGuid.
+    """
+
+    __table_args__ = (
+        UniqueConstraint("deviceGuid", name="device_guid_constraint"),
+        UniqueConstraint("id", name="device_id_constraint"),
+        trigram_index("astrocastdevice", "name"),
+        trigram_index("astrocastdevice", "serialNumber"),
+    )
+
+    iterator: int = Field(
+        default=None,
+        nullable=False,
+        primary_key=True,
+        index=True,
+    )
+    id: UUID = Field(  # The deviceGuid, react-admin always needs an ID field
+        index=True,
+        nullable=False,
+    )
+    synced_at: datetime.datetime = Field(  # When last seen in the API
+        default_factory=datetime.datetime.utcnow,
+        nullable=False,
+        index=True,
+    )
+
+
+class AstrocastDeviceRead(AstrocastDeviceBase):
+    id: UUID | None = None
 
     @model_validator(mode="after")
     def set_device_id_from_guid(self) -> Self:
@@ -125,3 +243,33 @@ class AstrocastDevice(SQLModel):
             self.id = self.deviceGuid
 
         return self
+
+
+class AstrocastDeviceCreate(AstrocastDeviceBase):
+    pass
+
+
+class AstrocastDeviceUpdate(AstrocastDeviceBase):
+    pass
+
+
+class AstrocastCacheStats(SQLModel):
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    max_size: int
+    ttl_seconds: float
+
+
+class AstrocastStatus(SQLModel):
+    is_polling_messages: bool  # If this instance runs the message poller
+    is_leader: bool = False  # If this instance is the elected poller
+    leader: str | None = None  # The instance id of the elected poller
+    last_message_polling_time: datetime.datetime | None = None
+    next_message_polling_time: datetime.datetime | None = None
+    polling_interval_seconds: float
+    is_backfilling: bool = False
+    last_received_date: datetime.datetime | None = None
+    device_cache: AstrocastCacheStats
@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+
+
+class PollingScheduler:
+    def __init__(
+        self,
+        interval_seconds: float,
+        min_interval_seconds: float,
+        max_interval_seconds: float,
+        backoff_factor: float = 2.0,
+    ) -> None:
+        """Adaptive interval between polls of the Astrocast API
+
+        The interval shrinks while polls keep returning new messages and
+        backs off exponentially while they are empty, within the bounds.
+
+        interval_seconds : float
+            The interval to start with
+        min_interval_seconds : float
+            The shortest interval while messages are arriving
+        max_interval_seconds : float
+            The longest interval while polls are empty
+        backoff_factor : float
+            The factor the interval is divided or multiplied by after a poll
+        """
+
+        self.min_interval_seconds = min_interval_seconds
+        self.max_interval_seconds = max_interval_seconds
+        self.backoff_factor = backoff_factor
+        self.interval_seconds = self._clamp(interval_seconds)
+        self.next_poll_time: datetime.datetime | None = None
+
+        self._wake = asyncio.Event()
+
+    def _clamp(
+        self,
+        interval_seconds: float,
+    ) -> float:
+        return min(
+            max(interval_seconds, self.min_interval_seconds),
+            self.max_interval_seconds,
+        )
+
+    def reset(
+        self,
+        interval_seconds: float,
+    ) -> None:
+        """Restart the schedule from the given interval"""
+
+        self.interval_seconds = self._clamp(interval_seconds)
+
+    def record_poll(
+        self,
+        new_messages: int,
+    ) -> float:
+        """Adjust the interval from the result of a poll
+
+        Returns the number of seconds until the next poll.
+        """
+
+        if new_messages > 0:
+            interval = self.interval_seconds / self.backoff_factor
+        else:
+            interval = self.interval_seconds * self.backoff_factor
+        self.interval_seconds = self._clamp(interval)
+
+        self.next_poll_time = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=self.interval_seconds
+        )
+
+        return self.interval_seconds
+
+    def trigger(self) -> None:
+        """Wake the poller up to poll immediately"""
+
+        self.next_poll_time = datetime.datetime.utcnow()
+        self._wake.set()
+
+    async def wait(self) -> None:
+        """Sleep until the next poll is due or a poll is triggered"""
+
+        try:
+            await asyncio.wait_for(
+                self._wake.wait(), timeout=self.interval_seconds
+            )
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._wake.clear()
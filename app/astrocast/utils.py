@@ -0,0 +1,293 @@
+from app.astrocast.models import (
+    AstrocastDevice,
+    AstrocastDeviceRead,
+    AstrocastMessage,
+    AstrocastMessageCreate,
+    AstrocastIngestCheckpoint,
+    AstrocastIngestResult,
+)
+from app.config import config
+from app.db import AsyncSession, dialect_insert
+from sqlmodel import select
+from sqlalchemy import case, or_
+from sqlalchemy.sql import func
+import base64
+import binascii
+import datetime
+
+MESSAGES_CHECKPOINT = "messages"
+
+
+def decode_message_data(
+    data: str | None,
+) -> str | None:
+    """Decode the base64 data of an Astrocast message to a string"""
+
+    if data is None:
+        return None
+
+    try:
+        return base64.b64decode(data).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        print(f"Could not decode message data {data}: {e}")
+        return None
+
+
+def message_to_row(
+    message: dict,
+    requested_at: datetime.datetime,
+) -> dict:
+    """Convert an Astrocast API message into a row for the message table"""
+
+    payload = AstrocastMessageCreate(
+        requested_at=requested_at,
+        messageGuid=message["messageGuid"],
+        deviceGuid=message["deviceGuid"],
+        createdDate=message["createdDate"],
+        receivedDate=message["receivedDate"],
+        latitude=message["latitude"],
+        longitude=message["longitude"],
+        data=message["data"],
+        messageSize=message["messageSize"],
+        callbackDeliveryStatus=message["callbackDeliveryStatus"],
+    )
+    obj = AstrocastMessage.model_validate(payload)
+    obj.decoded_data = decode_message_data(obj.data)
+
+    return obj.model_dump(exclude={"iterator"})
+
+
+def backfill_checkpoint_name(
+    start: datetime.datetime,
+) -> str:
+    """Name of the checkpoint of a backfill, resumable from its start date"""
+
+    return f"backfill:{start.strftime('%Y-%m-%dT%H:%M:%S')}"
+
+
+def split_date_range(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    window: datetime.timedelta,
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """Split a date range into consecutive windows of at most `window`"""
+
+    windows = []
+    while start < end:
+        windows.append((start, min(start + window, end)))
+        start += window
+
+    return windows
+
+
+async def get_checkpoint(
+    session: AsyncSession,
+    name: str = MESSAGES_CHECKPOINT,
+    warm_start: bool = True,
+) -> datetime.datetime | None:
+    """Get the last ingested receivedDate for a checkpoint
+
+    If the checkpoint has never been written, it is warm-started from the
+    indexed MAX(receivedDate) of the message table, unless warm_start is
+    False.
+    """
+
+    res = await session.exec(
+        select(AstrocastIngestCheckpoint.last_received_date).where(
+            AstrocastIngestCheckpoint.name == name
+        )
+    )
+    last_received_date = res.one_or_none()
+
+    if last_received_date is None and warm_start:
+        res = await session.exec(
+            select(func.max(AstrocastMessage.receivedDate))
+        )
+        last_received_date = res.one_or_none()
+
+    return last_received_date
+
+
+async def advance_checkpoint(
+    session: AsyncSession,
+    last_received_date: datetime.datetime,
+    name: str = MESSAGES_CHECKPOINT,
+) -> None:
+    """Move a checkpoint forward to last_received_date
+
+    The checkpoint never moves backwards, so batches may be ingested out of
+    order. The caller owns the transaction.
+    """
+
+    query = dialect_insert(session, AstrocastIngestCheckpoint).values(
+        name=name,
+        last_received_date=last_received_date,
+        updated_at=datetime.datetime.utcnow(),
+    )
+    current = AstrocastIngestCheckpoint.last_received_date
+    query = query.on_conflict_do_update(
+        index_elements=["name"],
+        set_={
+            "last_received_date": case(
+                (
+                    or_(
+                        current.is_(None),
+                        query.excluded.last_received_date > current,
+                    ),
+                    query.excluded.last_received_date,
+                ),
+                else_=current,
+            ),
+            "updated_at": query.excluded.updated_at,
+        },
+    )
+
+    await session.execute(query)
+
+
+async def get_iterator_checkpoint(
+    session: AsyncSession,
+    name: str,
+) -> int | None:
+    """Get the last message iterator processed by a stage"""
+
+    res = await session.exec(
+        select(AstrocastIngestCheckpoint.last_iterator).where(
+            AstrocastIngestCheckpoint.name == name
+        )
+    )
+
+    return res.one_or_none()
+
+
+async def advance_iterator_checkpoint(
+    session: AsyncSession,
+    last_iterator: int,
+    name: str,
+) -> None:
+    """Move a stage's message iterator checkpoint forward
+
+    The caller owns the transaction, so the checkpoint is committed with the
+    stage's output.
+    """
+
+    query = dialect_insert(session, AstrocastIngestCheckpoint).values(
+        name=name,
+        last_iterator=last_iterator,
+        updated_at=datetime.datetime.utcnow(),
+    )
+    current = AstrocastIngestCheckpoint.last_iterator
+    query = query.on_conflict_do_update(
+        index_elements=["name"],
+        set_={
+            "last_iterator": case(
+                (
+                    or_(
+                        current.is_(None),
+                        query.excluded.last_iterator > current,
+                    ),
+                    query.excluded.last_iterator,
+                ),
+                else_=current,
+            ),
+            "updated_at": query.excluded.updated_at,
+        },
+    )
+
+    await session.execute(query)
+
+
+async def insert_messages(
+    session: AsyncSession,
+    messages: list[dict],
+    requested_at: datetime.datetime,
+    batch_size: int = config.ASTROCAST_INGEST_BATCH_SIZE,
+    checkpoint: str | None = MESSAGES_CHECKPOINT,
+) -> AstrocastIngestResult:
+    """Insert a batch of Astrocast messages with multi-row INSERTs
+
+    Messages with a messageGuid that already exists are skipped by the
+    database (ON CONFLICT DO NOTHING), and the checkpoint is advanced to the
+    latest receivedDate of the batch. The caller owns the transaction, so a
+    whole poll result and its checkpoint are committed at once.
+
+    Parameters
+    ----------
+    session : AsyncSession
+        The session to execute the inserts in
+    messages : list[dict]
+        Messages as returned by the Astrocast API
+    requested_at : datetime.datetime
+        When the messages were retrieved from the Astrocast API
+    batch_size : int, optional
+        The number of rows per INSERT statement, keeps the amount of bound
+        parameters under the driver's limit
+    checkpoint : str | None, optional
+        The name of the checkpoint to advance, None to leave all checkpoints
+        untouched
+
+    Returns
+    -------
+    AstrocastIngestResult
+        The number of inserted and skipped messages, and the latest
+        receivedDate of the batch
+    """
+
+    rows = [message_to_row(message, requested_at) for message in messages]
+
+    inserted = 0
+    for i in range(0, len(rows), batch_size):
+        query = (
+            dialect_insert(session, AstrocastMessage)
+            .values(rows[i : i + batch_size])
+            .on_conflict_do_nothing(index_elements=["messageGuid"])
+            .returning(AstrocastMessage.messageGuid)
+        )
+        res = await session.execute(query)
+        inserted += len(res.all())
+
+    received_dates = [
+        row["receivedDate"] for row in rows if row["receivedDate"] is not None
+    ]
+    last_received_date = max(received_dates) if received_dates else None
+    if last_received_date is not None and checkpoint is not None:
+        await advance_checkpoint(session, last_received_date, name=checkpoint)
+
+    return AstrocastIngestResult(
+        inserted=inserted,
+        skipped=len(rows) - inserted,
+        last_received_date=last_received_date,
+    )
+
+
+async def upsert_devices(
+    session: AsyncSession,
+    devices: list[AstrocastDeviceRead],
+) -> int:
+    """Insert or update devices in the local registry, keyed on deviceGuid
+
+    The caller owns the transaction. Returns the number of devices written.
+    """
+
+    rows = [
+        AstrocastDevice.model_validate(device).model_dump(
+            exclude={"iterator"}
+        )
+        for device in devices
+        if device.deviceGuid is not None
+    ]
+    if not rows:
+        return 0
+
+    query = dialect_insert(session, AstrocastDevice).values(rows)
+    query = query.on_conflict_do_update(
+        index_elements=["deviceGuid"],
+        set_={
+            field: query.excluded[field]
+            for field in rows[0]
+            if field not in ("id", "deviceGuid")
+        },
+    )
+    await session.execute(query)
+
+    return len(rows)
@@ -1,17 +1,54 @@
-from fastapi import Depends, APIRouter, Query, Response, Body
+from fastapi import (
+    Depends,
+    APIRouter,
+    Query,
+    Response,
+    Body,
+    HTTPException,
+    Header,
+)
 from sqlmodel import select
 from app.db import get_session, AsyncSession
 from app.astrocast.models import (
     AstrocastMessageRead,
     AstrocastMessage,
+    AstrocastMessageCreate,
     AstrocastDevice,
+    AstrocastDeviceRead,
+    AstrocastDeviceCreate,
+    AstrocastDeviceUpdate,
+    AstrocastDeviceSummary,
+    AstrocastStatus,
+    AstrocastBackfillCreate,
+    AstrocastBackfillRead,
+    AstrocastCallbackMessage,
+    AstrocastIngestResult,
 )
 from uuid import UUID
-from sqlalchemy import func
 import json
+import secrets
+import aiohttp
 from app.astrocast.classes import get_astrocast_api, AstrocastAPI
+from app.astrocast.leader import get_leader_election, LeaderElection
+from app.astrocast.utils import insert_messages
+from app.config import config
+from app.crud import CRUD
+import datetime
 
 router = APIRouter()
+crud = CRUD(
+    AstrocastDevice,
+    AstrocastDeviceRead,
+    AstrocastDeviceCreate,
+    AstrocastDeviceUpdate,
+)
+message_crud = CRUD(
+    AstrocastMessage,
+    AstrocastMessageRead,
+    AstrocastMessageCreate,
+    None,
+    resource_name="astrocast_messages",
+)
 
 
 ## Astrocast data
@@ -41,83 +78,166 @@ async def get_astrocast_messages(
     filter: str = Query(None),
     sort: str = Query(None),
     range: str = Query(None),
+    cursor: str = Query(None),
+    limit: int = Query(None),
 ) -> list[AstrocastMessageRead]:
     """Get all astrocast messages"""
-    sort = json.loads(sort) if sort else []
-    range = json.loads(range) if range else []
-    filter = json.loads(filter) if filter else {}
 
-    # Do a query to satisfy total count for "Content-Range" header
-    count_query = select(func.count(AstrocastMessage.iterator))
-    if len(filter):  # Have to filter twice for some reason? SQLModel state?
-        for field, value in filter.items():
-            if field == "id" or field == "deviceGuid":
-                count_query = count_query.filter(
-                    getattr(AstrocastMessage, field) == value
-                )
-            else:
-                count_query = count_query.filter(
-                    getattr(AstrocastMessage, field).like(f"%{str(value)}%")
-                )
-    total_count = await session.execute(count_query)
-    total_count = total_count.scalar_one()
-
-    # Query for the quantity of records in AstrocastMessageData that match the
-    # sensor as well as the min and max of the time column
-    query = select(AstrocastMessage)
-
-    # Order by sort field params ie. ["name","ASC"]
-    if len(sort) == 2:
-        sort_field, sort_order = sort
-        if sort_order == "ASC":
-            query = query.order_by(getattr(AstrocastMessage, sort_field))
-        else:
-            query = query.order_by(
-                getattr(AstrocastMessage, sort_field).desc()
-            )
+    return await message_crud.get_list(
+        response,
+        session,
+        filter=filter,
+        sort=sort,
+        range=range,
+        cursor=cursor,
+        limit=limit,
+    )
 
-    # Filter by filter field params ie. {"name":"bar"}
-    if len(filter):
-        for field, value in filter.items():
-            if field == "id" or field == "deviceGuid":
-                query = query.filter(getattr(AstrocastMessage, field) == value)
-            else:
-                query = query.filter(
-                    getattr(AstrocastMessage, field).like(f"%{str(value)}%")
-                )
 
-    if len(range) == 2:
-        start, end = range
-        query = query.offset(start).limit(end - start + 1)
-    else:
-        start, end = [0, total_count]  # For content-range header
+@router.get("/status", response_model=AstrocastStatus)
+async def get_astrocast_status(
+    astrocast: AstrocastAPI = Depends(get_astrocast_api),
+    leader: LeaderElection = Depends(get_leader_election),
+) -> AstrocastStatus:
+    """Get the state of the message poller and the device cache counters
+
+    The poller runs in the leader instance only, the status tells if this
+    instance is the leader, and which instance is.
+    """
+
+    return astrocast.status.model_copy(
+        update={
+            "is_leader": leader.is_leader,
+            "leader": await leader.get_leader(),
+        }
+    )
 
-    # Execute query
-    results = await session.exec(query)
-    astrocast_messages = results.all()
 
-    response.headers["Content-Range"] = (
-        f"astrocast_messages {start}-{end}/{total_count}"
+@router.post("/callback", response_model=AstrocastIngestResult)
+async def receive_astrocast_callback(
+    messages: AstrocastCallbackMessage | list[AstrocastCallbackMessage],
+    session: AsyncSession = Depends(get_session),
+    *,
+    x_callback_token: str | None = Header(None),
+) -> AstrocastIngestResult:
+    """Receive messages pushed by Astrocast, one message or a batch
+
+    Messages go through the same ingest path as polling and are deduplicated
+    on messageGuid. The polling watermark is deliberately left alone: a
+    callback batch says nothing about the messages before it, and if it
+    advanced the watermark, a message whose callback was lost would never be
+    polled. The poller therefore fetches the callback messages again, and
+    they are skipped as duplicates.
+    """
+
+    if config.ASTROCAST_CALLBACK_TOKEN is not None and (
+        x_callback_token is None
+        or not secrets.compare_digest(
+            x_callback_token.encode(),
+            config.ASTROCAST_CALLBACK_TOKEN.encode(),
+        )
+    ):
+        raise HTTPException(status_code=401, detail="Invalid callback token")
+
+    if not isinstance(messages, list):
+        messages = [messages]
+
+    result = await insert_messages(
+        session,
+        [message.model_dump() for message in messages],
+        requested_at=datetime.datetime.utcnow(),
+        checkpoint=None,  # See above, the poller reconciles
     )
+    await session.commit()
+
+    return result
 
-    return astrocast_messages
 
+@router.post("/messages/poll", response_model=AstrocastStatus)
+async def poll_astrocast_messages(
+    astrocast: AstrocastAPI = Depends(get_astrocast_api),
+    leader: LeaderElection = Depends(get_leader_election),
+) -> AstrocastStatus:
+    """Poll the Astrocast API for new messages now
+
+    Only the leader instance polls, on other instances the request is
+    rejected with the leader to send it to.
+    """
 
-@router.get("/devices/{device_id}", response_model=AstrocastDevice)
+    if not astrocast.is_polling_messages:
+        raise HTTPException(
+            status_code=409,
+            detail="Messages are only polled by the leader instance: "
+            f"{await leader.get_leader()}",
+        )
+
+    astrocast.poll_now()
+
+    return astrocast.status.model_copy(
+        update={"is_leader": leader.is_leader, "leader": leader.instance_id}
+    )
+
+
+@router.post(
+    "/messages/backfill",
+    response_model=AstrocastBackfillRead,
+    status_code=202,
+)
+async def backfill_astrocast_messages(
+    backfill: AstrocastBackfillCreate = Body(...),
+    astrocast: AstrocastAPI = Depends(get_astrocast_api),
+) -> AstrocastBackfillRead:
+    """Backfill historical messages from Astrocast over a date range
+
+    Runs in the background. Requesting the same start date again resumes an
+    interrupted backfill from its checkpoint. Only one backfill runs at a
+    time across all workers.
+    """
+
+    try:
+        started = await astrocast.start_backfill(backfill)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if started is None:
+        raise HTTPException(
+            status_code=409,
+            detail="A backfill is already running",
+        )
+
+    return started
+
+
+@router.get("/devices/{device_id}", response_model=AstrocastDeviceRead)
 async def get_astrocast_device(
     session: AsyncSession = Depends(get_session),
     astrocast: AstrocastAPI = Depends(get_astrocast_api),
     *,
     device_id: UUID,
-) -> AstrocastDevice:
-    """Get an astrocast device by its Astrocast GUID"""
-
-    obj = await astrocast.get_device(device_id)
+) -> AstrocastDeviceRead:
+    """Get an astrocast device by its Astrocast GUID
+
+    Served from the local device registry, falling back to the Astrocast API
+    for devices that have not been synced yet.
+    """
+
+    obj = await crud.get_model_by_id(session, model_id=device_id)
+    if obj is None:
+        try:
+            obj = await astrocast.get_cached_device(device_id)
+        except aiohttp.ClientResponseError as e:
+            raise HTTPException(
+                status_code=404 if e.status == 404 else 502,
+                detail=f"Astrocast device {device_id} unavailable: {e.status}",
+            )
 
     return obj
 
 
-@router.get("/devices/", response_model=list[AstrocastDevice])
+@router.get(
+    "/devices/",
+    response_model=list[AstrocastDeviceRead] | list[AstrocastDeviceSummary],
+)
 async def get_astrocast_devices(
     response: Response,
     session: AsyncSession = Depends(get_session),
@@ -127,18 +247,67 @@ async def get_astrocast_devices(
     filter: str = Query(None),
     sort: str = Query(None),
     range: str = Query(None),
-) -> list[AstrocastDevice]:
-    """Get all astrocast messages"""
+    cursor: str = Query(None),
+    limit: int = Query(None),
+) -> list[AstrocastDeviceRead] | list[AstrocastDeviceSummary]:
+    """Get all astrocast devices
+
+    Devices are served from the local device registry, summaries are only
+    available from the Astrocast API.
+    """
+
+    if summary:
+        return await get_astrocast_device_summaries(
+            response,
+            astrocast,
+            filter=filter,
+            sort=sort,
+            range=range,
+        )
+
+    return await crud.get_list(
+        response,
+        session,
+        filter=filter,
+        sort=sort,
+        range=range,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+async def get_astrocast_device_summaries(
+    response: Response,
+    astrocast: AstrocastAPI,
+    *,
+    filter: str | None,
+    sort: str | None,
+    range: str | None,
+) -> list[AstrocastDeviceSummary]:
+    """Get device summaries from Astrocast, filtered and sorted in memory"""
 
     sort = json.loads(sort) if sort else []
     range = json.loads(range) if range else []
     filter = json.loads(filter) if filter else {}
 
-    if summary:
-        # Get summaries from Astrocast API
-        devices = await astrocast.get_device_summaries()
-    else:
-        devices = await astrocast.get_devices()
+    # Copy the cached list as it is sorted and filtered in place below
+    try:
+        devices = list(await astrocast.get_cached_device_summaries())
+    except aiohttp.ClientResponseError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Astrocast device summaries unavailable: {e.status}",
+        )
+
+    # Filter by filter field params ie. {"name":"bar"}
+    for field, value in filter.items():
+        if field == "id":  # Special case for UUID, allow for multiple UUIDs
+            values = value if isinstance(value, list) else [value]
+            devices = [x for x in devices if str(x.id) in values]
+        else:
+            devices = [
+                x for x in devices if str(value) in str(getattr(x, field))
+            ]
 
     # Do a query to satisfy total count for "Content-Range" header
     total_count = len(devices)
@@ -146,36 +315,14 @@ async def get_astrocast_devices(
     # Order list of objects by sort field params ie. ["name","ASC"]
     if len(sort) == 2:
         sort_field, sort_order = sort
-        if sort_order == "ASC":
-            devices.sort(key=lambda x: getattr(x, sort_field))
-        else:
-            devices.sort(key=lambda x: getattr(x, sort_field), reverse=True)
-
-    # Filter by filter field params ie. {"name":"bar"}
-    if len(filter):
-        for field, value in filter.items():
-            if field == "id":  # Special case for UUID
-
-                filtered_devices = []
-                if isinstance(value, list):
-                    for obj_id in value:  # Allow for multiple UUIDs in filter
-                        filtered_devices = [
-                            x for x in devices if str(x.id) == obj_id
-                        ]
-                    devices += filtered_devices
-                else:
-                    devices = [x for x in devices if str(x.id) == value]
-            else:
-                devices = list(
-                    filter(
-                        lambda x: str(value) in str(x[field]),
-                        devices,
-                    )
-                )
+        devices.sort(
+            key=lambda x: getattr(x, sort_field),
+            reverse=sort_order != "ASC",
+        )
 
     if len(range) == 2:
         start, end = range
-        devices = devices[start:end]
+        devices = devices[start : end + 1]
     else:
         start, end = [0, total_count]  # For content-range header
 
@@ -183,4 +330,4 @@ async def get_astrocast_devices(
         f"astrocast_devices {start}-{end}/{total_count}"
     )
 
-    return devices if len(devices) > 0 else []
+    return devices
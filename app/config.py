@@ -10,6 +10,19 @@ class Config(BaseSettings):
     # Sensor settings
     DEFAULT_SENSOR_OUTPUT_RANGE: int = 4096
 
+    # Station data decoding settings
+    STATION_DATA_DECODE_BATCH_SIZE: int = 500  # Messages per batch
+    STATION_DATA_DECODE_INTERVAL_SECONDS: int = 30
+    STATION_DATA_DECODE_LAG_SECONDS: int = 120  # Let ingest commits settle
+    STATION_DATA_DECODE_RETRY_SECONDS: int = 3600  # Doubled on each retry
+    STATION_DATA_DECODE_MAX_ATTEMPTS: int = 5
+
+    # List endpoint settings
+    LIST_COUNT_EXACT_MAX_ROWS: int = 100_000  # Larger tables are estimated
+    LIST_COUNT_CAP: int = 10_000  # Filtered totals of larger tables stop here
+    LIST_COUNT_TABLE_SIZE_TTL_SECONDS: int = 300
+    LIST_CURSOR_MAX_PAGE_SIZE: int = 1000  # Larger cursor pages are rejected
+
     # Postgres settings
     DB_HOST: str | None
     DB_PORT: int = 5432
@@ -25,8 +38,34 @@ class Config(BaseSettings):
     ASTROCAST_API_URL: str | None
     ASTROCAST_API_KEY: str | None
     ASTROCAST_POLLING_INTERVAL_SECONDS: int = 60
+    ASTROCAST_POLLING_MIN_INTERVAL_SECONDS: int = 10  # While messages arrive
+    ASTROCAST_POLLING_MAX_INTERVAL_SECONDS: int = 600  # While polls are empty
+    ASTROCAST_POLLING_BACKOFF_FACTOR: float = 2.0
+    ASTROCAST_POLLING_OVERLAP_SECONDS: int = 60  # Re-read before watermark
     ASTROCAST_RETRY_MIN_WAIT_SECONDS: int = 1
     ASTROCAST_RETRY_MAX_WAIT_SECONDS: int = 5
+    ASTROCAST_INGEST_BATCH_SIZE: int = 1000  # Rows per multi-row INSERT
+    ASTROCAST_CONNECTION_POOL_SIZE: int = 10
+    ASTROCAST_KEEPALIVE_SECONDS: int = 60
+    ASTROCAST_DNS_CACHE_TTL_SECONDS: int = 300
+    ASTROCAST_REQUEST_TIMEOUT_SECONDS: int = 30
+    ASTROCAST_DEVICE_TIMEOUT_SECONDS: int = 2
+    ASTROCAST_MESSAGES_TIMEOUT_SECONDS: int = 15  # Per /messages request
+    ASTROCAST_DEVICE_CACHE_TTL_SECONDS: int = 60
+    ASTROCAST_DEVICE_CACHE_STALE_SECONDS: int = 600  # Served while refreshing
+    ASTROCAST_DEVICE_CACHE_MAX_SIZE: int = 256
+    ASTROCAST_DEVICE_SYNC_INTERVAL_SECONDS: int = 300
+    ASTROCAST_CALLBACK_TOKEN: str | None = None  # X-Callback-Token if set
+    ASTROCAST_BACKFILL_WINDOW_HOURS: int = 24
+    ASTROCAST_BACKFILL_CONCURRENCY: int = 4
+    ASTROCAST_BACKFILL_MAX_ATTEMPTS: int = 5  # Per window
+    ASTROCAST_BACKFILL_LOCK_ID: int = 7_281_002  # Postgres advisory lock key
+    ASTROCAST_BACKFILL_LOCK_FILE: str = (
+        "/tmp/river-api-astrocast-backfill.lock"
+    )
+    ASTROCAST_LEADER_LOCK_ID: int = 7_281_001  # Postgres advisory lock key
+    ASTROCAST_LEADER_LOCK_FILE: str = "/tmp/river-api-astrocast.lock"
+    ASTROCAST_LEADER_RETRY_SECONDS: int = 15
 
     @model_validator(mode="before")
     def dummy_variables_for_testing(cls, values: dict) -> dict:
@@ -1,10 +1,48 @@
-from app.db import get_session, AsyncSession
-from fastapi import Depends, Response
+from app.config import config
+from app.dates import to_naive_utc
+from app.db import Explain, get_session, AsyncSession
+from app.metadata import ModelMetadata, get_model_metadata
+from fastapi import Depends, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
 from sqlmodel import select
 from typing import Any
+from functools import lru_cache
+import base64
+import datetime
 import json
-from sqlalchemy.sql import func
-from sqlalchemy import or_
+import operator
+import time
+from sqlalchemy.sql import func, text
+from sqlalchemy import inspect, or_, tuple_
+from sqlalchemy.orm import noload, raiseload
+
+# Page size of a cursor paginated list when neither limit nor range is given
+CURSOR_PAGE_SIZE = 100
+
+# The filter field searching every searchable field, as in react-admin
+SEARCH_FILTER = "q"
+
+# Filter field suffixes, eg. {"installed_on__gte": "2024-01-01"}
+COMPARISON_OPERATORS = {
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+FILTER_OPERATORS = (*COMPARISON_OPERATORS, "in", "isnull")
+
+# How the total of a list is counted, "auto" chooses by the table size
+COUNT_STRATEGIES = ("auto", "exact", "estimated", "capped")
+
+
+@lru_cache
+def get_type_adapter(
+    annotation: Any,
+) -> TypeAdapter:
+    """Returns the (cached) pydantic validator of a type annotation"""
+
+    return TypeAdapter(annotation)
 
 
 class CRUD:
@@ -14,130 +52,765 @@ class CRUD:
         db_model_read: Any,
         db_model_create: Any,
         db_model_update: Any,
+        relationships: dict[str, Any] | None = None,
+        default_embed: list[str] | None = None,
+        resource_name: str | None = None,
+        count_strategy: str = "auto",
     ):
+        """
+        relationships : dict[str, Any] | None
+            The loader option (eg. selectinload) of each relationship the
+            read model can render, by name
+        default_embed : list[str] | None
+            The relationships to load when a request does not choose with
+            `embed`, all of them by default
+        resource_name : str | None
+            The resource named in the Content-Range header, the table name
+            by default
+        count_strategy : str
+            How list totals are counted, one of COUNT_STRATEGIES, see
+            choose_count_strategy
+        """
         self.db_model = db_model
         self.db_model_read = db_model_read
         self.db_model_create = db_model_create
         self.db_model_update = db_model_update
+        self.relationships = relationships or {}
+        self.resource_name = resource_name or db_model.__tablename__
+        self.default_embed = (
+            default_embed
+            if default_embed is not None
+            else list(self.relationships)
+        )
+        if count_strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Unknown count strategy: {count_strategy}")
+        self.count_strategy = count_strategy
+
+        # Planner estimate of the table size, refreshed every few minutes
+        self.table_size: int | None = None
+        self.table_size_at: float = 0.0
 
     async def __call__(self, *args: Any, **kwds: Any) -> Any:
         pass
 
     @property
-    def exact_match_fields(
+    def metadata(self) -> ModelMetadata:
+        """The introspected metadata of the model, built once per table"""
+
+        return get_model_metadata(self.db_model)
+
+    def parse_value(
         self,
-    ) -> list[str]:
-        """Returns a list of all the UUID fields in the model
-
-        These cannot be performed with a likeness query and must have an
-        exact match.
-
-        """
-        schema = self.db_model.model_json_schema()
-
-        uuid_properties = []
-        for prop_name, prop_details in schema["properties"].items():
-            prop_type = prop_details.get("type")
-            if isinstance(prop_type, list) and "string" in prop_type:
-                any_of_types = prop_details.get("anyOf")
-                if any_of_types:
-                    for any_of_type in any_of_types:
-                        if "string" in any_of_type.get("type", []):
-                            uuid_properties.append(prop_name)
-                            break
-                elif (
-                    "format" in prop_details
-                    and prop_details["format"] == "uuid"
-                ):
-                    uuid_properties.append(prop_name)
-            elif prop_type in ["string", "null"]:  # Allow case when optional
-                if (
-                    "format" in prop_details
-                    and prop_details["format"] == "uuid"
-                ):
-                    uuid_properties.append(prop_name)
-
-        return uuid_properties
-
-    async def get_model_data(
+        field: str,
+        value: Any,
+    ) -> Any:
+        """Returns a JSON value as the Python type of a field of the model
+
+        Parameters are then bound with the column type, eg. a datetime
+        rather than a string, so comparisons can use the column's index.
+        Aware datetimes are converted to naive UTC, as they are stored.
+        Raises a ValueError if the value is not valid for the field.
+        """
+
+        annotation = self.db_model.model_fields[field].annotation
+        value = get_type_adapter(annotation).validate_python(value)
+        if isinstance(value, datetime.datetime):
+            value = to_naive_utc(value)
+
+        return value
+
+    def parse_filter_field(
         self,
-        filter: str,
-        sort: str,
-        range: str,
-        session: AsyncSession = Depends(get_session),
-    ) -> list:
-        """Returns the data of a model with a filter applied
+        field: str,
+    ) -> tuple[str, str | None]:
+        """Returns the field and operator of a filter field param
 
-        Similar to the count query except returns the data instead of the count
+        eg. "installed_on__gte" is ("installed_on", "gte") and "name" is
+        ("name", None). Raises a 400 for fields the model cannot filter by.
         """
 
-        sort = json.loads(sort) if sort else []
-        range = json.loads(range) if range else []
-        filter = json.loads(filter) if filter else {}
+        name, _, operator_name = field.rpartition("__")
+        if name and operator_name in FILTER_OPERATORS:
+            field = name
+        else:
+            operator_name = None
+
+        if (
+            (
+                field not in self.metadata.column_types
+                and field not in self.metadata.relationships
+            )
+            or (
+                operator_name in COMPARISON_OPERATORS
+                and field not in self.metadata.sortable_fields
+            )
+            or (
+                # A relationship is only set or not, see relationship_exists
+                field in self.metadata.relationships
+                and operator_name not in (None, "isnull")
+            )
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot filter {self.resource_name} by {field}"
+                + (f"__{operator_name}" if operator_name else ""),
+            )
+
+        return field, operator_name
+
+    def relationship_exists(
+        self,
+        field: str,
+    ) -> Any:
+        """Returns the condition that a relationship is set (or not empty)"""
+
+        column = getattr(self.db_model, field)
+        if column.property.uselist:
+            return column.any()
+
+        return column.has()
+
+    def parse_filter_values(
+        self,
+        field: str,
+        values: list[Any],
+    ) -> list[Any]:
+        """Returns the values of a filter field param, raising a 400"""
+
+        try:
+            return [self.parse_value(field, value) for value in values]
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid filter value for {field}: {values}",
+            )
+
+    def apply_filter(
+        self,
+        query: Any,
+        filter: dict[str, Any],
+    ) -> Any:
+        """Returns the query with the filter field params applied
+
+        Exact match fields (UUIDs, numbers, dates...) are compared with
+        equality, or IN for multiple values, text fields with a LIKE (any of
+        multiple values), and booleans on relationships check whether the
+        relationship is set. The "q" field searches, see apply_search.
+
+        A field can be suffixed with an operator:
+        - __gt, __gte, __lt, __lte: compare, eg. {"time__gte": "2024-01-01"}
+        - __in: match any of a list of values exactly
+        - __isnull: true for NULL values, false for the others. On a
+          relationship, true where it is not set (or is empty)
+
+        The values are parsed as the field's type, so every condition is a
+        comparison of the column itself that its index can serve.
+        """
+
+        for field, value in filter.items():
+            if field == SEARCH_FILTER:
+                query = self.apply_search(query, value)
+                continue
+
+            field, operator_name = self.parse_filter_field(field)
+            column = getattr(self.db_model, field)
+            values = value if isinstance(value, list) else [value]
 
-        query = select(self.db_model)
-
-        if len(filter):
-            for field, value in filter.items():
-                if field in self.exact_match_fields:
-                    if isinstance(value, list):
-                        # Combine multiple filters with OR
-                        or_conditions = []
-                        for v in value:
-                            or_conditions.append(
-                                getattr(self.db_model, field) == v
-                            )
-
-                        query = query.filter(or_(*or_conditions))
-                    else:
-                        # If it's not a list, apply a simple equality filter
-                        query = query.filter(
-                            getattr(self.db_model, field) == value
-                        )
+            if operator_name == "isnull":
+                try:
+                    isnull = get_type_adapter(bool).validate_python(value)
+                except ValueError:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Invalid filter value for {field}__isnull, "
+                        "expected a boolean",
+                    )
+                if field in self.metadata.relationships:
+                    exists = self.relationship_exists(field)
+                    query = query.filter(~exists if isnull else exists)
                 else:
-                    if isinstance(value, list):
-                        or_conditions = []
-                        for v in value:
-                            or_conditions.append(
-                                getattr(self.db_model, field).like(
-                                    f"%{str(v)}%"
-                                )
-                            )
-
-                        query = query.filter(or_(*or_conditions))
-                    elif isinstance(value, bool):
-                        if value is True:
-                            query = query.filter(
-                                getattr(self.db_model, field).has()
-                            )
-                        else:
-                            query = query.filter(
-                                ~getattr(self.db_model, field).has()
-                            )
-                    else:
-                        # Apply a LIKE filter for string matching
-                        query = query.filter(
-                            getattr(self.db_model, field).like(
-                                f"%{str(value)}%"
-                            )
-                        )
+                    query = query.filter(
+                        column.is_(None) if isnull else column.is_not(None)
+                    )
+            elif operator_name in COMPARISON_OPERATORS:
+                (value,) = self.parse_filter_values(field, [value])
+                query = query.filter(
+                    COMPARISON_OPERATORS[operator_name](column, value)
+                )
+            elif operator_name == "in" or (
+                field in self.metadata.exact_match_fields
+                and isinstance(value, list)
+            ):
+                query = query.filter(
+                    column.in_(self.parse_filter_values(field, values))
+                )
+            elif field in self.metadata.exact_match_fields:
+                (value,) = self.parse_filter_values(field, [value])
+                query = query.filter(column == value)
+            elif field in self.metadata.relationships and isinstance(
+                value, bool
+            ):
+                exists = self.relationship_exists(field)
+                query = query.filter(exists if value else ~exists)
+            elif field in self.metadata.relationships:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Filter {field} with true or false",
+                )
+            else:
+                query = query.filter(
+                    or_(*[column.like(f"%{str(v)}%") for v in values])
+                )
+
+        return query
+
+    def apply_search(
+        self,
+        query: Any,
+        value: str,
+    ) -> Any:
+        """Returns the query filtered to rows containing a text, any case
+
+        The text is searched with ILIKE in the searchable fields, the text
+        columns with a trigram index, so PostgreSQL uses the indexes rather
+        than scanning. On SQLite (tests) ILIKE falls back to lower() LIKE.
+        """
+
+        searchable_fields = sorted(self.metadata.searchable_fields)
+        if not searchable_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot search {self.resource_name}",
+            )
+
+        return query.filter(
+            or_(
+                *[
+                    getattr(self.db_model, field).icontains(
+                        str(value), autoescape=True
+                    )
+                    for field in searchable_fields
+                ]
+            )
+        )
+
+    def parse_embed(
+        self,
+        embed: str | list[str] | None = None,
+    ) -> list[str]:
+        """Returns the relationships to embed, raising a 400 for unknown ones
+
+        embed : str | list[str] | None
+            The relationships to embed, as a list, a JSON list or a comma
+            separated string. Defaults to default_embed
+        """
+
+        if isinstance(embed, str):
+            if embed.startswith("["):
+                embed = json.loads(embed)
+            else:
+                embed = [x.strip() for x in embed.split(",") if x.strip()]
+        if embed is None:
+            embed = self.default_embed
+
+        unknown = set(embed) - set(self.relationships)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot embed: {', '.join(sorted(unknown))}. "
+                f"Choose from: {', '.join(self.relationships)}",
+            )
+
+        return embed
+
+    def loader_options(
+        self,
+        embed: str | list[str] | None = None,
+    ) -> list[Any]:
+        """Returns the loader options of a query embedding some relationships
+
+        The embedded relationships are loaded with their own options, the
+        other renderable relationships are not loaded (see to_read_models),
+        and any other relationship raises if accessed rather than lazy
+        loading.
+
+        embed : str | list[str] | None
+            The relationships to embed, see parse_embed
+        """
+
+        embed = self.parse_embed(embed)
+
+        options = [self.relationships[name] for name in embed]
+        options += [
+            noload(getattr(self.db_model, name))
+            for name in self.relationships
+            if name not in embed
+        ]
+        options.append(raiseload("*"))
+
+        return options
+
+    def to_read_models(
+        self,
+        objs: list[Any],
+        embed: str | list[str] | None = None,
+    ) -> list[Any]:
+        """Returns objects loaded with loader_options as read models
+
+        The relationships that were not embedded are rendered as null, as
+        the empty value of an unloaded relationship would read as "none".
+        """
+
+        omitted = [
+            name
+            for name in self.relationships
+            if name not in self.parse_embed(embed)
+        ]
+
+        reads = []
+        for obj in objs:
+            # Read the loaded attributes only, others would raise (raiseload)
+            unloaded = inspect(obj).unloaded
+            read = self.db_model_read.model_validate(
+                {
+                    name: getattr(obj, name)
+                    for name in self.db_model_read.model_fields
+                    if hasattr(self.db_model, name)
+                    and name not in unloaded
+                    and name not in omitted
+                }
+            )
+            for name in omitted:
+                setattr(read, name, None)
+            reads.append(read)
+
+        return reads
+
+    def apply_sort(
+        self,
+        query: Any,
+        sort: list[str],
+    ) -> Any:
+        """Returns the query ordered by the sort field params
+
+        The iterator breaks ties, so that the pages of a sort are stable.
+        """
 
         if len(sort) == 2:
             sort_field, sort_order = sort
-            if sort_order == "ASC":
-                query = query.order_by(getattr(self.db_model, sort_field))
-            else:
-                query = query.order_by(
-                    getattr(self.db_model, sort_field).desc()
+            column = getattr(self.db_model, sort_field)
+            query = query.order_by(
+                column if sort_order == "ASC" else column.desc()
+            )
+
+        return query.order_by(self.db_model.iterator)
+
+    def encode_cursor(
+        self,
+        sort: list[str],
+        obj: Any,
+    ) -> str:
+        """Returns the opaque cursor of the page that follows an object"""
+
+        position = {
+            "sort": sort,
+            "key": getattr(obj, sort[0]) if len(sort) == 2 else None,
+            "iterator": obj.iterator,
+        }
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(jsonable_encoder(position)).encode()
+        )
+
+        return cursor.decode().rstrip("=")
+
+    def decode_cursor(
+        self,
+        cursor: str,
+        sort: list[str],
+    ) -> tuple[Any, int]:
+        """Returns the (sort key, iterator) position encoded in a cursor
+
+        A cursor is only valid for the sort it was created with.
+        """
+
+        try:
+            position = json.loads(
+                base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            )
+            if position["sort"] != sort:
+                raise ValueError("The cursor was created for another sort")
+            key = position["key"]
+            if key is not None:
+                key = self.parse_value(sort[0], key)
+
+            return key, int(position["iterator"])
+        except (ValueError, KeyError, TypeError, IndexError):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid cursor, use the cursor of the same list and "
+                "sort as returned in X-Next-Cursor",
+            )
+
+    def apply_seek(
+        self,
+        query: Any,
+        sort: list[str],
+        cursor: str | None,
+    ) -> Any:
+        """Returns the query ordered by the sort and seeking past a cursor
+
+        Rather than skipping rows with an OFFSET, the page starts after the
+        (sort key, iterator) of the previous page's last row, which an index
+        on the sort field serves in constant time however deep the page.
+        NULL sort keys come last in ascending order and first in descending
+        order, as PostgreSQL orders them by default.
+        """
+
+        iterator = self.db_model.iterator
+        if len(sort) != 2:
+            query = query.order_by(iterator)
+            if cursor:
+                _, last_iterator = self.decode_cursor(cursor, sort)
+                query = query.where(iterator > last_iterator)
+
+            return query
+
+        sort_field, sort_order = sort
+        if sort_field not in self.metadata.sortable_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot paginate by {sort_field} with a cursor",
+            )
+        column = getattr(self.db_model, sort_field)
+        nullable = sort_field in self.metadata.nullable_fields
+        ascending = sort_order == "ASC"
+        if ascending:
+            query = query.order_by(column.asc().nulls_last(), iterator.asc())
+        else:
+            query = query.order_by(
+                column.desc().nulls_first(), iterator.desc()
+            )
+        if not cursor:
+            return query
+
+        key, last_iterator = self.decode_cursor(cursor, sort)
+        if key is None and ascending:
+            seek = column.is_(None) & (iterator > last_iterator)
+        elif key is None:
+            seek = (column.is_(None) & (iterator < last_iterator)) | (
+                column.is_not(None)
+            )
+        elif ascending:
+            seek = tuple_(column, iterator) > (key, last_iterator)
+            if nullable:
+                seek = seek | column.is_(None)
+        else:
+            seek = tuple_(column, iterator) < (key, last_iterator)
+
+        return query.where(seek)
+
+    async def count(
+        self,
+        session: AsyncSession,
+        filter: dict[str, Any],
+    ) -> int:
+        """Returns the count of a model with a (parsed) filter applied"""
+
+        query = self.apply_filter(
+            select(func.count(self.db_model.iterator)), filter
+        )
+        res = await session.exec(query)
+
+        return res.one()
+
+    async def estimate_table_size(
+        self,
+        session: AsyncSession,
+    ) -> int | None:
+        """Returns the planner's estimate of the number of rows of the table
+
+        Read from pg_class.reltuples, which VACUUM and ANALYZE maintain, and
+        cached for LIST_COUNT_TABLE_SIZE_TTL_SECONDS. None if there is no
+        estimate, on SQLite or if the table was never analyzed.
+        """
+
+        if session.bind.dialect.name != "postgresql":
+            return None
+
+        age = time.monotonic() - self.table_size_at
+        if self.table_size is None or (
+            age >= config.LIST_COUNT_TABLE_SIZE_TTL_SECONDS
+        ):
+            res = await session.exec(
+                text(
+                    "SELECT reltuples::bigint FROM pg_class "
+                    "WHERE oid = to_regclass(:table_name)"
+                ).bindparams(table_name=self.db_model.__tablename__)
+            )
+            reltuples = res.scalar_one_or_none()
+            self.table_size = (
+                reltuples if reltuples is not None and reltuples >= 0 else None
+            )
+            self.table_size_at = time.monotonic()
+
+        return self.table_size
+
+    async def choose_count_strategy(
+        self,
+        session: AsyncSession,
+        filter: dict[str, Any],
+        strategy: str | None = None,
+    ) -> str:
+        """Returns how to count the total of a list
+
+        "auto" counts exactly up to LIST_COUNT_EXACT_MAX_ROWS rows in the
+        table. Above, unfiltered totals are estimated and filtered totals
+        are capped at LIST_COUNT_CAP, as the planner's estimate of a filter
+        can be far off. Estimates are only available on PostgreSQL, other
+        databases count exactly.
+
+        strategy : str | None
+            One of COUNT_STRATEGIES, the CRUD's count_strategy by default
+        """
+
+        strategy = strategy or self.count_strategy
+        if strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Unknown count strategy: {strategy}")
+        if strategy in ("exact", "capped"):
+            return strategy
+
+        table_size = await self.estimate_table_size(session)
+        if table_size is None:
+            return "exact"
+        if strategy == "estimated":
+            return strategy
+        if table_size <= config.LIST_COUNT_EXACT_MAX_ROWS:
+            return "exact"
+
+        return "capped" if filter else "estimated"
+
+    async def count_total(
+        self,
+        session: AsyncSession,
+        filter: dict[str, Any],
+        strategy: str,
+    ) -> tuple[int, str]:
+        """Returns the total of a list counted with a (chosen) strategy
+
+        Returns
+        -------
+        tuple[int, str]
+            The total and its accuracy: "exact", "estimated" or "at-least"
+            when a capped count reached the cap
+        """
+
+        if strategy == "capped":
+            cap = config.LIST_COUNT_CAP
+            matches = (
+                self.apply_filter(select(self.db_model.iterator), filter)
+                .limit(cap + 1)
+                .subquery()
+            )
+            res = await session.exec(select(func.count()).select_from(matches))
+            total_count = res.one()
+            if total_count > cap:
+                return cap, "at-least"
+
+            return total_count, "exact"
+
+        if strategy == "estimated":
+            if not filter:
+                return await self.estimate_table_size(session), "estimated"
+
+            res = await session.exec(
+                Explain(
+                    self.apply_filter(select(self.db_model.iterator), filter)
+                )
+            )
+            plan = res.scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+
+            return int(plan[0]["Plan"]["Plan Rows"]), "estimated"
+
+        return await self.count(session, filter), "exact"
+
+    def set_content_range(
+        self,
+        response: Response,
+        range: list[int],
+        total_count: int,
+        accuracy: str = "exact",
+    ) -> None:
+        """Sets the Content-Range header of a list for react-admin
+
+        X-Total-Count-Accuracy tells whether the total is "exact",
+        "estimated" or a lower bound ("at-least"), eg. to render "~".
+        """
+
+        if len(range) == 2:
+            start, end = range
+        else:
+            start, end = [0, total_count]  # For content-range header
+
+        response.headers["Content-Range"] = (
+            f"{self.resource_name} {start}-{end}/{total_count}"
+        )
+        response.headers["X-Total-Count-Accuracy"] = accuracy
+
+    async def get_list(
+        self,
+        response: Response,
+        session: AsyncSession,
+        *,
+        filter: str | None = None,
+        sort: str | None = None,
+        range: str | None = None,
+        embed: str | list[str] | None = None,
+        cursor: str | None = None,
+        limit: int | None = None,
+    ) -> list[Any]:
+        """Returns a page of a model (as read models) and its Content-Range
+
+        The filter is built once and the total of the matching rows is
+        fetched with the page as a window (count(*) OVER ()), so a list is a
+        single query. Only a page past the end, which has no row to carry
+        the total, costs a separate count. On large tables the total is
+        estimated or capped instead, see choose_count_strategy.
+
+        Parameters
+        ----------
+        filter, sort, range : str | None
+            The react-admin query params as JSON, eg. {"name": "bar"},
+            ["name", "ASC"] and [0, 24] (inclusive)
+        embed : str | list[str] | None
+            The relationships to load, see loader_options
+        cursor : str | None
+            Paginate by cursor instead of range: an empty string for the
+            first page, then the X-Next-Cursor of the previous page
+        limit : int | None
+            The page size of cursor pagination, by default the size of the
+            range or CURSOR_PAGE_SIZE
+        """
+
+        sort = json.loads(sort) if sort else []
+        range = json.loads(range) if range else []
+        filter = json.loads(filter) if filter else {}
+
+        if cursor is not None:
+            if limit is None:
+                limit = (
+                    range[1] - range[0] + 1
+                    if len(range) == 2
+                    else CURSOR_PAGE_SIZE
                 )
 
-        if len(range):
+            return await self.get_cursor_page(
+                response,
+                session,
+                filter=filter,
+                sort=sort,
+                cursor=cursor,
+                limit=limit,
+                embed=embed,
+            )
+
+        strategy = await self.choose_count_strategy(session, filter)
+        if strategy == "exact":
+            query = select(
+                self.db_model, func.count().over().label("total_count")
+            )
+        else:
+            query = select(self.db_model)
+        query = self.apply_sort(self.apply_filter(query, filter), sort)
+        query = query.options(*self.loader_options(embed)).execution_options(
+            populate_existing=True
+        )
+        if len(range) == 2:
             start, end = range
-            query = query.offset(start).limit(end - start)
+            query = query.offset(start).limit(end - start + 1)
 
         res = await session.exec(query)
+        rows = res.all()
+
+        accuracy = "exact"
+        if strategy == "exact":
+            objs = [row[0] for row in rows]
+            if rows:
+                total_count = rows[0].total_count
+            elif len(range) == 2 and start > 0:
+                total_count = await self.count(session, filter)
+            else:
+                total_count = 0
+        elif len(range) != 2:
+            objs = rows
+            total_count = len(rows)
+        elif 0 < len(rows) < end - start + 1:
+            # A short page is the last one, which gives the exact total
+            objs = rows
+            total_count = start + len(rows)
+        else:
+            objs = rows
+            total_count, accuracy = await self.count_total(
+                session, filter, strategy
+            )
+            if rows:
+                # A full page proves at least end + 1 rows, even past the cap
+                # or a stale estimate, so react-admin can page further
+                total_count = max(total_count, end + 1)
+
+        self.set_content_range(response, range, total_count, accuracy)
 
-        return res.all()
+        return self.to_read_models(objs, embed)
+
+    async def get_cursor_page(
+        self,
+        response: Response,
+        session: AsyncSession,
+        *,
+        filter: dict[str, Any],
+        sort: list[str],
+        cursor: str,
+        limit: int,
+        embed: str | list[str] | None = None,
+    ) -> list[Any]:
+        """Returns a page following a cursor and sets the X-Next-Cursor header
+
+        No total is counted, the header is left out on the last page. The
+        limit is bounded by LIST_CURSOR_MAX_PAGE_SIZE, so that one request
+        cannot read a whole table.
+        """
+
+        if limit < 1:
+            raise HTTPException(
+                status_code=400, detail="The limit must be at least 1"
+            )
+        if limit > config.LIST_CURSOR_MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail="The limit must be at most "
+                f"{config.LIST_CURSOR_MAX_PAGE_SIZE}",
+            )
+
+        query = self.apply_seek(
+            self.apply_filter(select(self.db_model), filter), sort, cursor
+        )
+        query = (
+            query.options(*self.loader_options(embed))
+            .execution_options(populate_existing=True)
+            .limit(limit + 1)  # One more row tells if there is a next page
+        )
+
+        res = await session.exec(query)
+        objs = res.all()
+
+        if len(objs) > limit:
+            objs = objs[:limit]
+            response.headers["X-Next-Cursor"] = self.encode_cursor(
+                sort, objs[-1]
+            )
+
+        return self.to_read_models(objs, embed)
 
     async def get_total_count(
         self,
@@ -146,70 +819,22 @@ class CRUD:
         range: str,
         filter: str,
         session: AsyncSession = Depends(get_session),
+        strategy: str | None = None,
     ) -> int:
-        """Returns the count of a model with a filter applied"""
+        """Returns the count of a model with a filter applied
+
+        strategy : str | None
+            One of COUNT_STRATEGIES, the CRUD's count_strategy by default
+        """
 
         filter = json.loads(filter) if filter else {}
         range = json.loads(range) if range else []
 
-        query = select(func.count(self.db_model.iterator))
-        if len(filter):
-            for field, value in filter.items():
-                if field in self.exact_match_fields:
-                    if isinstance(value, list):
-                        # Combine multiple filters with OR
-                        or_conditions = []
-                        for v in value:
-                            or_conditions.append(
-                                getattr(self.db_model, field) == v
-                            )
-
-                        query = query.filter(or_(*or_conditions))
-                    else:
-                        # If it's not a list, apply a simple equality filter
-                        query = query.filter(
-                            getattr(self.db_model, field) == value
-                        )
-                else:
-                    if isinstance(value, list):
-                        or_conditions = []
-                        for v in value:
-                            or_conditions.append(
-                                getattr(self.db_model, field).like(
-                                    f"%{str(v)}%"
-                                )
-                            )
-
-                        query = query.filter(or_(*or_conditions))
-                    elif isinstance(value, bool):
-                        if value is True:
-                            # If true, the field has a value and the value
-                            query = query.filter(
-                                getattr(self.db_model, field).has()
-                            )
-                        else:
-                            query = query.filter(
-                                ~getattr(self.db_model, field).has()
-                            )
-                    else:
-                        # Apply a LIKE filter for string matching
-                        query = query.filter(
-                            getattr(self.db_model, field).like(
-                                f"%{str(value)}%"
-                            )
-                        )
-
-        count = await session.exec(query)
-        total_count = count.one()
-
-        if len(range) == 2:
-            start, end = range
-        else:
-            start, end = [0, total_count]  # For content-range header
-
-        response.headers["Content-Range"] = (
-            f"sensor {start}-{end}/{total_count}"
+        strategy = await self.choose_count_strategy(session, filter, strategy)
+        total_count, accuracy = await self.count_total(
+            session, filter, strategy
         )
+        self.set_content_range(response, range, total_count, accuracy)
 
         return total_count
 
@@ -218,12 +843,20 @@ class CRUD:
         session: AsyncSession,
         *,
         model_id: str,
+        embed: str | list[str] | None = None,
     ) -> Any:
-        """Get a model by id"""
+        """Get a model by id, as its read model (see to_read_models)"""
 
         res = await session.exec(
-            select(self.db_model).where(self.db_model.id == model_id)
+            select(self.db_model)
+            .where(self.db_model.id == model_id)
+            .options(*self.loader_options(embed))
+            .execution_options(populate_existing=True)
         )
         obj = res.one_or_none()
+        if obj is None:
+            return None
+
+        (obj,) = self.to_read_models([obj], embed)
 
         return obj
@@ -0,0 +1,15 @@
+import datetime
+
+
+def to_naive_utc(
+    value: datetime.datetime | None,
+) -> datetime.datetime | None:
+    """Convert an aware datetime to naive UTC, as datetimes are stored
+
+    Naive datetimes are assumed to be UTC already and returned as is.
+    """
+
+    if value is None or value.tzinfo is None:
+        return value
+
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
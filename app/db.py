@@ -3,10 +3,10 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.config import config
 from typing import AsyncGenerator, Any
-from sqlmodel import select
-from sqlalchemy.sql import func
-from fastapi import Depends, Query
-import json
+from sqlalchemy import Index
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
 engine = create_async_engine(
     config.DB_URL,
@@ -26,113 +26,56 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-async def get_nested_model_field_names(
-    schema: dict,
-) -> list[str]:
-    """Returns a list of field names that are nested models"""
+def dialect_insert(
+    session: AsyncSession,
+    model: Any,
+) -> postgresql.Insert | sqlite.Insert:
+    """Returns an INSERT statement for the dialect bound to the session
+
+    The generic insert() does not expose ON CONFLICT clauses, whereas both the
+    PostgreSQL and SQLite (tests) dialect inserts do.
+    """
 
-    nested_model_field_names = []
-    if "$defs" in schema:
-        for field_name, properties in schema.get("properties", {}).items():
-            if "items" in properties:
-                ref = properties["items"].get("$ref")
-                if ref and "#/$defs/" in ref:
-                    nested_model_field_names.append(field_name)
-    return nested_model_field_names
+    if session.bind.dialect.name == "sqlite":
+        return sqlite.insert(model)
 
+    return postgresql.insert(model)
 
-async def get_exact_match_fields(
-    db_model,
-) -> list[str]:
-    """Returns a list of all the UUID fields in the model
 
-    These cannot be performed with a likeness query and must have an
-    exact match.
+def trigram_index(
+    table_name: str,
+    column_name: str,
+) -> Index:
+    """Returns a pg_trgm GIN index of a text column for substring searches
 
+    Unlike a B-tree, it serves LIKE and ILIKE '%value%'. It is only created on
+    PostgreSQL (with the pg_trgm extension), SQLite (tests) scans instead.
     """
-    schema = db_model.model_json_schema()
-
-    uuid_properties = []
-    for prop_name, prop_details in schema["properties"].items():
-        prop_type = prop_details.get("type")
-        if isinstance(prop_type, list) and "string" in prop_type:
-            any_of_types = prop_details.get("anyOf")
-            if any_of_types:
-                for any_of_type in any_of_types:
-                    if "string" in any_of_type.get("type", []):
-                        uuid_properties.append(prop_name)
-                        break
-            elif "format" in prop_details and prop_details["format"] == "uuid":
-                uuid_properties.append(prop_name)
-        elif prop_type in ["string", "null"]:  # Allow case when optional
-            if "format" in prop_details and prop_details["format"] == "uuid":
-                uuid_properties.append(prop_name)
-
-    return uuid_properties
-
-
-async def get_count(
-    model: Any,
-    filter: str = Query(None),
-    session: AsyncSession = Depends(get_session),
-) -> int:
-    """Returns the count of a model with a filter applied"""
-
-    filter = json.loads(filter) if filter else {}
-
-    count_query = select(func.count(model.iterator))
-    exact_match_fields = await get_exact_match_fields(model)
-    if len(filter):
-        for field, value in filter.items():
-            if field in exact_match_fields:
-                if isinstance(value, list):
-                    for v in value:
-                        count_query = count_query.filter(
-                            getattr(model, field) == v
-                        )
-                else:
-                    count_query = count_query.filter(
-                        getattr(model, field) == value
-                    )
-
-    count = await session.exec(count_query)
-    return count.one()
-
-
-async def get_model_data(
-    session: AsyncSession,
-    model: Any,
-    filter: dict,
-    sort: list,
-    range: list,
-) -> list:
-    """Returns the data of a model with a filter applied
-
-    Similar to the count query except returns the data instead of the count"""
-
-    query = select(model)
-    exact_match_fields = await get_exact_match_fields(model)
-
-    if len(filter):
-        for field, value in filter.items():
-            if field in exact_match_fields:
-                if isinstance(value, list):
-                    for v in value:
-                        query = query.filter(getattr(model, field) == v)
-                else:
-                    query = query.filter(getattr(model, field) == value)
-
-    if len(sort) == 2:
-        sort_field, sort_order = sort
-        if sort_order == "ASC":
-            query = query.order_by(getattr(model, sort_field))
-        else:
-            query = query.order_by(getattr(model, sort_field).desc())
-
-    if len(range):
-        start, end = range
-        query = query.offset(start).limit(end - start)
-
-    res = await session.exec(query)
-
-    return res.all()
+
+    return Index(
+        f"ix_{table_name}_{column_name}_trgm",
+        column_name,
+        postgresql_using="gin",
+        postgresql_ops={column_name: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(
+        self,
+        statement: Any,
+    ):
+        """EXPLAIN (FORMAT JSON) of a statement, PostgreSQL only"""
+
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(
+    element: Explain,
+    compiler: Any,
+    **kw: Any,
+) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
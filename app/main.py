@@ -5,7 +5,10 @@ from app.stations.views import router as stations_router
 from app.sensors.views import router as sensor_router
 from app.astrocast.views import router as astrocast_router
 from app.astrocast.classes import astrocast_api
+from app.astrocast.leader import astrocast_leader
+from app.stations.data.services import start_decoding_messages
 from app.db import get_session, AsyncSession
+from app.metadata import build_model_registry
 from app.sensor_parameters.views import router as sensor_parameter_router
 from sqlalchemy.sql import text
 from pydantic import BaseModel
@@ -14,19 +17,45 @@ import asyncio
 import sys
 
 
+def start_astrocast_tasks() -> list[asyncio.Task]:
+    """Start the Astrocast device sync, message polling and decoding loops"""
+
+    return [
+        asyncio.create_task(astrocast_api.start_syncing_devices()),
+        asyncio.create_task(astrocast_api.start_collecting_messages()),
+        asyncio.create_task(start_decoding_messages()),
+    ]
+
+
 @asynccontextmanager
 async def lifespan(
     app: FastAPI,
 ):
     print("Starting up RIVER-API...")
 
-    # Start polling the Astrocast API for messages
+    # Introspect every table once, the filter builders only look it up
+    registry = build_model_registry()
+    print(f"Introspected {len(registry)} tables")
+
+    # Start polling the Astrocast API for messages, only in the process
+    # elected as leader across workers and replicas. Every process serves
+    # devices, so each loads the device type names.
+    tasks = []
     if "pytest" not in sys.modules:
-        asyncio.create_task(astrocast_api.update_device_types())
-        asyncio.create_task(astrocast_api.start_collecting_messages())
+        await astrocast_api.get_client()  # Open the shared HTTP client
+        tasks.append(asyncio.create_task(astrocast_api.update_device_types()))
+        tasks.append(
+            asyncio.create_task(astrocast_leader.run(start_astrocast_tasks))
+        )
 
     yield
 
+    print("Shutting down RIVER-API...")
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await astrocast_api.close()
+
 
 app = FastAPI(
     lifespan=lifespan,
@@ -47,6 +76,9 @@ class HealthCheck(BaseModel):
     """Response model to validate and return when performing a health check."""
 
     status: str = "OK"
+    instance_id: str | None = None
+    is_leader: bool = False  # If this instance polls Astrocast
+    leader: str | None = None  # The instance id of the polling leader
 
 
 @app.get(
@@ -68,7 +100,12 @@ async def get_health(
     # Test liveness to DB by executing a simple query
     await session.exec(text("SELECT 1"))
 
-    return HealthCheck(status="OK")
+    return HealthCheck(
+        status="OK",
+        instance_id=astrocast_leader.instance_id,
+        is_leader=astrocast_leader.is_leader,
+        leader=await astrocast_leader.get_leader(),
+    )
 
 
 app.include_router(
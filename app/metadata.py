@@ -0,0 +1,87 @@
+from sqlalchemy import inspect
+from sqlalchemy.types import JSON, Enum, String, TypeDecorator, TypeEngine
+from sqlmodel.main import default_registry
+from sqlmodel.sql.sqltypes import AutoString
+from functools import lru_cache
+from typing import Any
+
+
+def is_text_type(
+    column_type: TypeEngine,
+) -> bool:
+    """Whether a column stores free text (GUIDs decorate CHAR but are not)"""
+
+    if isinstance(column_type, AutoString):
+        return True
+    if isinstance(column_type, (TypeDecorator, Enum)):
+        return False
+
+    return isinstance(column_type, String)
+
+
+class ModelMetadata:
+    def __init__(
+        self,
+        db_model: Any,
+    ):
+        """Introspected description of a SQLModel table used by the queries
+
+        Built from the SQLAlchemy mapper rather than the JSON schema, so the
+        classification follows the column types stored in the database.
+
+        db_model : Any
+            The SQLModel table class
+        """
+
+        mapper = inspect(db_model)
+
+        self.db_model = db_model
+        self.column_types: dict[str, TypeEngine] = {
+            column.key: column.type for column in mapper.columns
+        }
+
+        # Text columns can be matched by likeness, other columns (UUIDs,
+        # numbers, dates...) must match exactly. JSON columns are neither.
+        self.like_fields = frozenset(
+            name
+            for name, column_type in self.column_types.items()
+            if is_text_type(column_type)
+        )
+        self.exact_match_fields = frozenset(
+            name
+            for name, column_type in self.column_types.items()
+            if not is_text_type(column_type)
+            and not isinstance(column_type, JSON)
+        )
+        self.sortable_fields = self.like_fields | self.exact_match_fields
+        self.nullable_fields = frozenset(
+            column.key for column in mapper.columns if column.nullable
+        )
+        self.relationships = frozenset(mapper.relationships.keys())
+
+        # Text columns with a trigram index, which serve substring searches
+        self.searchable_fields = frozenset(
+            column.key
+            for index in mapper.local_table.indexes
+            if "gin_trgm_ops"
+            in index.dialect_options["postgresql"]["ops"].values()
+            for column in index.columns
+        )
+
+
+@lru_cache
+def get_model_metadata(
+    db_model: Any,
+) -> ModelMetadata:
+    """Returns the metadata of a table, introspected on first use"""
+
+    return ModelMetadata(db_model)
+
+
+def build_model_registry() -> dict[str, ModelMetadata]:
+    """Introspect every mapped SQLModel table up front, eg. at startup"""
+
+    return {
+        mapper.class_.__name__: get_model_metadata(mapper.class_)
+        for mapper in default_registry.mappers
+    }
@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship, UniqueConstraint
 from uuid import uuid4, UUID
+from app.db import trigram_index
 from typing import TYPE_CHECKING
 from typing import Any
 
@@ -23,7 +24,11 @@ class SensorParameterBase(SQLModel):
 
 
 class SensorParameter(SensorParameterBase, table=True):
-    __table_args__ = (UniqueConstraint("id"),)
+    __table_args__ = (
+        UniqueConstraint("id"),
+        trigram_index("sensorparameter", "name"),
+        trigram_index("sensorparameter", "acronym"),
+    )
     iterator: int = Field(
         default=None,
         nullable=False,
@@ -46,7 +51,7 @@ class SensorParameterCreate(SensorParameterBase):
 
 class SensorParameterRead(SensorParameterBase):
     id: UUID
-    sensors: list[Any] = []
+    sensors: list[Any] | None = []  # None if not embedded
 
 
 class SensorParameterReadWithoutSensors(SensorParameterBase):
@@ -8,6 +8,7 @@ from app.sensor_parameters.models import (
 from app.db import get_session, AsyncSession
 from fastapi import Depends, APIRouter, Query, Response, HTTPException
 from sqlmodel import select
+from sqlalchemy.orm import selectinload
 from uuid import UUID
 from typing import Any
 import json
@@ -19,41 +20,34 @@ crud = CRUD(
     SensorParameterRead,
     SensorParameterCreate,
     SensorParameterUpdate,
+    relationships={
+        "sensors": selectinload(SensorParameter.sensors).raiseload("*"),
+    },
 )
 
 
 async def get_data(
+    response: Response,
     filter: str = Query(None),
     sort: str = Query(None),
     range: str = Query(None),
+    cursor: str = Query(None),
+    limit: int = Query(None),
+    embed: str = Query(None),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await crud.get_model_data(
-        sort=sort,
-        range=range,
+    res = await crud.get_list(
+        response,
+        session,
         filter=filter,
-        session=session,
-    )
-
-    return res
-
-
-async def get_count(
-    response: Response,
-    filter: str = Query(None),
-    range: str = Query(None),
-    sort: str = Query(None),
-    session: AsyncSession = Depends(get_session),
-):
-    count = await crud.get_total_count(
-        response=response,
         sort=sort,
         range=range,
-        filter=filter,
-        session=session,
+        embed=embed,
+        cursor=cursor,
+        limit=limit,
     )
 
-    return count
+    return res
 
 
 @router.get("/{sensorparameter_id}", response_model=SensorParameterRead)
@@ -61,23 +55,20 @@ async def get_sensor_parameter(
     session: AsyncSession = Depends(get_session),
     *,
     sensorparameter_id: UUID,
+    embed: str = Query(None),
 ) -> SensorParameterRead:
     """Get an sensorparameter by id"""
 
-    res = await session.exec(
-        select(SensorParameter).where(SensorParameter.id == sensorparameter_id)
+    obj = await crud.get_model_by_id(
+        session, model_id=sensorparameter_id, embed=embed
     )
 
-    obj = res.one_or_none()
-
     return obj
 
 
 @router.get("", response_model=list[SensorParameterRead])
 async def get_all_sensor_parameter(
-    response: Response,
     objs: CRUD = Depends(get_data),
-    total_count: int = Depends(get_count),
 ) -> list[SensorParameterRead]:
     """Get all sensor parameter"""
 
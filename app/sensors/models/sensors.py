@@ -7,6 +7,7 @@ from sqlmodel import (
     Column,
 )
 from uuid import uuid4, UUID
+from app.db import trigram_index
 from typing import TYPE_CHECKING
 from app.stations.models import StationSensorAssignments
 from app.sensors.models.calibrations import (
@@ -45,6 +46,9 @@ class Sensor(SensorBase, table=True):
             "field_id",
             name="unique_sensor_field_id",
         ),
+        trigram_index("sensor", "serial_number"),
+        trigram_index("sensor", "model"),
+        trigram_index("sensor", "field_id"),
     )
     iterator: int = Field(
         default=None,
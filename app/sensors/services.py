@@ -0,0 +1,261 @@
+from app.db import AsyncSession
+from app.sensors.models import Sensor
+from app.stations.models import Station, StationSensorAssignments
+from sqlmodel import select
+from sqlalchemy import DateTime, case, tuple_, type_coerce
+from sqlalchemy.sql import func
+from typing import Any
+from uuid import UUID
+import datetime
+import numpy as np
+
+CALIBRATION_KEYS = ("slope", "intercept", "min_range", "max_range")
+
+
+def parse_calibration_date(
+    value: str | datetime.datetime,
+) -> datetime.datetime:
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+
+    return value.replace(tzinfo=None)
+
+
+class CalibrationIndex:
+    def __init__(
+        self,
+        calibrations: list[dict] | None,
+    ):
+        """Point-in-time lookup of the calibrations of a sensor
+
+        The calibrations are sorted once by calibrated_on, after which the
+        calibration that applied at any time (the latest calibrated on or
+        before it) is found with a binary search.
+
+        calibrations : list[dict] | None
+            The calibrations as stored in Sensor.calibrations
+        """
+
+        self.source = calibrations or []
+
+        entries = sorted(
+            (
+                (parse_calibration_date(x["calibrated_on"]), x)
+                for x in self.source
+            ),
+            key=lambda x: x[0],
+        )
+        self.calibrations = [x for _, x in entries]
+        self.calibrated_on = np.array(
+            [x for x, _ in entries], dtype="datetime64[us]"
+        )
+        self.parameters = np.array(
+            [
+                [x.get(key, np.nan) for key in CALIBRATION_KEYS]
+                for x in self.calibrations
+            ],
+            dtype=np.float64,
+        ).reshape(-1, len(CALIBRATION_KEYS))
+
+    def __len__(self) -> int:
+        return len(self.calibrations)
+
+    def lookup(
+        self,
+        timestamps: np.ndarray | list[datetime.datetime],
+    ) -> np.ndarray:
+        """Get the position of the calibration applied at each timestamp
+
+        Returns
+        -------
+        np.ndarray
+            The index into calibrations of each timestamp, -1 where the
+            timestamp predates the first calibration
+        """
+
+        timestamps = np.asarray(timestamps, dtype="datetime64[us]")
+
+        return np.searchsorted(self.calibrated_on, timestamps, "right") - 1
+
+    def parameters_at(
+        self,
+        timestamps: np.ndarray | list[datetime.datetime],
+    ) -> np.ndarray:
+        """Get the calibration parameters applied at each timestamp
+
+        Returns
+        -------
+        np.ndarray
+            An array of (slope, intercept, min_range, max_range) for each
+            timestamp, NaN where no calibration applied
+        """
+
+        indexes = self.lookup(timestamps)
+        parameters = np.full(
+            (len(indexes), len(CALIBRATION_KEYS)), np.nan, dtype=np.float64
+        )
+        found = indexes >= 0
+        parameters[found] = self.parameters[indexes[found]]
+
+        return parameters
+
+    def at(
+        self,
+        timestamp: datetime.datetime,
+    ) -> dict | None:
+        """Get the calibration applied at a single timestamp"""
+
+        index = int(self.lookup([timestamp])[0])
+
+        return self.calibrations[index] if index >= 0 else None
+
+
+class CalibrationIndexCache:
+    def __init__(self):
+        """Calibration indexes of each sensor, built once and reused
+
+        An index is rebuilt when its sensor's calibrations differ from the
+        ones it was built from, so changes made by other workers are picked
+        up. Changes made through this worker invalidate the index directly.
+        """
+
+        self.indexes: dict[UUID, CalibrationIndex] = {}
+
+    async def get_many(
+        self,
+        session: AsyncSession,
+        sensor_ids: set[UUID],
+    ) -> dict[UUID, CalibrationIndex]:
+        """Get the calibration indexes of a set of sensors"""
+
+        if not sensor_ids:
+            return {}
+
+        res = await session.exec(
+            select(Sensor.id, Sensor.calibrations).where(
+                Sensor.id.in_(sensor_ids)
+            )
+        )
+
+        indexes = {}
+        for sensor_id, calibrations in res.all():
+            index = self.indexes.get(sensor_id)
+            if index is None or index.source != (calibrations or []):
+                index = CalibrationIndex(calibrations)
+                self.indexes[sensor_id] = index
+            indexes[sensor_id] = index
+
+        return indexes
+
+    def invalidate(
+        self,
+        sensor_id: UUID | None = None,
+    ) -> None:
+        """Drop the index of a sensor, or of all sensors"""
+
+        if sensor_id is None:
+            self.indexes.clear()
+        else:
+            self.indexes.pop(sensor_id, None)
+
+
+calibration_indexes = CalibrationIndexCache()
+
+
+async def get_assignment_histories(
+    session: AsyncSession,
+    sensor_ids: set[UUID],
+) -> dict[UUID, list[dict[str, Any]]]:
+    """Get the station assignment history of each of a set of sensors
+
+    Only the station positions the sensors occupied are read. An assignment
+    ends ("to") at the next assignment of its position, or when its sensor
+    is installed elsewhere, whichever is first, computed with LEAD().
+
+    Returns
+    -------
+    dict[UUID, list[dict[str, Any]]]
+        The assignments of each sensor by descending "from" date
+    """
+
+    if not sensor_ids:
+        return {}
+
+    occupied_positions = select(
+        StationSensorAssignments.station_id,
+        StationSensorAssignments.sensor_position,
+    ).where(StationSensorAssignments.sensor_id.in_(sensor_ids))
+
+    order_by = (
+        StationSensorAssignments.installed_on,
+        StationSensorAssignments.iterator,
+    )
+    timeline = (
+        select(
+            StationSensorAssignments.station_id,
+            StationSensorAssignments.sensor_position,
+            StationSensorAssignments.sensor_id,
+            StationSensorAssignments.installed_on,
+            func.lead(StationSensorAssignments.installed_on)
+            .over(
+                partition_by=(
+                    StationSensorAssignments.station_id,
+                    StationSensorAssignments.sensor_position,
+                ),
+                order_by=order_by,
+            )
+            .label("replaced_on"),
+            func.lead(StationSensorAssignments.installed_on)
+            .over(
+                partition_by=StationSensorAssignments.sensor_id,
+                order_by=order_by,
+            )
+            .label("moved_on"),
+        )
+        .where(
+            tuple_(
+                StationSensorAssignments.station_id,
+                StationSensorAssignments.sensor_position,
+            ).in_(occupied_positions)
+        )
+        .subquery()
+    )
+
+    res = await session.exec(
+        select(
+            timeline.c.sensor_id,
+            timeline.c.installed_on,
+            type_coerce(
+                case(
+                    (timeline.c.moved_on.is_(None), timeline.c.replaced_on),
+                    (timeline.c.replaced_on.is_(None), timeline.c.moved_on),
+                    (
+                        timeline.c.moved_on < timeline.c.replaced_on,
+                        timeline.c.moved_on,
+                    ),
+                    else_=timeline.c.replaced_on,
+                ),
+                DateTime,
+            ).label("to"),
+            timeline.c.station_id,
+            Station.name,
+            timeline.c.sensor_position,
+        )
+        .join(Station, Station.id == timeline.c.station_id)
+        .where(timeline.c.sensor_id.in_(sensor_ids))
+        .order_by(timeline.c.installed_on.desc())
+    )
+
+    histories = {sensor_id: [] for sensor_id in sensor_ids}
+    for row in res.all():
+        histories[row.sensor_id].append(
+            {
+                "from": row.installed_on,
+                "to": row.to,
+                "station_id": row.station_id,
+                "station_name": row.name,
+                "sensor_position": row.sensor_position,
+            }
+        )
+
+    return histories
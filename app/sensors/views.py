@@ -4,36 +4,32 @@ from app.sensors.models import (
     SensorCreate,
     SensorUpdate,
 )
-from app.stations.models import StationSensorAssignments
 from app.stations.models.station import Station
 from app.db import get_session, AsyncSession
 from fastapi import Depends, APIRouter, Query, Response, HTTPException
 from sqlmodel import select
+from sqlalchemy.orm import selectinload
 from uuid import UUID
 from typing import Any
 from app.crud import CRUD
+from app.stations.services import get_current_assignments
+from app.sensors.services import (
+    calibration_indexes,
+    get_assignment_histories,
+)
 from app.utils import generate_random_id
 
 router = APIRouter()
-crud = CRUD(Sensor, SensorRead, SensorCreate, SensorUpdate)
-
-
-async def get_count(
-    response: Response,
-    filter: str = Query(None),
-    range: str = Query(None),
-    sort: str = Query(None),
-    session: AsyncSession = Depends(get_session),
-):
-    count = await crud.get_total_count(
-        response=response,
-        sort=sort,
-        range=range,
-        filter=filter,
-        session=session,
-    )
-
-    return count
+crud = CRUD(
+    Sensor,
+    SensorRead,
+    SensorCreate,
+    SensorUpdate,
+    relationships={
+        "parameter": selectinload(Sensor.parameter).raiseload("*"),
+        "station_link": selectinload(Sensor.station_link).raiseload("*"),
+    },
+)
 
 
 async def get_current_assignment_property(
@@ -41,37 +37,25 @@ async def get_current_assignment_property(
     session: AsyncSession = Depends(get_session),
 ) -> SensorRead:
 
-    sensor = SensorRead.model_validate(sensor)
+    (sensor,) = await get_current_assignment_properties([sensor], session)
 
-    # If the sensor has a station_link, get the most recent by installed_on
-    if sensor.station_link:
-        print(sensor.station_link)
-        station_link = sensor.station_link
-        station_link = sorted(
-            station_link, key=lambda x: x.installed_on, reverse=True
-        )
+    return sensor
 
-        # Query the station for the current assignment at the position in the
-        # station link
-        query = await session.exec(
-            select(StationSensorAssignments)
-            .where(
-                StationSensorAssignments.station_id
-                == station_link[0].station_id
-            )
-            .where(
-                StationSensorAssignments.sensor_position
-                == station_link[0].sensor_position
-            )
-            .order_by(StationSensorAssignments.installed_on.desc())
-            .limit(1)
-        )
-        station_assingment_res = query.one_or_none()
 
-        if station_assingment_res.sensor_id == sensor.id:
-            sensor.current_assignment = station_link[0]
+async def get_current_assignment_properties(
+    sensors: list[Sensor],
+    session: AsyncSession = Depends(get_session),
+) -> list[SensorRead]:
+    """Set the current assignment of a list of sensors in one query"""
+
+    sensors = [SensorRead.model_validate(sensor) for sensor in sensors]
+    current_assignments = await get_current_assignments(
+        session, {sensor.id for sensor in sensors}
+    )
+    for sensor in sensors:
+        sensor.current_assignment = current_assignments.get(sensor.id)
 
-    return sensor
+    return sensors
 
 
 async def get_historical_assignments(
@@ -81,99 +65,45 @@ async def get_historical_assignments(
     """Returns a list of historical assignments with from and to dates"""
     sensor = SensorRead.model_validate(sensor)
 
-    if sensor.station_link:
-        # Query all assignments for the sensor, including where sensor_id is None
-        query = await session.exec(
-            select(StationSensorAssignments, Station.name)
-            .where(
-                (StationSensorAssignments.sensor_id == sensor.id)
-                | (StationSensorAssignments.sensor_id == None)
-            )
-            .join(Station, StationSensorAssignments.station_id == Station.id)
-            .order_by(StationSensorAssignments.installed_on.asc())
-        )
-        assignments = query.all()
-
-        # Process the assignments to include "to" dates
-        history = []
-        previous_assignment = None
-
-        for i, (assignment, station_name) in enumerate(assignments):
-            if previous_assignment:
-                if (
-                    assignment.sensor_id is None
-                    or assignment.sensor_id != sensor.id
-                ) and assignment.sensor_position == previous_assignment[
-                    "sensor_position"
-                ]:
-                    # Set "to" date if the next assignment is a removal or different sensor assignment at the same position
-                    previous_assignment["to"] = assignment.installed_on
-
-                elif (
-                    assignment.sensor_id == sensor.id
-                    and assignment.sensor_position
-                    != previous_assignment["sensor_position"]
-                ):
-                    # Set "to" date if the sensor is moved to a different position within the same station
-                    previous_assignment["to"] = assignment.installed_on
-
-            if assignment.sensor_id == sensor.id:
-                history.append(
-                    {
-                        "from": assignment.installed_on,
-                        "to": None,  # Initialize to None, will be set by the next iteration
-                        "station_id": assignment.station_id,
-                        "station_name": station_name,
-                        "sensor_position": assignment.sensor_position,
-                    }
-                )
-                previous_assignment = history[-1]
-            elif assignment.sensor_id is None and previous_assignment:
-                # This indicates the sensor was removed from its position
-                if (
-                    assignment.sensor_position
-                    == previous_assignment["sensor_position"]
-                ):
-                    previous_assignment["to"] = assignment.installed_on
-                    previous_assignment = None  # Reset previous assignment
-
-        # If the last assignment is still active, its "to" date should remain None
-        if previous_assignment and previous_assignment["to"] is None:
-            previous_assignment["to"] = (
-                None  # Ensure it's explicitly set to None
-            )
-
-        # Sort history by "from" date descending
-        sensor.history = sorted(history, key=lambda x: x["from"], reverse=True)
+    # Queried by id, as station_link may not have been embedded
+    histories = await get_assignment_histories(session, {sensor.id})
+    sensor.history = histories[sensor.id] or None
 
     return sensor
 
 
 async def get_data(
+    response: Response,
     filter: str = Query(None),
     sort: str = Query(None),
     range: str = Query(None),
+    cursor: str = Query(None),
+    limit: int = Query(None),
+    embed: str = Query(None),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await crud.get_model_data(
+    res = await crud.get_list(
+        response,
+        session,
+        filter=filter,
         sort=sort,
         range=range,
-        filter=filter,
-        session=session,
+        embed=embed,
+        cursor=cursor,
+        limit=limit,
     )
-    updated_sensors = []
-    for sensor in res:
-        sensor = await get_current_assignment_property(sensor, session=session)
-        updated_sensors.append(sensor)
 
-    return updated_sensors
+    return await get_current_assignment_properties(res, session=session)
 
 
 async def get_one(
     sensor_id: UUID,
+    embed: str = Query(None),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await crud.get_model_by_id(model_id=sensor_id, session=session)
+    res = await crud.get_model_by_id(
+        model_id=sensor_id, session=session, embed=embed
+    )
 
     obj = await get_current_assignment_property(res, session=session)
     obj = await get_historical_assignments(obj, session=session)
@@ -181,6 +111,17 @@ async def get_one(
     return obj
 
 
+@router.get("/history", response_model=dict[UUID, list[dict[str, Any]]])
+async def get_sensor_histories(
+    session: AsyncSession = Depends(get_session),
+    *,
+    ids: list[UUID] = Query(...),
+) -> dict[UUID, list[dict[str, Any]]]:
+    """Get the assignment history of many sensors by id"""
+
+    return await get_assignment_histories(session, set(ids))
+
+
 @router.get("/{sensor_id}", response_model=SensorRead)
 async def get_sensor(
     obj: CRUD = Depends(get_one),
@@ -192,9 +133,7 @@ async def get_sensor(
 
 @router.get("", response_model=list[SensorRead])
 async def get_all_sensors(
-    response: Response,
     sensors: CRUD = Depends(get_data),
-    total_count: int = Depends(get_count),
 ) -> list[SensorRead]:
     """Get all sensor data"""
 
@@ -253,6 +192,9 @@ async def update_sensor(
     await session.commit()
     await session.refresh(obj)
 
+    if "calibrations" in update_data:
+        calibration_indexes.invalidate(sensor_id)
+
     return obj
 
 
@@ -268,5 +210,6 @@ async def delete_sensor(
 
     await session.delete(obj)
     await session.commit()
+    calibration_indexes.invalidate(sensor_id)
 
     return {"ok": True}
@@ -54,21 +54,34 @@ class StationDataBase(SQLModel):
         foreign_key="sensor.id",
     )
 
+    recorded_at: datetime.datetime | None = Field(
+        None,
+        index=True,
+        description="When the measurement was taken, from the message data",
+    )
+
     # Correction parameter information
     last_corrected_at: datetime.datetime = Field(
         ...,
         index=True,
         description="When the data was last updated from calibration parameters",
     )
-    calibration_parameters: SensorCalibrationCreate = Field(
-        ...,
+    calibration_parameters: SensorCalibrationCreate | None = Field(
+        None,
         description="The calibration parameters used to correct the raw value",
         sa_column=Column(JSON),
     )
 
 
 class StationData(StationDataBase, table=True):
-    __table_args__ = (UniqueConstraint("id"),)
+    __table_args__ = (
+        UniqueConstraint("id"),
+        UniqueConstraint(  # A message is decoded once per station sensor
+            "astrocast_message_id",
+            "station_sensor_id",
+            name="station_data_message_sensor_constraint",
+        ),
+    )
     iterator: int = Field(
         default=None,
         nullable=False,
@@ -139,3 +152,36 @@ class ControlMessage(ControlMessageBase, table=True):
         index=True,
         nullable=False,
     )
+
+
+class UndecodedMessage(SQLModel, table=True):
+    """An Astrocast message the decoder did not decode into StationData
+
+    Messages that may decode later (no station yet, no sensor assigned at the
+    time) are retried with a doubling backoff until their attempts run out,
+    messages without usable data are only recorded. Assignment changes queue
+    the station's messages again.
+    """
+
+    __table_args__ = (
+        UniqueConstraint(
+            "astrocast_message_id", name="undecoded_message_constraint"
+        ),
+    )
+    iterator: int = Field(
+        default=None,
+        nullable=False,
+        primary_key=True,
+        index=True,
+    )
+    astrocast_message_id: UUID = Field(
+        ...,
+        foreign_key="astrocastmessage.id",
+    )
+    reason: str = Field(nullable=False)
+    attempts: int = Field(default=1, nullable=False)
+    last_attempted_at: datetime.datetime = Field(nullable=False)
+    next_attempt_at: datetime.datetime | None = Field(  # None if not retried
+        default=None,
+        index=True,
+    )
@@ -0,0 +1,416 @@
+from app.astrocast.models import AstrocastMessage
+from app.astrocast.utils import (
+    get_iterator_checkpoint,
+    advance_iterator_checkpoint,
+)
+from app.config import config
+from app.db import AsyncSession, async_session, dialect_insert
+from app.sensors.services import CALIBRATION_KEYS, calibration_indexes
+from app.stations.models import Station
+from app.stations.data.models import StationData, UndecodedMessage
+from app.stations.services import AssignmentResolver
+from app.stations.utils import calibrate_raw_values
+from app.utils import decode_payloads
+from sqlmodel import select, update, delete
+from sqlalchemy.sql import func, literal
+from uuid import UUID, uuid4
+import asyncio
+import datetime
+import numpy as np
+
+DECODER_CHECKPOINT = "station_data_decoder"
+
+# Why a message was not decoded into any StationData
+UNDECODED_NO_STATION = "no_station"
+UNDECODED_UNASSIGNED = "unassigned_position"
+UNDECODED_NO_DATA = "no_data"
+UNDECODED_BAD_PAYLOAD = "bad_payload"
+UNDECODED_REASSIGNED = "reassigned"  # Queued again on an assignment change
+RETRIED_REASONS = (
+    UNDECODED_NO_STATION,
+    UNDECODED_UNASSIGNED,
+    UNDECODED_REASSIGNED,
+)
+
+
+async def get_stations_by_device(
+    session: AsyncSession,
+    device_guids: set[UUID],
+) -> dict[str, UUID]:
+    """Map (lowercase) Astrocast device GUIDs to their station id"""
+
+    res = await session.exec(
+        select(Station.id, Station.associated_astrocast_device).where(
+            func.lower(Station.associated_astrocast_device).in_(
+                [str(x).lower() for x in device_guids]
+            )
+        )
+    )
+
+    return {device.lower(): station_id for station_id, device in res.all()}
+
+
+async def get_retry_times(
+    session: AsyncSession,
+    reasons: dict[UUID, str],
+    attempted_at: datetime.datetime,
+) -> list[dict]:
+    """Schedule the next attempt of each message the decoder skipped
+
+    Messages that may decode later are retried after a delay that doubles
+    with each attempt, until STATION_DATA_DECODE_MAX_ATTEMPTS. The others are
+    recorded without a next attempt.
+    """
+
+    if not reasons:
+        return []
+
+    res = await session.exec(
+        select(
+            UndecodedMessage.astrocast_message_id, UndecodedMessage.attempts
+        ).where(UndecodedMessage.astrocast_message_id.in_(list(reasons)))
+    )
+    previous_attempts = dict(res.all())
+
+    rows = []
+    for message_id, reason in reasons.items():
+        attempts = previous_attempts.get(message_id, 0) + 1
+        next_attempt_at = None
+        if (
+            reason in RETRIED_REASONS
+            and attempts < config.STATION_DATA_DECODE_MAX_ATTEMPTS
+        ):
+            next_attempt_at = attempted_at + datetime.timedelta(
+                seconds=config.STATION_DATA_DECODE_RETRY_SECONDS
+                * 2 ** (attempts - 1)
+            )
+        rows.append(
+            {
+                "astrocast_message_id": message_id,
+                "reason": reason,
+                "attempts": attempts,
+                "last_attempted_at": attempted_at,
+                "next_attempt_at": next_attempt_at,
+            }
+        )
+
+    return rows
+
+
+async def retry_undecoded_messages(
+    session: AsyncSession,
+    station_ids: set[UUID],
+    since: datetime.datetime | None = None,
+) -> None:
+    """Retry the messages of stations on the next decoder batches
+
+    Called when a station's device or sensor assignments change. Skipped
+    messages that may decode now are retried, even once their retries ran
+    out. With `since` (the installation date of a changed assignment), all
+    the stations' messages created since then are also queued, so that
+    messages decoded before the assignment existed gain its rows.
+    """
+
+    res = await session.exec(
+        select(Station.associated_astrocast_device).where(
+            Station.id.in_(station_ids),
+            Station.associated_astrocast_device.is_not(None),
+        )
+    )
+    device_guids = []
+    for device in res.all():
+        try:
+            device_guids.append(UUID(device))
+        except ValueError:
+            continue
+    if not device_guids:
+        return
+
+    now = datetime.datetime.utcnow()
+    device_messages = select(AstrocastMessage.id).where(
+        AstrocastMessage.deviceGuid.in_(device_guids)
+    )
+    await session.exec(
+        update(UndecodedMessage)
+        .where(
+            UndecodedMessage.reason.in_(RETRIED_REASONS),
+            UndecodedMessage.astrocast_message_id.in_(device_messages),
+        )
+        .values(next_attempt_at=now, attempts=0)
+    )
+
+    if since is not None:
+        query = dialect_insert(session, UndecodedMessage).from_select(
+            [
+                "astrocast_message_id",
+                "reason",
+                "attempts",
+                "last_attempted_at",
+                "next_attempt_at",
+            ],
+            select(
+                AstrocastMessage.id,
+                literal(UNDECODED_REASSIGNED),
+                literal(0),
+                literal(now),
+                literal(now),
+            ).where(
+                AstrocastMessage.deviceGuid.in_(device_guids),
+                AstrocastMessage.createdDate >= since,
+            ),
+        )
+        await session.execute(
+            query.on_conflict_do_update(
+                index_elements=["astrocast_message_id"],
+                set_={
+                    "reason": query.excluded.reason,
+                    "attempts": query.excluded.attempts,
+                    "next_attempt_at": query.excluded.next_attempt_at,
+                },
+            )
+        )
+
+
+async def decode_messages(
+    session: AsyncSession,
+    batch_size: int = config.STATION_DATA_DECODE_BATCH_SIZE,
+) -> int:
+    """Decode the next batch of stored Astrocast messages into StationData
+
+    New messages are read in insertion order after the decoder's checkpoint,
+    up to the first one requested in the last STATION_DATA_DECODE_LAG_SECONDS,
+    so that messages still being committed by a concurrent ingest are not
+    stepped over. Messages that yield no StationData are recorded as
+    UndecodedMessage, and retried in the same batches once due.
+
+    The station, sensor position and calibration context is resolved once for
+    the whole batch, and the resulting rows are bulk inserted. Rows that
+    already exist for a message and station sensor are skipped, so a batch can
+    safely be decoded again. The caller owns the transaction, the checkpoint
+    and the retry schedule are committed with the rows.
+
+    Returns
+    -------
+    int
+        The number of messages read, 0 once all due messages are decoded
+    """
+
+    now = datetime.datetime.utcnow()
+    cursor = await get_iterator_checkpoint(session, DECODER_CHECKPOINT)
+    res = await session.exec(
+        select(AstrocastMessage)
+        .where(AstrocastMessage.iterator > (cursor or 0))
+        .order_by(AstrocastMessage.iterator)
+        .limit(batch_size)
+    )
+    new_messages = []
+    settled_before = now - datetime.timedelta(
+        seconds=config.STATION_DATA_DECODE_LAG_SECONDS
+    )
+    for message in res.all():
+        if message.requested_at > settled_before:
+            break
+        new_messages.append(message)
+
+    res = await session.exec(
+        select(AstrocastMessage)
+        .join(
+            UndecodedMessage,
+            UndecodedMessage.astrocast_message_id == AstrocastMessage.id,
+        )
+        .where(UndecodedMessage.next_attempt_at <= now)
+        .order_by(UndecodedMessage.next_attempt_at)
+        .limit(batch_size)
+    )
+    new_ids = {x.id for x in new_messages}
+    retried_messages = [x for x in res.all() if x.id not in new_ids]
+
+    messages = new_messages + retried_messages
+    if not messages:
+        return 0
+
+    stations = await get_stations_by_device(
+        session, {x.deviceGuid for x in messages if x.deviceGuid is not None}
+    )
+    assignments = await AssignmentResolver.load(
+        session, set(stations.values())
+    )
+    calibrations = await calibration_indexes.get_many(
+        session,
+        {
+            interval.sensor_id
+            for history in assignments.intervals.values()
+            for interval in history
+            if interval.sensor_id is not None
+        },
+    )
+
+    # Decode the payloads of each length (ie. station layout) together
+    reasons = {}  # Of the messages not (fully) decoded, by message id
+    payload_groups = {}
+    for message in messages:
+        station_id = stations.get(str(message.deviceGuid).lower())
+        if message.decoded_data is None:
+            reasons[message.id] = UNDECODED_NO_DATA
+            continue
+        if station_id is None:
+            reasons[message.id] = UNDECODED_NO_STATION
+            continue
+        payload_groups.setdefault(len(message.decoded_data), []).append(
+            (message, station_id)
+        )
+
+    corrected_at = datetime.datetime.utcnow()
+    rows = []
+    for group in payload_groups.values():
+        decoded = decode_payloads([x.decoded_data for x, _ in group])
+        for index in decoded.bad_rows:
+            print(f"Could not decode message {group[index][0].id}")
+            reasons[group[index][0].id] = UNDECODED_BAD_PAYLOAD
+        bad_rows = set(decoded.bad_rows.tolist())
+
+        recorded = decoded.timestamps.astype("datetime64[s]")
+        by_station = {}
+        for index, (_, station_id) in enumerate(group):
+            if index not in bad_rows:
+                by_station.setdefault(station_id, []).append(index)
+
+        # Resolve each position of a station for all its messages at once
+        for station_id, indexes in by_station.items():
+            recorded_at = recorded[indexes].astype("datetime64[us]")
+            for position in range(1, decoded.values.shape[1] + 1):
+                resolved = assignments.resolve(
+                    station_id, position, recorded_at
+                )
+                raw_values = decoded.values[:, position - 1].tolist()
+                for index, at, assignment in zip(
+                    indexes, recorded_at.tolist(), resolved
+                ):
+                    if assignment is None or assignment.sensor_id is None:
+                        continue
+                    rows.append(
+                        {
+                            "id": uuid4(),
+                            "raw_value": raw_values[index],
+                            "corrected_value": None,
+                            "high_resolution": False,
+                            "astrocast_message_id": group[index][0].id,
+                            "station_sensor_id": assignment.id,
+                            "sensor_id": assignment.sensor_id,
+                            "recorded_at": at,
+                            "last_corrected_at": corrected_at,
+                            "calibration_parameters": None,
+                        }
+                    )
+
+    # Messages with a station but no sensor assigned at the time are retried
+    with_rows = {row["astrocast_message_id"] for row in rows}
+    for group in payload_groups.values():
+        for message, _ in group:
+            if message.id not in with_rows and message.id not in reasons:
+                reasons[message.id] = UNDECODED_UNASSIGNED
+
+    # Look up the calibrations of each sensor's rows in one search, rows
+    # without a calibration keep NaN parameters and are flagged by the
+    # quality mask
+    parameters = np.full((len(rows), len(CALIBRATION_KEYS)), np.nan)
+    rows_by_sensor = {}
+    for i, row in enumerate(rows):
+        rows_by_sensor.setdefault(row["sensor_id"], []).append(i)
+    for sensor_id, indexes in rows_by_sensor.items():
+        index = calibrations.get(sensor_id)
+        if index is None or not len(index):
+            continue
+        positions = index.lookup([rows[i]["recorded_at"] for i in indexes])
+        found = positions >= 0
+        parameters[np.array(indexes)[found]] = index.parameters[
+            positions[found]
+        ]
+        for i, position in zip(indexes, positions.tolist()):
+            if position >= 0:
+                rows[i]["calibration_parameters"] = index.calibrations[
+                    position
+                ]
+
+    # Correct all values of the batch at once
+    corrected, quality = calibrate_raw_values(
+        np.array([row["raw_value"] for row in rows], dtype=np.float64),
+        *parameters.T,
+    )
+    for row, value, good in zip(rows, corrected.tolist(), quality.tolist()):
+        row["corrected_value"] = value if good else None
+
+    # Keep the amount of bound parameters under the driver's limit
+    chunk_size = config.ASTROCAST_INGEST_BATCH_SIZE
+    for i in range(0, len(rows), chunk_size):
+        await session.execute(
+            dialect_insert(session, StationData)
+            .values(rows[i : i + chunk_size])
+            .on_conflict_do_nothing(
+                index_elements=["astrocast_message_id", "station_sensor_id"]
+            )
+        )
+
+    # Schedule the retries of skipped messages, and forget decoded ones
+    retries = await get_retry_times(session, reasons, now)
+    for i in range(0, len(retries), chunk_size):
+        query = dialect_insert(session, UndecodedMessage).values(
+            retries[i : i + chunk_size]
+        )
+        await session.execute(
+            query.on_conflict_do_update(
+                index_elements=["astrocast_message_id"],
+                set_={
+                    key: query.excluded[key]
+                    for key in (
+                        "reason",
+                        "attempts",
+                        "last_attempted_at",
+                        "next_attempt_at",
+                    )
+                },
+            )
+        )
+    decoded_ids = [x.id for x in messages if x.id not in reasons]
+    for i in range(0, len(decoded_ids), chunk_size):
+        await session.exec(
+            delete(UndecodedMessage).where(
+                UndecodedMessage.astrocast_message_id.in_(
+                    decoded_ids[i : i + chunk_size]
+                )
+            )
+        )
+
+    if new_messages:
+        await advance_iterator_checkpoint(
+            session, new_messages[-1].iterator, name=DECODER_CHECKPOINT
+        )
+    print(
+        f"Decoded {len(messages)} messages into {len(rows)} station data, "
+        f"{len(reasons)} skipped"
+    )
+
+    return len(messages)
+
+
+async def start_decoding_messages(
+    interval_seconds: int = config.STATION_DATA_DECODE_INTERVAL_SECONDS,
+    batch_size: int = config.STATION_DATA_DECODE_BATCH_SIZE,
+) -> None:
+    """Continuously decode newly stored messages into StationData
+
+    Batches are decoded back to back until the decoder catches up with the
+    message table and the due retries, then it waits before checking again.
+    """
+
+    while True:
+        try:
+            async with async_session() as session:
+                decoded = await decode_messages(session, batch_size)
+                await session.commit()
+        except Exception as e:
+            print(f"Error decoding messages: {e}")
+            decoded = 0
+
+        if decoded < batch_size:
+            await asyncio.sleep(interval_seconds)
@@ -22,37 +22,25 @@ crud = CRUD(
 
 
 async def get_data(
+    response: Response,
     filter: str = Query(None),
     sort: str = Query(None),
     range: str = Query(None),
+    cursor: str = Query(None),
+    limit: int = Query(None),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await crud.get_model_data(
-        sort=sort,
-        range=range,
+    res = await crud.get_list(
+        response,
+        session,
         filter=filter,
-        session=session,
-    )
-
-    return res
-
-
-async def get_count(
-    response: Response,
-    filter: str = Query(None),
-    range: str = Query(None),
-    sort: str = Query(None),
-    session: AsyncSession = Depends(get_session),
-):
-    count = await crud.get_total_count(
-        response=response,
         sort=sort,
         range=range,
-        filter=filter,
-        session=session,
+        cursor=cursor,
+        limit=limit,
     )
 
-    return count
+    return res
 
 
 @router.get("/{stationdata_id}", response_model=StationDataRead)
@@ -74,9 +62,7 @@ async def get_station_data(
 
 @router.get("", response_model=list[StationDataRead])
 async def get_all_station_data(
-    response: Response,
     stations: CRUD = Depends(get_data),
-    total_count: int = Depends(get_count),
 ) -> list[StationDataRead]:
     """Get all station data"""
 
@@ -1,6 +1,8 @@
 from .station_sensors import (  # noqa
     StationSensorAssignments,
     StationSensorAssignmentsBase,
+    StationSensorAssignmentInterval,
+    StationCurrentAssignment,
     StationSensorAssignmentsCreate,
     StationSensorAssignmentsRead,
     StationSensorAssignmentsUpdate,
@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship, UniqueConstraint
 from uuid import uuid4, UUID
+from app.db import trigram_index
 import datetime
 from app.stations.models import StationSensorAssignments
 from app.sensors.models import Sensor, SensorRead
@@ -29,7 +30,12 @@ class StationBase(SQLModel):
 
 
 class Station(StationBase, table=True):
-    __table_args__ = (UniqueConstraint("id"),)
+    __table_args__ = (
+        UniqueConstraint("id"),
+        trigram_index("station", "name"),
+        trigram_index("station", "acronym"),
+        trigram_index("station", "catchment_name"),
+    )
     iterator: int = Field(
         default=None,
         nullable=False,
@@ -57,8 +63,8 @@ class Station(StationBase, table=True):
 
 class StationRead(StationBase):
     id: UUID
-    sensors: list["SensorRead"] = []
-    sensor_link: list[StationSensorAssignments] = []
+    sensors: list["SensorRead"] | None = []  # None if not embedded
+    sensor_link: list[StationSensorAssignments] | None = []
 
 
 class StationCreate(StationBase):
@@ -3,6 +3,7 @@ from uuid import uuid4, UUID
 from typing import Any, TYPE_CHECKING
 import datetime
 from pydantic import field_validator
+from app.dates import to_naive_utc
 
 if TYPE_CHECKING:
     from app.sensors.models import Sensor
@@ -10,8 +11,8 @@ if TYPE_CHECKING:
 
 
 class StationSensorAssignmentsBase(SQLModel):
-    installed_on: datetime.datetime = Field(
-        default_factory=datetime.datetime.now,
+    installed_on: datetime.datetime = Field(  # Naive UTC
+        default_factory=datetime.datetime.utcnow,
         nullable=False,
     )
     sensor_position: int = Field(
@@ -35,9 +36,8 @@ class StationSensorAssignmentsBase(SQLModel):
         cls,
         v: datetime.datetime | None,
     ) -> datetime.datetime | None:
-        if v is None:
-            return v
-        return v.replace(tzinfo=None)
+        """Store the installation time in naive UTC"""
+        return to_naive_utc(v)
 
 
 class StationSensorAssignmentsCreate(StationSensorAssignmentsBase):
@@ -78,3 +78,61 @@ class StationSensorAssignments(StationSensorAssignmentsBase, table=True):
         back_populates="station_link",
         sa_relationship_kwargs={"lazy": "selectin"},
     )
+
+
+class StationSensorAssignmentInterval(SQLModel):
+    """The validity range [valid_from, valid_to) of a sensor assignment"""
+
+    id: UUID
+    station_id: UUID
+    sensor_position: int
+    sensor_id: UUID | None = None
+    valid_from: datetime.datetime
+    valid_to: datetime.datetime | None = Field(
+        default=None,
+        description="When the assignment was replaced, None if current",
+    )
+
+
+class StationCurrentAssignment(SQLModel, table=True):
+    """The latest assignment of each station position
+
+    Maintained alongside every write to StationSensorAssignments, so that
+    the current configuration of a station is read without its history.
+    """
+
+    __table_args__ = (
+        UniqueConstraint(
+            "station_id",
+            "sensor_position",
+            name="station_current_assignment_position_constraint",
+        ),
+    )
+    iterator: int = Field(
+        default=None,
+        nullable=False,
+        primary_key=True,
+        index=True,
+    )
+    station_id: UUID = Field(
+        foreign_key="station.id",
+        nullable=False,
+        index=True,
+    )
+    sensor_position: int = Field(
+        nullable=False,
+    )
+    assignment_id: UUID = Field(
+        nullable=False,
+        index=True,
+        description="The StationSensorAssignments row that is current",
+    )
+    sensor_id: UUID | None = Field(
+        default=None,
+        foreign_key="sensor.id",
+        nullable=True,
+        index=True,
+    )
+    installed_on: datetime.datetime = Field(
+        nullable=False,
+    )
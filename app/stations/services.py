@@ -0,0 +1,360 @@
+from app.db import AsyncSession, dialect_insert
+from app.stations.models import (
+    StationCurrentAssignment,
+    StationSensorAssignments,
+    StationSensorAssignmentInterval,
+)
+from sqlmodel import select, delete
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import noload
+from sqlalchemy.sql import func
+from typing import Any, Iterable
+from uuid import UUID
+import datetime
+import numpy as np
+
+# Upper bound of the assignments that have not been replaced yet
+OPEN_INTERVAL_END = np.datetime64("9999-12-31T00:00:00", "us")
+
+
+class AssignmentResolver:
+    def __init__(
+        self,
+        assignments: Iterable[Any],
+    ):
+        """As-of resolution of the sensor installed at a station position
+
+        Every assignment is valid from its installed_on until the next
+        assignment at the same station position, or until its sensor is
+        installed somewhere else, whichever comes first. Removals (where
+        sensor_id is None) are kept as intervals of an empty position. The
+        intervals of each position are stored as sorted arrays, so batches
+        of timestamps are resolved with a single binary search.
+
+        assignments : Iterable[Any]
+            The StationSensorAssignments rows (or rows with the same fields)
+            to resolve against
+        """
+
+        positions: dict[tuple[UUID, int], list[Any]] = {}
+        for assignment in sorted(
+            assignments, key=lambda x: (x.installed_on, x.iterator)
+        ):
+            key = (assignment.station_id, assignment.sensor_position)
+            positions.setdefault(key, []).append(assignment)
+
+        # Close each assignment at the next one of the same position
+        intervals = []
+        for history in positions.values():
+            for assignment, replacement in zip(
+                history, history[1:] + [None]
+            ):
+                intervals.append(
+                    {
+                        "id": assignment.id,
+                        "station_id": assignment.station_id,
+                        "sensor_position": assignment.sensor_position,
+                        "sensor_id": assignment.sensor_id,
+                        "valid_from": assignment.installed_on,
+                        "valid_to": (
+                            replacement.installed_on if replacement else None
+                        ),
+                    }
+                )
+
+        # A sensor is in one place at a time, a move closes its previous
+        # assignment even if the old position was not emptied
+        by_sensor: dict[UUID, list[dict]] = {}
+        for interval in intervals:
+            if interval["sensor_id"] is not None:
+                by_sensor.setdefault(interval["sensor_id"], []).append(
+                    interval
+                )
+        for history in by_sensor.values():
+            history.sort(key=lambda x: x["valid_from"])
+            for interval, moved in zip(history, history[1:]):
+                if (
+                    interval["valid_to"] is None
+                    or moved["valid_from"] < interval["valid_to"]
+                ):
+                    interval["valid_to"] = moved["valid_from"]
+
+        self.intervals: dict[
+            tuple[UUID, int], list[StationSensorAssignmentInterval]
+        ] = {}
+        for interval in sorted(intervals, key=lambda x: x["valid_from"]):
+            key = (interval["station_id"], interval["sensor_position"])
+            self.intervals.setdefault(key, []).append(
+                StationSensorAssignmentInterval(**interval)
+            )
+
+        self.starts = {}
+        self.ends = {}
+        for key, history in self.intervals.items():
+            self.starts[key] = np.array(
+                [x.valid_from for x in history], dtype="datetime64[us]"
+            )
+            self.ends[key] = np.array(
+                [
+                    x.valid_to if x.valid_to is not None else OPEN_INTERVAL_END
+                    for x in history
+                ],
+                dtype="datetime64[us]",
+            )
+
+    @classmethod
+    async def load(
+        cls,
+        session: AsyncSession,
+        station_ids: set[UUID] | None = None,
+    ) -> "AssignmentResolver":
+        """Build a resolver from the assignments of some or all stations
+
+        The assignments of the stations' sensors at other stations are
+        included, so that a move elsewhere closes their intervals.
+        """
+
+        query = select(
+            StationSensorAssignments.iterator,
+            StationSensorAssignments.id,
+            StationSensorAssignments.station_id,
+            StationSensorAssignments.sensor_position,
+            StationSensorAssignments.sensor_id,
+            StationSensorAssignments.installed_on,
+        )
+        if station_ids is not None:
+            query = query.where(
+                StationSensorAssignments.station_id.in_(station_ids)
+                | StationSensorAssignments.sensor_id.in_(
+                    select(StationSensorAssignments.sensor_id).where(
+                        StationSensorAssignments.station_id.in_(station_ids),
+                        StationSensorAssignments.sensor_id.is_not(None),
+                    )
+                )
+            )
+        res = await session.exec(query)
+
+        return cls(res.all())
+
+    def resolve(
+        self,
+        station_id: UUID,
+        sensor_position: int,
+        timestamps: np.ndarray | list[datetime.datetime],
+    ) -> list[StationSensorAssignmentInterval | None]:
+        """Get the assignment of a station position at each timestamp
+
+        Returns
+        -------
+        list[StationSensorAssignmentInterval | None]
+            The assignment valid at each timestamp, None where the position
+            had not been assigned yet or its sensor had been moved away
+        """
+
+        key = (station_id, sensor_position)
+        timestamps = np.asarray(timestamps, dtype="datetime64[us]")
+        if key not in self.starts:
+            return [None] * len(timestamps)
+
+        indexes = np.searchsorted(self.starts[key], timestamps, "right") - 1
+        valid = indexes >= 0
+        valid[valid] = timestamps[valid] < self.ends[key][indexes[valid]]
+
+        history = self.intervals[key]
+
+        return [
+            history[index] if is_valid else None
+            for index, is_valid in zip(indexes.tolist(), valid.tolist())
+        ]
+
+    def configuration(
+        self,
+        station_id: UUID,
+        at: datetime.datetime,
+    ) -> list[StationSensorAssignmentInterval]:
+        """Get the sensors installed on a station at a time, by position"""
+
+        configuration = []
+        for station, sensor_position in sorted(
+            key for key in self.intervals if key[0] == station_id
+        ):
+            (interval,) = self.resolve(station, sensor_position, [at])
+            if interval is not None and interval.sensor_id is not None:
+                configuration.append(interval)
+
+        return configuration
+
+
+def select_latest_assignments(
+    station_ids: set[UUID] | Select,
+) -> Select:
+    """Select the latest assignment of each position of some stations
+
+    This is DISTINCT ON (station_id, sensor_position) ORDER BY installed_on
+    DESC, written as a window so that it runs on every backend.
+
+    station_ids : set[UUID] | Select
+        The stations, as ids or a subquery selecting them
+    """
+
+    ranked = (
+        select(
+            StationSensorAssignments.id,
+            StationSensorAssignments.station_id,
+            StationSensorAssignments.sensor_position,
+            StationSensorAssignments.sensor_id,
+            StationSensorAssignments.installed_on,
+            func.row_number()
+            .over(
+                partition_by=(
+                    StationSensorAssignments.station_id,
+                    StationSensorAssignments.sensor_position,
+                ),
+                order_by=(
+                    StationSensorAssignments.installed_on.desc(),
+                    StationSensorAssignments.iterator.desc(),
+                ),
+            )
+            .label("rank"),
+        )
+        .where(StationSensorAssignments.station_id.in_(station_ids))
+        .subquery()
+    )
+
+    return select(
+        ranked.c.id,
+        ranked.c.station_id,
+        ranked.c.sensor_position,
+        ranked.c.sensor_id,
+        ranked.c.installed_on,
+    ).where(ranked.c.rank == 1)
+
+
+async def get_current_assignments(
+    session: AsyncSession,
+    sensor_ids: set[UUID],
+) -> dict[UUID, StationSensorAssignments]:
+    """Get the current station assignment of each of a set of sensors
+
+    A sensor is currently assigned if its own most recent assignment is
+    still the most recent assignment of that station position. Both are
+    ranked with windows over the assignment table in a single query, so the
+    result does not depend on what the sensors were loaded with.
+
+    Returns
+    -------
+    dict[UUID, StationSensorAssignments]
+        The current assignment of each sensor that has one, by sensor id
+    """
+
+    if not sensor_ids:
+        return {}
+
+    latest_by_sensor = (
+        select(
+            StationSensorAssignments.id,
+            StationSensorAssignments.station_id,
+            func.row_number()
+            .over(
+                partition_by=StationSensorAssignments.sensor_id,
+                order_by=(
+                    StationSensorAssignments.installed_on.desc(),
+                    StationSensorAssignments.iterator.desc(),
+                ),
+            )
+            .label("rank"),
+        )
+        .where(StationSensorAssignments.sensor_id.in_(sensor_ids))
+        .subquery()
+    )
+    latest_by_position = select_latest_assignments(
+        select(latest_by_sensor.c.station_id)
+    ).subquery()
+
+    res = await session.exec(
+        select(StationSensorAssignments)
+        .join(
+            latest_by_sensor,
+            latest_by_sensor.c.id == StationSensorAssignments.id,
+        )
+        .join(
+            latest_by_position,
+            latest_by_position.c.id == StationSensorAssignments.id,
+        )
+        .where(latest_by_sensor.c.rank == 1)
+        .options(noload("*"))
+    )
+
+    return {link.sensor_id: link for link in res.all()}
+
+
+async def refresh_current_assignments(
+    session: AsyncSession,
+    positions: set[tuple[UUID, int]],
+) -> None:
+    """Recompute the current assignment of some station positions
+
+    Call this after writing to StationSensorAssignments and before the
+    commit, so that the StationCurrentAssignment rows change in the same
+    transaction as the assignments they are derived from.
+
+    Parameters
+    ----------
+    positions : set[tuple[UUID, int]]
+        The (station_id, sensor_position) pairs that were written to
+    """
+
+    if not positions:
+        return
+
+    await session.flush()
+    res = await session.exec(
+        select_latest_assignments({x for x, _ in positions})
+    )
+    latest = [
+        row
+        for row in res.all()
+        if (row.station_id, row.sensor_position) in positions
+    ]
+
+    # Upsert rather than replace the rows, so that concurrent writes to a
+    # position do not both insert it. A row only moves to a later assignment.
+    if latest:
+        query = dialect_insert(session, StationCurrentAssignment).values(
+            [
+                {
+                    "station_id": row.station_id,
+                    "sensor_position": row.sensor_position,
+                    "assignment_id": row.id,
+                    "sensor_id": row.sensor_id,
+                    "installed_on": row.installed_on,
+                }
+                for row in latest
+            ]
+        )
+        await session.execute(
+            query.on_conflict_do_update(
+                index_elements=["station_id", "sensor_position"],
+                set_={
+                    "assignment_id": query.excluded.assignment_id,
+                    "sensor_id": query.excluded.sensor_id,
+                    "installed_on": query.excluded.installed_on,
+                },
+                where=(
+                    StationCurrentAssignment.installed_on
+                    <= query.excluded.installed_on
+                ),
+            )
+        )
+
+    # Positions without any assignment left (all deleted) have no row
+    emptied = positions - {(x.station_id, x.sensor_position) for x in latest}
+    if emptied:
+        await session.exec(
+            delete(StationCurrentAssignment).where(
+                tuple_(
+                    StationCurrentAssignment.station_id,
+                    StationCurrentAssignment.sensor_position,
+                ).in_(list(emptied))
+            )
+        )
@@ -1,4 +1,5 @@
 from app.config import constants
+import numpy as np
 
 
 class StationMeasurement:
@@ -65,3 +66,95 @@ class StationMeasurement:
         return (
             bytes_value / self.output_range
         ) * self.range_width + self.range_min
+
+    def bytes_to_measurements(
+        self,
+        bytes_values: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorised inverse transformation function
+
+        Converts an array of byte values to measurement values. The range
+        and output range may be scalars or arrays broadcastable to the byte
+        values, so that each value can carry the parameters of its own
+        sensor. Values outside of the output range are not raised on, they
+        are flagged in the quality mask instead.
+
+        Parameters
+        ----------
+        bytes_values : np.ndarray
+            The byte values to be converted
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The measurement values (NaN where the quality is bad) and the
+            quality mask (True where the measurement is valid)
+        """
+
+        values = np.asarray(bytes_values, dtype=np.float64)
+        output_range = np.asarray(self.output_range, dtype=np.float64)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            quality = (
+                np.isfinite(values)
+                & (values >= 0)
+                & (values <= output_range)
+                & (output_range > 0)
+            )
+            measurements = (
+                values / output_range
+            ) * self.range_width + self.range_min
+        quality &= np.isfinite(measurements)
+
+        return np.where(quality, measurements, np.nan), quality
+
+
+def calibrate_raw_values(
+    raw_values: np.ndarray,
+    slope: np.ndarray | float,
+    intercept: np.ndarray | float,
+    min_range: np.ndarray | float,
+    max_range: np.ndarray | float,
+    output_range: np.ndarray | int = constants.DEFAULT_SENSOR_OUTPUT_RANGE,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Convert raw values to corrected measurements with their calibrations
+
+    The raw values are scaled from the sensor's output range to the
+    calibration's measurement range, then corrected with its slope and
+    intercept. Every parameter is broadcast against the raw values, so a
+    whole batch of values from different sensors is calibrated at once.
+    Values without a calibration are expected to carry NaN parameters.
+
+    Parameters
+    ----------
+    raw_values : np.ndarray
+        The raw values as sent by the stations
+    slope, intercept : np.ndarray | float
+        The linear correction of each value's calibration
+    min_range, max_range : np.ndarray | float
+        The measurement range of each value's calibration
+    output_range : np.ndarray | int, optional
+        The output range of each value's sensor
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The corrected values (NaN where the quality is bad) and the quality
+        mask (False where the value is outside of the output range or has
+        no usable calibration)
+    """
+
+    measurement = StationMeasurement(
+        np.asarray(min_range, dtype=np.float64),
+        np.asarray(max_range, dtype=np.float64),
+        output_range,
+    )
+    values, quality = measurement.bytes_to_measurements(raw_values)
+
+    with np.errstate(invalid="ignore"):
+        corrected = np.asarray(slope, dtype=np.float64) * values + np.asarray(
+            intercept, dtype=np.float64
+        )
+    quality &= np.isfinite(corrected)
+
+    return np.where(quality, corrected, np.nan), quality
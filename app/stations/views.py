@@ -10,17 +10,56 @@ from app.stations.models import (
     StationSensorAssignmentsRead,
     StationSensorAssignmentsCreate,
     StationSensorAssignmentsUpdate,
+    StationSensorAssignmentInterval,
+    StationCurrentAssignment,
+)
+from app.stations.services import (
+    AssignmentResolver,
+    refresh_current_assignments,
 )
 
 from uuid import UUID
-from sqlalchemy import func
-import json
+from sqlalchemy.orm import selectinload, raiseload
+from app.crud import CRUD
+from app.sensors.models import Sensor
 from sqlalchemy.exc import IntegrityError
 from app.stations.data.views import router as station_data_router
+from app.stations.data.services import retry_undecoded_messages
 import datetime
-from app.sensors.views import get_current_assignment_property
+from app.dates import to_naive_utc
+from app.sensors.views import get_current_assignment_properties
 
 router = APIRouter()
+crud = CRUD(
+    Station,
+    StationRead,
+    StationCreate,
+    StationUpdate,
+    resource_name="stations",
+    relationships={
+        "sensors": selectinload(Station.sensors).options(
+            selectinload(Sensor.parameter).raiseload("*"),
+            selectinload(Sensor.station_link).raiseload("*"),
+            raiseload("*"),
+        ),
+        "sensor_link": selectinload(Station.sensor_link).raiseload("*"),
+    },
+)
+station_sensor_crud = CRUD(
+    StationSensorAssignments,
+    StationSensorAssignmentsRead,
+    StationSensorAssignmentsCreate,
+    StationSensorAssignmentsUpdate,
+    resource_name="station_sensors",
+    relationships={
+        "station": selectinload(StationSensorAssignments.station).raiseload(
+            "*"
+        ),
+        "sensor": selectinload(StationSensorAssignments.sensor).raiseload(
+            "*"
+        ),
+    },
+)
 
 
 router.include_router(station_data_router, prefix="/data")
@@ -35,6 +74,7 @@ async def get_station_sensor_by_position(
     *,
     station_id: UUID,
     sensor_position: int,
+    embed: str = Query(None),
 ) -> StationSensorAssignmentsRead:
     """Get a station sensor relation by its local id"""
 
@@ -46,6 +86,8 @@ async def get_station_sensor_by_position(
 
     res = await session.exec(
         select(StationSensorAssignments)
+        .options(*station_sensor_crud.loader_options(embed))
+        .execution_options(populate_existing=True)
         .where(StationSensorAssignments.station_id == station_id)
         .where(StationSensorAssignments.sensor_position == sensor_position)
         .order_by(StationSensorAssignments.installed_on.desc())
@@ -64,11 +106,14 @@ async def get_station_sensor(
     session: AsyncSession = Depends(get_session),
     *,
     station_sensor_id: UUID,
+    embed: str = Query(None),
 ) -> StationSensorAssignmentsRead:
     """Get a station sensor relation by its local id"""
 
     res = await session.exec(
         select(StationSensorAssignments)
+        .options(*station_sensor_crud.loader_options(embed))
+        .execution_options(populate_existing=True)
         .where(StationSensorAssignments.id == station_sensor_id)
         .order_by(StationSensorAssignments.installed_on.desc())
         .limit(1)
@@ -86,88 +131,23 @@ async def get_station_sensors(
     filter: str = Query(None),
     sort: str = Query(None),
     range: str = Query(None),
+    cursor: str = Query(None),
+    limit: int = Query(None),
+    embed: str = Query(None),
 ) -> list[StationSensorAssignmentsRead]:
     """Get all sensors"""
 
-    sort = json.loads(sort) if sort else []
-    range = json.loads(range) if range else []
-    filter = json.loads(filter) if filter else {}
-
-    # Do a query to satisfy total count for "Content-Range" header
-    count_query = select(func.count(StationSensorAssignments.iterator))
-    if len(filter):  # Have to filter twice for some reason? SQLModel state?
-        for field, value in filter.items():
-            if field == "id" or field == "station_id" or field == "sensor_id":
-                if isinstance(value, list):
-                    for v in value:
-                        count_query = count_query.filter(
-                            getattr(StationSensorAssignments, field) == v
-                        )
-                else:
-                    count_query = count_query.filter(
-                        getattr(StationSensorAssignments, field) == value
-                    )
-            else:
-                count_query = count_query.filter(
-                    getattr(StationSensorAssignments, field).like(
-                        f"%{str(value)}%"
-                    )
-                )
-    total_count = await session.exec(count_query)
-    total_count = total_count.one()
-
-    # Query for the quantity of records in SensorInventoryData that match the
-    # sensor as well as the min and max of the time column
-    query = select(StationSensorAssignments)
-
-    # Order by sort field params ie. ["name","ASC"]
-    if len(sort) == 2:
-        sort_field, sort_order = sort
-        if sort_order == "ASC":
-            query = query.order_by(
-                getattr(StationSensorAssignments, sort_field)
-            )
-        else:
-            query = query.order_by(
-                getattr(StationSensorAssignments, sort_field).desc()
-            )
-
-    # Filter by filter field params ie. {"name":"bar"}
-    if len(filter):
-        for field, value in filter.items():
-            if field == "id" or field == "station_id" or field == "sensor_id":
-                if isinstance(value, list):
-                    for v in value:
-                        count_query = count_query.filter(
-                            getattr(StationSensorAssignments, field) == v
-                        )
-                else:
-                    count_query = count_query.filter(
-                        getattr(StationSensorAssignments, field) == value
-                    )
-            else:
-                query = query.filter(
-                    getattr(StationSensorAssignments, field).like(
-                        f"%{str(value)}%"
-                    )
-                )
-
-    if len(range) == 2:
-        start, end = range
-        query = query.offset(start).limit(end - start + 1)
-    else:
-        start, end = [0, total_count]  # For content-range header
-
-    # Execute query
-    results = await session.exec(query)
-    station_sensors = results.all()
-
-    response.headers["Content-Range"] = (
-        f"station_sensors {start}-{end}/{total_count}"
+    return await station_sensor_crud.get_list(
+        response,
+        session,
+        filter=filter,
+        sort=sort,
+        range=range,
+        embed=embed,
+        cursor=cursor,
+        limit=limit,
     )
 
-    return station_sensors
-
 
 @router.post("/sensors", response_model=StationSensorAssignmentsRead)
 async def create_station_sensor_mapping(
@@ -189,19 +169,29 @@ async def create_station_sensor_mapping(
             .limit(1)
         )
 
+        positions = {(obj.station_id, obj.sensor_position)}
         existing_sensor = res.one_or_none()
         if existing_sensor:
             old_station_sensor_assignment = StationSensorAssignments(
                 station_id=existing_sensor.station_id,
                 sensor_position=existing_sensor.sensor_position,
                 sensor_id=None,
-                installed_on=datetime.datetime.now(),
+                installed_on=datetime.datetime.utcnow(),
             )
 
             session.add(old_station_sensor_assignment)
-            await session.commit()
+            positions.add(
+                (existing_sensor.station_id, existing_sensor.sensor_position)
+            )
 
+        # Write the assignments and the current configuration together
         session.add(obj)
+        await refresh_current_assignments(session, positions)
+        await retry_undecoded_messages(
+            session,
+            {station_id for station_id, _ in positions},
+            since=obj.installed_on,
+        )
         await session.commit()
     except IntegrityError as e:
         await session.rollback()
@@ -241,10 +231,23 @@ async def update_sensor(
     if not station_sensor_db:
         raise HTTPException(status_code=404, detail="Station-Sensor not found")
 
+    positions = {
+        (station_sensor_db.station_id, station_sensor_db.sensor_position)
+    }
+    installed_on = station_sensor_db.installed_on
     station_sensor_data = station_sensor_update.model_dump(exclude_unset=True)
     station_sensor_db.sqlmodel_update(station_sensor_data)
+    positions.add(
+        (station_sensor_db.station_id, station_sensor_db.sensor_position)
+    )
 
     session.add(station_sensor_db)
+    await refresh_current_assignments(session, positions)
+    await retry_undecoded_messages(
+        session,
+        {station_id for station_id, _ in positions},
+        since=min(installed_on, station_sensor_db.installed_on),
+    )
     await session.commit()
     await session.refresh(station_sensor_db)
 
@@ -270,6 +273,10 @@ async def delete_station_sensor_mapping(
 
     if station_sensor:
         await session.delete(station_sensor)
+        await refresh_current_assignments(
+            session,
+            {(station_sensor.station_id, station_sensor.sensor_position)},
+        )
         await session.commit()
 
 
@@ -278,22 +285,20 @@ async def get_station(
     session: AsyncSession = Depends(get_session),
     *,
     station_id: UUID,
+    embed: str = Query(None),
 ) -> StationRead:
     """Get an station by id"""
 
-    # Query for the station, joining the full sensor object where the
-    # station.sensors is the link table
-    query = select(Station).where(Station.id == station_id)
-    res = await session.exec(query)
-
-    station_data = res.one_or_none()
-    station_data = StationRead.model_validate(station_data)
-    updated_sensors = []
-    for sensor in station_data.sensors:
-        sensor = await get_current_assignment_property(sensor, session)
-        updated_sensors.append(sensor)
+    station_data = await crud.get_model_by_id(
+        session, model_id=station_id, embed=embed
+    )
+    if station_data is None:
+        raise HTTPException(status_code=404, detail="Station not found")
 
-    station_data.sensors = updated_sensors
+    if station_data.sensors is not None:
+        station_data.sensors = await get_current_assignment_properties(
+            station_data.sensors, session
+        )
 
     return station_data
 
@@ -306,31 +311,56 @@ async def get_current_sensors_for_station(
     session: AsyncSession = Depends(get_session),
     *,
     station_id: UUID,
-    total: str = Query(...),
+    total: int | None = Query(None),
+    embed: str = Query(None),
 ) -> StationSensorAssignmentsRead:
-    """Get a station sensor relation by its local id"""
+    """Get the current assignment of each position of a station
 
-    res = await session.exec(
-        select(StationSensorAssignments).where(
-            StationSensorAssignments.station_id == station_id
+    Optionally limited to the first `total` positions
+    """
+
+    query = (
+        select(StationSensorAssignments)
+        .options(*station_sensor_crud.loader_options(embed))
+        .execution_options(populate_existing=True)
+        .join(
+            StationCurrentAssignment,
+            StationCurrentAssignment.assignment_id
+            == StationSensorAssignments.id,
         )
+        .where(StationCurrentAssignment.station_id == station_id)
+        .order_by(StationCurrentAssignment.sensor_position)
     )
-    objs = res.all()
-
-    current_sensors = {}
-    for i in range(int(total)):
-        current_index_results = []
-        for obj in objs:
-            if obj.sensor_position == i:
-                current_index_results.append(obj)
-
-        for res in current_index_results:
-            # Sort results by installed_on and get the most recent
-            current_sensors[i] = max(
-                current_index_results, key=lambda x: x.installed_on
-            )
+    if total is not None:
+        query = query.where(StationCurrentAssignment.sensor_position <= total)
+    res = await session.exec(query)
+
+    return res.all()
+
+
+@router.get(
+    "/{station_id}/configuration",
+    response_model=list[StationSensorAssignmentInterval],
+)
+async def get_station_configuration(
+    session: AsyncSession = Depends(get_session),
+    *,
+    station_id: UUID,
+    at: datetime.datetime | None = Query(None),
+) -> list[StationSensorAssignmentInterval]:
+    """Get the sensors installed on a station at a UTC time (default now)"""
+
+    res = await session.exec(
+        select(Station.id).where(Station.id == station_id)
+    )
+    if res.one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Station not found")
+
+    # Assignments are stored in naive UTC
+    at = to_naive_utc(at) if at is not None else datetime.datetime.utcnow()
+    assignments = await AssignmentResolver.load(session, {station_id})
 
-    return current_sensors.values()
+    return assignments.configuration(station_id, at)
 
 
 @router.get("", response_model=list[StationRead])
@@ -341,76 +371,22 @@ async def get_stations(
     filter: str = Query(None),
     sort: str = Query(None),
     range: str = Query(None),
+    cursor: str = Query(None),
+    limit: int = Query(None),
+    embed: str = Query(None),
 ):
     """Get all stations"""
-    sort = json.loads(sort) if sort else []
-    range = json.loads(range) if range else []
-    filter = json.loads(filter) if filter else {}
-
-    # Do a query to satisfy total count for "Content-Range" header
-    count_query = select(func.count(Station.iterator))
-    if len(filter):  # Have to filter twice for some reason? SQLModel state?
-        for field, value in filter.items():
-            if field == "id":
-                if isinstance(value, list):
-                    for v in value:
-                        count_query = count_query.filter(
-                            getattr(Station, field) == v
-                        )
-                else:
-                    count_query = count_query.filter(
-                        getattr(Station, field) == value
-                    )
-            else:
-                count_query = count_query.filter(
-                    getattr(Station, field).like(f"%{str(value)}%")
-                )
-    total_count = await session.execute(count_query)
-    total_count = total_count.scalar_one()
-
-    # Query for the quantity of records in SensorData matching the station as
-    # well as the min and max of the time column
-    query = select(Station)
-
-    # Order by sort field params ie. ["name","ASC"]
-    if len(sort) == 2:
-        sort_field, sort_order = sort
-        if sort_order == "ASC":
-            query = query.order_by(getattr(Station, sort_field))
-        else:
-            query = query.order_by(getattr(Station, sort_field).desc())
-
-    # Filter by filter field params ie. {"name":"bar"}
-    if len(filter):
-        for field, value in filter.items():
-            if field == "id":
-                if isinstance(value, list):
-                    for v in value:
-                        count_query = count_query.filter(
-                            getattr(Station, field) == v
-                        )
-                else:
-                    count_query = count_query.filter(
-                        getattr(Station, field) == value
-                    )
-            else:
-                query = query.filter(
-                    getattr(Station, field).like(f"%{str(value)}%")
-                )
-
-    if len(range) == 2:
-        start, end = range
-        query = query.offset(start).limit(end - start + 1)
-    else:
-        start, end = [0, total_count]  # For content-range header
-
-    # Execute query
-    results = await session.execute(query)
-    stations = results.scalars().all()
-
-    response.headers["Content-Range"] = f"stations {start}-{end}/{total_count}"
-
-    return stations
+
+    return await crud.get_list(
+        response,
+        session,
+        filter=filter,
+        sort=sort,
+        range=range,
+        embed=embed,
+        cursor=cursor,
+        limit=limit,
+    )
 
 
 @router.post("", response_model=StationRead)
@@ -422,6 +398,8 @@ async def create_station(
 
     station = Station.from_orm(station)
     session.add(station)
+    await session.flush()
+    await retry_undecoded_messages(session, {station.id})
 
     await session.commit()
     await session.refresh(station)
@@ -449,6 +427,9 @@ async def update_station(
         setattr(station_db, field, value)
 
     session.add(station_db)
+    if "associated_astrocast_device" in station_data:
+        await session.flush()
+        await retry_undecoded_messages(session, {station_db.id})
     await session.commit()
     await session.refresh(station_db)
 
@@ -0,0 +1,349 @@
+import pytest
+import json
+import datetime
+from uuid import uuid4
+from fastapi import Response
+from sqlalchemy import event
+from sqlmodel import select
+from app.crud import CRUD
+from app.stations.views import crud
+from app.sensors.models import Sensor
+from app.stations.models import (
+    Station,
+    StationRead,
+    StationSensorAssignments,
+)
+from app.tests.conftest import engine
+from app.config import config
+
+
+def get_stations(client, **params) -> tuple[int, dict, list[dict]]:
+    """Get a page of stations, counting the SQL statements it runs"""
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        response = client.get(
+            f"{config.API_V1_PREFIX}/stations",
+            params={
+                key: json.dumps(value) for key, value in params.items()
+            },
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+
+    return len(statements), response.headers, response.json()
+
+
+@pytest.mark.asyncio
+async def test_list_page_and_total_in_one_query(client, async_session):
+    async_session.add_all(
+        [Station(name=f"Lake {i}") for i in range(5)]
+        + [Station(name=f"River {i}") for i in range(3)]
+    )
+    await async_session.commit()
+
+    queries, headers, stations = get_stations(
+        client,
+        filter={"name": "Lake"},
+        sort=["name", "ASC"],
+        range=[1, 2],
+        embed=[],
+    )
+    assert queries == 1
+    assert headers["Content-Range"] == "stations 1-2/5"
+    assert headers["X-Total-Count-Accuracy"] == "exact"
+    assert [x["name"] for x in stations] == ["Lake 1", "Lake 2"]
+
+    # The range is inclusive, the last page holds the remaining rows
+    _, headers, stations = get_stations(
+        client, filter={"name": "Lake"}, sort=["name", "ASC"], range=[3, 9]
+    )
+    assert headers["Content-Range"] == "stations 3-9/5"
+    assert [x["name"] for x in stations] == ["Lake 3", "Lake 4"]
+
+    # A page past the end has no row to carry the total
+    _, headers, stations = get_stations(
+        client, filter={"name": "Lake"}, range=[10, 19]
+    )
+    assert headers["Content-Range"] == "stations 10-19/5"
+    assert stations == []
+
+    _, headers, stations = get_stations(client)
+    assert headers["Content-Range"] == "stations 0-8/8"
+    assert len(stations) == 8
+
+
+def walk_cursor_pages(client, **params) -> tuple[int, list[dict]]:
+    """Follow the cursors of the station list to its end"""
+
+    pages, stations, cursor = 0, [], ""
+    while cursor is not None:
+        response = client.get(
+            f"{config.API_V1_PREFIX}/stations",
+            params={
+                "cursor": cursor,
+                **{key: json.dumps(value) for key, value in params.items()},
+            },
+        )
+        assert response.status_code == 200
+        assert "Content-Range" not in response.headers
+        pages += 1
+        stations += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+
+    return pages, stations
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination(client, async_session):
+    # Ties within each sort key, and some NULL acronyms
+    async_session.add_all(
+        [
+            Station(
+                name=f"Station {i % 4}",
+                acronym=None if i % 3 else f"S{i % 2}",
+                time_added_utc=datetime.datetime(2024, 1, 1 + i % 2),
+            )
+            for i in range(10)
+        ]
+    )
+    await async_session.commit()
+
+    _, _, expected = get_stations(client)
+    for field, order in [
+        ("name", "ASC"),
+        ("name", "DESC"),
+        ("time_added_utc", "DESC"),
+        ("acronym", "ASC"),
+        ("acronym", "DESC"),
+    ]:
+        pages, stations = walk_cursor_pages(
+            client, sort=[field, order], range=[0, 2]
+        )
+        assert pages == 4
+        assert sorted(x["id"] for x in stations) == sorted(
+            x["id"] for x in expected
+        )
+        keys = [x[field] for x in stations]
+        assert keys == sorted(
+            keys,
+            key=lambda x: (x is None, x or ""),
+            reverse=order == "DESC",
+        )
+
+    pages, stations = walk_cursor_pages(
+        client, sort=["acronym", "DESC"], filter={"name": "3"}
+    )
+    assert pages == 1
+    assert [x["acronym"] for x in stations] == [None, "S1"]
+
+    # A cursor is only valid for the sort it was created with
+    response = client.get(
+        f"{config.API_V1_PREFIX}/stations",
+        params={"cursor": "", "limit": 3, "sort": '["name", "ASC"]'},
+    )
+    assert len(response.json()) == 3
+    response = client.get(
+        f"{config.API_V1_PREFIX}/stations",
+        params={
+            "cursor": response.headers["X-Next-Cursor"],
+            "sort": '["name", "DESC"]',
+        },
+    )
+    assert response.status_code == 400
+    response = client.get(
+        f"{config.API_V1_PREFIX}/stations", params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+    # A page cannot read the whole table, whether sized by limit or range
+    for params in [
+        {"limit": config.LIST_CURSOR_MAX_PAGE_SIZE + 1},
+        {"range": json.dumps([0, config.LIST_CURSOR_MAX_PAGE_SIZE])},
+    ]:
+        response = client.get(
+            f"{config.API_V1_PREFIX}/stations",
+            params={"cursor": "", **params},
+        )
+        assert response.status_code == 400
+    response = client.get(
+        f"{config.API_V1_PREFIX}/stations",
+        params={"cursor": "", "limit": config.LIST_CURSOR_MAX_PAGE_SIZE},
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_capped_count(async_session, monkeypatch):
+    async_session.add_all([Station(name=f"Lake {i}") for i in range(5)])
+    await async_session.commit()
+    monkeypatch.setattr(config, "LIST_COUNT_CAP", 3)
+    capped_crud = CRUD(
+        Station, StationRead, None, None, count_strategy="capped"
+    )
+
+    response = Response()
+    stations = await capped_crud.get_list(
+        response, async_session, range="[0, 1]"
+    )
+    assert len(stations) == 2
+    assert response.headers["Content-Range"] == "station 0-1/3"
+    assert response.headers["X-Total-Count-Accuracy"] == "at-least"
+
+    # Under the cap, or on the last page, the total is exact
+    response = Response()
+    await capped_crud.get_total_count(
+        response, None, "[0, 1]", '{"name": "Lake 1"}', async_session
+    )
+    assert response.headers["Content-Range"] == "station 0-1/1"
+    assert response.headers["X-Total-Count-Accuracy"] == "exact"
+
+    response = Response()
+    await capped_crud.get_list(response, async_session, range="[4, 5]")
+    assert response.headers["Content-Range"] == "station 4-5/5"
+    assert response.headers["X-Total-Count-Accuracy"] == "exact"
+
+    # A full page past the cap still leaves a next page to reach
+    async_session.add(Station(name="Lake 5"))
+    await async_session.commit()
+    response = Response()
+    stations = await capped_crud.get_list(
+        response, async_session, range="[3, 4]"
+    )
+    assert len(stations) == 2
+    assert response.headers["Content-Range"] == "station 3-4/5"
+    assert response.headers["X-Total-Count-Accuracy"] == "at-least"
+
+    # Estimates are only available on PostgreSQL
+    assert (
+        await capped_crud.choose_count_strategy(async_session, {}, "estimated")
+        == "exact"
+    )
+
+
+@pytest.mark.asyncio
+async def test_search(client, async_session):
+    async_session.add_all(
+        [
+            Station(name="Lake Geneva", acronym="LG"),
+            Station(name="Rhone", catchment_name="Lake Geneva basin"),
+            Station(name="Aare", acronym="100%"),
+            Station(name="Rhine", description="Lake Constance"),
+        ]
+    )
+    await async_session.commit()
+
+    # Case insensitive, in any searchable field (not the description)
+    _, headers, stations = get_stations(
+        client, filter={"q": "lake"}, sort=["name", "ASC"]
+    )
+    assert [x["name"] for x in stations] == ["Lake Geneva", "Rhone"]
+    assert headers["Content-Range"] == "stations 0-2/2"
+
+    # Wildcards in the text are matched literally
+    _, _, stations = get_stations(client, filter={"q": "0%"})
+    assert [x["name"] for x in stations] == ["Aare"]
+    _, _, stations = get_stations(client, filter={"q": "%"})
+    assert [x["name"] for x in stations] == ["Aare"]
+
+    response = client.get(
+        f"{config.API_V1_PREFIX}/stations/sensors",
+        params={"filter": '{"q": "lake"}'},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_filter_operators(client, async_session):
+    async_session.add_all(
+        [
+            Station(
+                name=f"Station {i}",
+                acronym=f"S{i}" if i % 2 else None,
+                time_added_utc=datetime.datetime(2024, 1, 1 + i),
+            )
+            for i in range(5)
+        ]
+    )
+    await async_session.commit()
+
+    def names(filter: dict) -> list[str]:
+        _, _, stations = get_stations(
+            client, filter=filter, sort=["name", "ASC"]
+        )
+
+        return [x["name"] for x in stations]
+
+    assert names(
+        {
+            "time_added_utc__gte": "2024-01-02",
+            "time_added_utc__lt": "2024-01-04T00:00:00Z",
+        }
+    ) == ["Station 1", "Station 2"]
+    assert names({"time_added_utc__gt": "2024-01-04"}) == ["Station 4"]
+    assert names({"time_added_utc__lte": "2024-01-01"}) == ["Station 0"]
+    assert names({"name__in": ["Station 1", "Station 3", "Station"]}) == [
+        "Station 1",
+        "Station 3",
+    ]
+    assert names({"acronym__isnull": True}) == [
+        "Station 0",
+        "Station 2",
+        "Station 4",
+    ]
+    assert names({"acronym__isnull": False, "name": "3"}) == ["Station 3"]
+
+    # Relationships are only set or not
+    station = (await async_session.exec(select(Station))).first()
+    sensor = Sensor(
+        serial_number="1", model="XYZ", parameter_id=uuid4(), field_id="A"
+    )
+    async_session.add_all(
+        [
+            sensor,
+            StationSensorAssignments(
+                station_id=station.id,
+                sensor_id=sensor.id,
+                sensor_position=1,
+                installed_on=datetime.datetime(2024, 1, 1),
+            ),
+        ]
+    )
+    await async_session.commit()
+    for filter in [
+        {"sensors__isnull": False},
+        {"sensor_link__isnull": False},
+        {"sensors": True},
+    ]:
+        assert names(filter) == [station.name]
+    assert len(names({"sensors__isnull": True})) == 4
+    assert len(names({"sensor_link": False})) == 4
+
+    # Multiple values of an exact match field are a single IN
+    query = crud.apply_filter(
+        select(Station), {"iterator": [1, 2, 3], "acronym__isnull": False}
+    )
+    assert "IN" in str(query)
+    assert " OR " not in str(query)
+
+    for filter in [
+        {"time_added_utc__gte": "yesterday"},
+        {"acronym__isnull": "maybe"},
+        {"unknown": 1},
+        {"name__between": "A"},
+        {"sensors__gte": 1},
+        {"sensors__in": [1]},
+        {"sensor_link__lt": 1},
+        {"sensors": "yes"},
+    ]:
+        response = client.get(
+            f"{config.API_V1_PREFIX}/stations",
+            params={"filter": json.dumps(filter)},
+        )
+        assert response.status_code == 400
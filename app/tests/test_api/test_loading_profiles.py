@@ -0,0 +1,90 @@
+import pytest
+import pytest_asyncio
+import datetime
+from uuid import uuid4
+from app.sensors.models import Sensor
+from app.sensor_parameters.models import SensorParameter
+from app.stations.models import Station, StationSensorAssignments
+from app.config import config
+
+
+@pytest_asyncio.fixture()
+async def station_with_sensor(async_session) -> tuple[str, str]:
+    parameter = SensorParameter(name="Temperature", acronym="T", unit="C")
+    station = Station(name="Test Station")
+    sensor = Sensor(
+        serial_number="12345",
+        model="XYZ",
+        parameter_id=parameter.id,
+        field_id="ABCD",
+    )
+    async_session.add_all([parameter, station, sensor])
+    await async_session.commit()
+    async_session.add(
+        StationSensorAssignments(
+            station_id=station.id,
+            sensor_id=sensor.id,
+            sensor_position=1,
+            installed_on=datetime.datetime(2024, 1, 1),
+        )
+    )
+    await async_session.commit()
+
+    return str(station.id), str(sensor.id)
+
+
+@pytest.mark.asyncio
+async def test_station_embed_profiles(client, station_with_sensor):
+    station_id, sensor_id = station_with_sensor
+    url = f"{config.API_V1_PREFIX}/stations"
+
+    # By default the relationships the station renders are all loaded
+    response = client.get(url)
+    assert response.status_code == 200
+    (station,) = response.json()
+    assert [x["id"] for x in station["sensors"]] == [sensor_id]
+    assert station["sensors"][0]["parameter"]["acronym"] == "T"
+    assert len(station["sensor_link"]) == 1
+
+    # Only the embedded relationships are loaded
+    response = client.get(url, params={"embed": "sensor_link"})
+    (station,) = response.json()
+    assert station["sensors"] is None  # Not embedded, rather than empty
+    assert len(station["sensor_link"]) == 1
+
+    response = client.get(f"{url}/{station_id}", params={"embed": "[]"})
+    assert response.status_code == 200
+    assert response.json()["sensor_link"] is None
+
+    response = client.get(f"{url}/{station_id}", params={"embed": "sensors"})
+    assert [x["id"] for x in response.json()["sensors"]] == [sensor_id]
+
+    response = client.get(url, params={"embed": "history"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_sensor_embed_profiles(client, station_with_sensor):
+    _, sensor_id = station_with_sensor
+    url = f"{config.API_V1_PREFIX}/sensors"
+
+    (sensor,) = client.get(url).json()
+    assert sensor["parameter"]["acronym"] == "T"
+    assert sensor["current_assignment"]["sensor_position"] == 1
+
+    (sensor,) = client.get(url, params={"embed": "parameter"}).json()
+    assert sensor["parameter"]["acronym"] == "T"
+    assert sensor["station_link"] is None
+
+    # The assignment properties do not depend on station_link's embedding
+    assert sensor["current_assignment"]["sensor_position"] == 1
+    for embed in ["parameter", "[]", None]:
+        response = client.get(f"{url}/{sensor_id}", params={"embed": embed})
+        assert response.status_code == 200
+        sensor = response.json()
+        assert sensor["current_assignment"]["sensor_position"] == 1
+        assert [x["sensor_position"] for x in sensor["history"]] == [1]
+
+    response = client.get(f"{config.API_V1_PREFIX}/sensor_parameters")
+    (parameter,) = response.json()
+    assert [x["id"] for x in parameter["sensors"]] == [sensor_id]
@@ -0,0 +1,53 @@
+import json
+import pytest
+from uuid import uuid4
+from app.metadata import get_model_metadata
+from app.sensors.models import Sensor
+from app.stations.models import StationSensorAssignments
+from app.config import config
+
+
+def test_model_metadata_classifies_fields():
+    metadata = get_model_metadata(Sensor)
+
+    assert {"id", "parameter_id", "iterator"} <= metadata.exact_match_fields
+    assert {"serial_number", "model", "field_id"} <= metadata.like_fields
+    assert "calibrations" not in metadata.sortable_fields  # JSON column
+    assert metadata.relationships == {"parameter", "station_link", "stations"}
+    assert metadata.searchable_fields == {"serial_number", "model", "field_id"}
+    assert get_model_metadata(Sensor) is metadata
+
+    # Optional UUIDs and numbers are matched exactly too
+    metadata = get_model_metadata(StationSensorAssignments)
+    assert {"sensor_id", "sensor_position"} <= metadata.exact_match_fields
+
+
+@pytest.mark.asyncio
+async def test_sensor_list_filters(client, async_session):
+    parameter_ids = [uuid4(), uuid4()]
+    async_session.add_all(
+        [
+            Sensor(
+                serial_number=f"SN-{i}",
+                model="XYZ",
+                parameter_id=parameter_ids[i % 2],
+                field_id=f"ABC{i}",
+            )
+            for i in range(3)
+        ]
+    )
+    await async_session.commit()
+    url = f"{config.API_V1_PREFIX}/sensors"
+
+    def filtered(filter: dict) -> list[str]:
+        response = client.get(url, params={"filter": json.dumps(filter)})
+        assert response.status_code == 200
+
+        return sorted(x["serial_number"] for x in response.json())
+
+    assert filtered({"parameter_id": str(parameter_ids[0])}) == [
+        "SN-0",
+        "SN-2",
+    ]
+    assert filtered({"serial_number": "N-1"}) == ["SN-1"]
+    assert filtered({"field_id": ["ABC0", "ABC1"]}) == ["SN-0", "SN-1"]
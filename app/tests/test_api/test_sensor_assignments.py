@@ -1,12 +1,15 @@
 import pytest
 import datetime
 from uuid import uuid4
+from sqlmodel import select
 from app.sensors.models import Sensor, SensorCreate, SensorRead
 from app.stations.models import (
     Station,
+    StationCurrentAssignment,
     StationSensorAssignments,
     StationSensorAssignmentsCreate,
 )
+from app.stations.services import refresh_current_assignments
 from app.config import config
 
 
@@ -79,3 +82,133 @@ async def test_sensor_assignments(client, async_session):
     assert history[1]["to"] == "2024-01-02T10:00:00"
     assert history[1]["station_id"] == str(station_id)
     assert history[1]["sensor_position"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_sensor_histories(client, async_session):
+    stations = [Station(name=f"Station {i}") for i in range(2)]
+    sensors = [
+        Sensor(
+            serial_number=str(i),
+            model="XYZ",
+            parameter_id=uuid4(),
+            field_id=f"ABC{i}",
+        )
+        for i in range(3)
+    ]
+    async_session.add_all([*stations, *sensors])
+    await async_session.commit()
+    station_ids = [x.id for x in stations]
+    sensor_ids = [x.id for x in sensors]
+
+    async_session.add_all(
+        [
+            StationSensorAssignments(
+                station_id=station_ids[0],
+                sensor_id=sensor_ids[0],
+                sensor_position=1,
+                installed_on=datetime.datetime(2024, 1, 1),
+            ),
+            StationSensorAssignments(  # Replaces the first sensor
+                station_id=station_ids[0],
+                sensor_id=sensor_ids[1],
+                sensor_position=1,
+                installed_on=datetime.datetime(2024, 2, 1),
+            ),
+            StationSensorAssignments(  # Moved away without a removal
+                station_id=station_ids[1],
+                sensor_id=sensor_ids[1],
+                sensor_position=3,
+                installed_on=datetime.datetime(2024, 3, 1),
+            ),
+            StationSensorAssignments(  # Unrelated removal
+                station_id=station_ids[1],
+                sensor_id=None,
+                sensor_position=5,
+                installed_on=datetime.datetime(2024, 3, 1),
+            ),
+        ]
+    )
+    await async_session.commit()
+
+    response = client.get(
+        f"{config.API_V1_PREFIX}/sensors/history",
+        params={"ids": [str(x) for x in sensor_ids]},
+    )
+    assert response.status_code == 200
+    histories = response.json()
+
+    assert histories[str(sensor_ids[0])] == [
+        {
+            "from": "2024-01-01T00:00:00",
+            "to": "2024-02-01T00:00:00",
+            "station_id": str(station_ids[0]),
+            "station_name": "Station 0",
+            "sensor_position": 1,
+        }
+    ]
+    assert [
+        (x["from"], x["to"], x["station_name"])
+        for x in histories[str(sensor_ids[1])]
+    ] == [
+        ("2024-03-01T00:00:00", None, "Station 1"),
+        ("2024-02-01T00:00:00", "2024-03-01T00:00:00", "Station 0"),
+    ]
+    assert histories[str(sensor_ids[2])] == []
+
+
+@pytest.mark.asyncio
+async def test_current_assignments_are_upserted(async_session):
+    """Refreshes update the current row in place, never to an older one"""
+    station = Station(name="Test Station")
+    sensors = [
+        Sensor(
+            serial_number=str(i),
+            model="XYZ",
+            parameter_id=uuid4(),
+            field_id=f"ABC{i}",
+        )
+        for i in range(2)
+    ]
+    async_session.add_all([station, *sensors])
+    await async_session.commit()
+    positions = {(station.id, 1)}
+
+    async def current_sensor_ids() -> list:
+        res = await async_session.exec(
+            select(StationCurrentAssignment.sensor_id)
+        )
+        return res.all()
+
+    newer = StationSensorAssignments(
+        station_id=station.id,
+        sensor_id=sensors[1].id,
+        sensor_position=1,
+        installed_on=datetime.datetime(2024, 2, 1),
+    )
+    async_session.add(newer)
+    await refresh_current_assignments(async_session, positions)
+    await refresh_current_assignments(async_session, positions)
+    await async_session.commit()
+    assert await current_sensor_ids() == [sensors[1].id]
+
+    # A backdated assignment does not replace the current one
+    async_session.add(
+        StationSensorAssignments(
+            station_id=station.id,
+            sensor_id=sensors[0].id,
+            sensor_position=1,
+            installed_on=datetime.datetime(2024, 1, 1),
+        )
+    )
+    await refresh_current_assignments(async_session, positions)
+    await async_session.commit()
+    assert await current_sensor_ids() == [sensors[1].id]
+
+    # Once no assignment is left, the position has no current row
+    res = await async_session.exec(select(StationSensorAssignments))
+    for assignment in res.all():
+        await async_session.delete(assignment)
+    await refresh_current_assignments(async_session, positions)
+    await async_session.commit()
+    assert await current_sensor_ids() == []
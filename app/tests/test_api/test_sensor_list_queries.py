@@ -0,0 +1,77 @@
+import pytest
+import datetime
+from uuid import uuid4
+from sqlalchemy import event
+from app.sensors.models import Sensor
+from app.stations.models import Station, StationSensorAssignments
+from app.tests.conftest import engine
+from app.config import config
+
+
+async def add_assigned_sensors(async_session, station: Station, count: int):
+    """Add sensors, each assigned to its own position of the station"""
+
+    sensors = [
+        Sensor(
+            serial_number=str(i),
+            model="XYZ",
+            parameter_id=uuid4(),
+            field_id=f"{station.name}{i}",
+        )
+        for i in range(count)
+    ]
+    async_session.add_all(sensors)
+    async_session.add_all(
+        [
+            StationSensorAssignments(
+                station_id=station.id,
+                sensor_id=sensor.id,
+                sensor_position=i + 1,
+                installed_on=datetime.datetime(2024, 1, 1),
+            )
+            for i, sensor in enumerate(sensors)
+        ]
+    )
+    await async_session.commit()
+
+
+def count_list_queries(client) -> tuple[int, list[dict]]:
+    """Count the SQL statements run by the sensor list endpoint"""
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        response = client.get(f"{config.API_V1_PREFIX}/sensors")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+
+    return len(statements), response.json()
+
+
+@pytest.mark.asyncio
+async def test_sensor_list_runs_constant_queries(client, async_session):
+    station = Station(name="A")
+    async_session.add(station)
+    await async_session.commit()
+
+    await add_assigned_sensors(async_session, station, 2)
+    async_session.expire_all()
+    few_queries, sensors = count_list_queries(client)
+    assert len(sensors) == 2
+    assert all(x["current_assignment"] is not None for x in sensors)
+
+    other_station = Station(name="B")
+    async_session.add(other_station)
+    await async_session.commit()
+    await add_assigned_sensors(async_session, other_station, 8)
+    async_session.expire_all()
+    many_queries, sensors = count_list_queries(client)
+    assert len(sensors) == 10
+    assert all(x["current_assignment"] is not None for x in sensors)
+
+    assert many_queries == few_queries
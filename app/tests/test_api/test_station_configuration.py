@@ -0,0 +1,193 @@
+import pytest
+import datetime
+from uuid import uuid4
+from app.sensors.models import Sensor
+from app.stations.models import Station, StationSensorAssignments
+from app.stations.services import AssignmentResolver
+from app.config import config
+
+
+@pytest.mark.asyncio
+async def test_station_configuration_as_of(client, async_session):
+    station = Station(name="Test Station")
+    other_station = Station(name="Other Station")
+    sensors = [
+        Sensor(
+            serial_number=str(i),
+            model="XYZ",
+            parameter_id=uuid4(),
+            field_id=f"ABC{i}",
+        )
+        for i in range(2)
+    ]
+    async_session.add_all([station, other_station, *sensors])
+    await async_session.commit()
+    station_id, other_station_id = station.id, other_station.id
+    sensor_ids = [x.id for x in sensors]
+
+    async_session.add_all(
+        [
+            StationSensorAssignments(
+                station_id=station_id,
+                sensor_id=sensor_ids[0],
+                sensor_position=1,
+                installed_on=datetime.datetime(2024, 1, 1),
+            ),
+            StationSensorAssignments(
+                station_id=station_id,
+                sensor_id=sensor_ids[1],
+                sensor_position=2,
+                installed_on=datetime.datetime(2024, 1, 1),
+            ),
+            StationSensorAssignments(  # Position 2 emptied
+                station_id=station_id,
+                sensor_id=None,
+                sensor_position=2,
+                installed_on=datetime.datetime(2024, 2, 1),
+            ),
+            StationSensorAssignments(  # Moved without emptying position 1
+                station_id=other_station_id,
+                sensor_id=sensor_ids[0],
+                sensor_position=1,
+                installed_on=datetime.datetime(2024, 3, 1),
+            ),
+        ]
+    )
+    await async_session.commit()
+
+    resolver = await AssignmentResolver.load(async_session)
+    resolved = resolver.resolve(
+        station_id,
+        1,
+        [
+            datetime.datetime(2023, 12, 31),
+            datetime.datetime(2024, 1, 1),
+            datetime.datetime(2024, 2, 15),
+            datetime.datetime(2024, 3, 1),
+        ],
+    )
+    assert [x.sensor_id if x else None for x in resolved] == [
+        None,
+        sensor_ids[0],
+        sensor_ids[0],
+        None,
+    ]
+
+    url = f"{config.API_V1_PREFIX}/stations/{station_id}/configuration"
+    response = client.get(url, params={"at": "2024-01-15T00:00:00"})
+    assert response.status_code == 200
+    configuration = response.json()
+    assert [x["sensor_position"] for x in configuration] == [1, 2]
+    assert configuration[1]["sensor_id"] == str(sensor_ids[1])
+    assert configuration[1]["valid_to"] == "2024-02-01T00:00:00"
+
+    response = client.get(url, params={"at": "2024-02-15T00:00:00"})
+    assert [x["sensor_id"] for x in response.json()] == [str(sensor_ids[0])]
+
+    response = client.get(url)
+    assert response.json() == []
+
+    response = client.get(
+        f"{config.API_V1_PREFIX}/stations/{uuid4()}/configuration"
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_current_sensors_maintained_on_writes(client, async_session):
+    stations = [Station(name=f"Station {i}") for i in range(2)]
+    sensors = [
+        Sensor(
+            serial_number=str(i),
+            model="XYZ",
+            parameter_id=uuid4(),
+            field_id=f"ABC{i}",
+        )
+        for i in range(2)
+    ]
+    async_session.add_all([*stations, *sensors])
+    await async_session.commit()
+    station_ids = [str(x.id) for x in stations]
+    sensor_ids = [str(x.id) for x in sensors]
+
+    def assign(station: int, sensor: int, position: int, day: int) -> dict:
+        response = client.post(
+            f"{config.API_V1_PREFIX}/stations/sensors",
+            json={
+                "station_id": station_ids[station],
+                "sensor_id": sensor_ids[sensor],
+                "sensor_position": position,
+                "installed_on": f"2024-01-{day:02d}T00:00:00",
+            },
+        )
+        assert response.status_code == 200
+
+        return response.json()
+
+    def current(station: int) -> list[tuple[int, str | None]]:
+        response = client.get(
+            f"{config.API_V1_PREFIX}/stations/{station_ids[station]}/sensors"
+        )
+        assert response.status_code == 200
+
+        return [
+            (x["sensor_position"], x["sensor_id"]) for x in response.json()
+        ]
+
+    assign(0, 0, 1, 1)
+    second = assign(0, 1, 2, 1)
+    assert current(0) == [(1, sensor_ids[0]), (2, sensor_ids[1])]
+
+    # Moving a sensor empties its previous position
+    assign(1, 0, 1, 2)
+    assert current(0) == [(1, None), (2, sensor_ids[1])]
+    assert current(1) == [(1, sensor_ids[0])]
+
+    # Moving an assignment to another position frees the old one
+    response = client.put(
+        f"{config.API_V1_PREFIX}/stations/sensors/{second['id']}",
+        json={
+            "station_id": station_ids[0],
+            "sensor_id": sensor_ids[1],
+            "sensor_position": 3,
+            "installed_on": "2024-01-01T00:00:00",
+        },
+    )
+    assert response.status_code == 200
+    assert current(0) == [(1, None), (3, sensor_ids[1])]
+
+    response = client.delete(
+        f"{config.API_V1_PREFIX}/stations/sensors/{second['id']}"
+    )
+    assert response.status_code == 200
+    assert current(0) == [(1, None)]
+
+
+@pytest.mark.asyncio
+async def test_assignment_times_stored_in_utc(client, async_session):
+    station = Station(name="Test Station")
+    sensor = Sensor(
+        serial_number="1", model="XYZ", parameter_id=uuid4(), field_id="A"
+    )
+    async_session.add_all([station, sensor])
+    await async_session.commit()
+
+    response = client.post(
+        f"{config.API_V1_PREFIX}/stations/sensors",
+        json={
+            "station_id": str(station.id),
+            "sensor_id": str(sensor.id),
+            "sensor_position": 1,
+            "installed_on": "2024-01-01T02:00:00+02:00",
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["installed_on"] == "2024-01-01T00:00:00"
+
+    # Resolved at the same instant, whatever the offset it is given in
+    url = f"{config.API_V1_PREFIX}/stations/{station.id}/configuration"
+    for at in ["2024-01-01T00:00:00Z", "2024-01-01T01:00:00+01:00"]:
+        response = client.get(url, params={"at": at})
+        assert [x["sensor_id"] for x in response.json()] == [str(sensor.id)]
+    response = client.get(url, params={"at": "2024-01-01T00:30:00+01:00"})
+    assert response.json() == []
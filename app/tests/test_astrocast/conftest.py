@@ -0,0 +1,67 @@
+import pytest
+import aiohttp
+import base64
+from uuid import uuid4
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: list[dict]):
+        self.status = status
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+
+class FakeClient:
+    """Answers each request with the next of a list of responses"""
+
+    closed = False
+
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+        self.requests = []  # The url and options of each request
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        return self.responses.pop(0)
+
+
+@pytest.fixture()
+def astrocast_messages() -> list[dict]:
+    """Messages as returned by the Astrocast API /messages endpoint"""
+
+    device_guid = str(uuid4())
+    messages = []
+    for i, raw in enumerate(
+        [
+            "15799968000445225100030027038822980099008105110000",
+            "15800184000446225000030027038922970099008105120000",
+            "15800400000447224900030027039022960099008105130000",
+        ]
+    ):
+        messages.append(
+            {
+                "messageGuid": str(uuid4()),
+                "deviceGuid": device_guid,
+                "createdDate": f"2020-01-26T0{i}:00:00Z",
+                "receivedDate": f"2020-01-26T0{i}:05:00Z",
+                "latitude": 46.52,
+                "longitude": 6.56,
+                "data": base64.b64encode(raw.encode()).decode(),
+                "messageSize": len(raw),
+                "callbackDeliveryStatus": 0,
+            }
+        )
+
+    return messages
@@ -0,0 +1,148 @@
+import pytest
+import asyncio
+import datetime
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.astrocast import classes
+from app.astrocast.classes import AstrocastAPI, get_astrocast_api
+from app.astrocast.leader import LeaderElection
+from app.astrocast.models import AstrocastBackfillCreate, AstrocastMessage
+from app.astrocast.utils import get_checkpoint, split_date_range
+from app.config import config
+from app.main import app
+from app.tests.conftest import engine
+
+
+def test_split_date_range():
+    start = datetime.datetime(2020, 1, 26)
+    windows = split_date_range(
+        start, start + datetime.timedelta(hours=50), datetime.timedelta(1)
+    )
+    assert windows == [
+        (start, datetime.datetime(2020, 1, 27)),
+        (datetime.datetime(2020, 1, 27), datetime.datetime(2020, 1, 28)),
+        (datetime.datetime(2020, 1, 28), datetime.datetime(2020, 1, 28, 2)),
+    ]
+    assert split_date_range(start, start, datetime.timedelta(1)) == []
+
+
+@pytest.fixture
+def astrocast_api(async_session, monkeypatch, tmp_path) -> AstrocastAPI:
+    """An API client backfilling into the test database"""
+    monkeypatch.setattr(
+        classes,
+        "async_session",
+        sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+    )
+    api = AstrocastAPI()
+    api.backfill_lock = LeaderElection(
+        db_engine=engine, lock_file=str(tmp_path / "backfill.lock")
+    )
+
+    return api
+
+
+@pytest.mark.asyncio
+async def test_backfill_windows_and_counts(
+    async_session,
+    astrocast_api: AstrocastAPI,
+    astrocast_messages: list[dict],
+):
+    """Each window's messages are inserted once, the checkpoint follows"""
+    requested = []
+
+    async def fetch_messages(start, end) -> list[dict]:
+        requested.append((start, end))
+        return [
+            x
+            for x in astrocast_messages
+            if start.isoformat() <= x["receivedDate"][:19] < end.isoformat()
+        ]
+
+    astrocast_api.fetch_messages = fetch_messages
+    start = datetime.datetime(2020, 1, 26)
+    windows = split_date_range(
+        start,
+        datetime.datetime(2020, 1, 26, 3),
+        datetime.timedelta(hours=2),
+    )
+    checkpoint = "backfill-test"
+
+    result = await astrocast_api.backfill_messages(windows, checkpoint)
+    assert sorted(requested) == windows
+    assert (result.inserted, result.skipped) == (3, 0)
+    assert await get_checkpoint(
+        async_session, checkpoint, warm_start=False
+    ) == datetime.datetime(2020, 1, 26, 3)
+
+    result = await astrocast_api.backfill_messages(windows, checkpoint)
+    assert (result.inserted, result.skipped) == (0, 3)
+    res = await async_session.exec(select(AstrocastMessage))
+    assert len(res.all()) == 3
+
+
+@pytest.mark.asyncio
+async def test_single_backfill_across_workers(
+    astrocast_api: AstrocastAPI,
+    tmp_path,
+):
+    """A running backfill blocks others in this and any other worker"""
+    release = asyncio.Event()
+
+    async def fetch_messages(start, end) -> list[dict]:
+        await release.wait()
+        return []
+
+    astrocast_api.fetch_messages = fetch_messages
+    backfill = AstrocastBackfillCreate(
+        startReceivedDate=datetime.datetime(2020, 1, 26),
+        endReceivedDate=datetime.datetime(2020, 1, 27),
+        window_hours=6,
+    )
+    started = await astrocast_api.start_backfill(backfill)
+    assert started.windows == 4
+    assert astrocast_api.is_backfilling
+
+    other_worker = AstrocastAPI()
+    other_worker.backfill_lock = LeaderElection(
+        db_engine=engine, lock_file=str(tmp_path / "backfill.lock")
+    )
+    assert await astrocast_api.start_backfill(backfill) is None
+    assert await other_worker.start_backfill(backfill) is None
+
+    # The lock is released once the backfill ends
+    release.set()
+    await astrocast_api.backfill_task
+    assert await other_worker.start_backfill(backfill) is not None
+    await other_worker.backfill_task
+
+
+@pytest.mark.asyncio
+async def test_backfill_endpoint(
+    client,
+    astrocast_api: AstrocastAPI,
+    tmp_path,
+):
+    url = f"{config.API_V1_PREFIX}/astrocast/messages/backfill"
+    app.dependency_overrides[get_astrocast_api] = lambda: astrocast_api
+
+    response = client.post(
+        url,
+        json={
+            "startReceivedDate": "2020-01-27T00:00:00Z",
+            "endReceivedDate": "2020-01-26T00:00:00Z",
+        },
+    )
+    assert response.status_code == 400
+
+    # Another worker is backfilling
+    other_worker_lock = LeaderElection(
+        db_engine=engine, lock_file=str(tmp_path / "backfill.lock")
+    )
+    assert await other_worker_lock.acquire()
+    response = client.post(
+        url, json={"startReceivedDate": "2020-01-26T00:00:00Z"}
+    )
+    assert response.status_code == 409
+    await other_worker_lock.release()
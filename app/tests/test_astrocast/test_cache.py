@@ -0,0 +1,68 @@
+import pytest
+import aiohttp
+import asyncio
+from uuid import uuid4
+from app.astrocast.cache import TTLCache
+from app.astrocast.classes import AstrocastAPI
+from app.tests.test_astrocast.conftest import FakeClient, FakeResponse
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    """Concurrent misses for one key make a single upstream call"""
+    cache = TTLCache(ttl_seconds=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["device"]
+
+    results = await asyncio.gather(
+        *[cache.get("devices", loader) for _ in range(5)]
+    )
+
+    assert calls == 1
+    assert all(result == ["device"] for result in results)
+    assert cache.stats.misses == 5
+
+    assert await cache.get("devices", loader) == ["device"]
+    assert cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_served_while_refreshing():
+    """Expired entries in the stale window return the old value"""
+    cache = TTLCache(ttl_seconds=0, stale_seconds=60, max_size=1)
+    cache.set("devices", "old")
+
+    async def loader():
+        return "new"
+
+    assert await cache.get("devices", loader) == "old"
+    assert cache.stats.stale_hits == 1
+
+    await asyncio.sleep(0)  # Let the background refresh complete
+    assert cache.entries["devices"][1] == "new"
+
+    cache.set("summaries", "value")  # Evicts the least recently used
+    assert "devices" not in cache.entries
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_errors_are_not_cached():
+    """A failed device request raises instead of caching no devices"""
+    device = {"deviceGuid": str(uuid4()), "deviceType": 1, "name": "A"}
+    astrocast = AstrocastAPI()
+    astrocast.client = FakeClient(
+        FakeResponse(503, []), FakeResponse(200, [device])
+    )
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await astrocast.get_cached_devices()
+    assert "devices" not in astrocast.device_cache.entries
+
+    devices = await astrocast.get_cached_devices()
+    assert [x.name for x in devices] == ["A"]
@@ -0,0 +1,32 @@
+import pytest
+from sqlmodel import select
+from app.astrocast.models import AstrocastMessage
+from app.config import config
+
+
+@pytest.mark.asyncio
+async def test_callback_ingests_and_deduplicates(
+    client,
+    async_session,
+    astrocast_messages: list[dict],
+):
+    """Callbacks accept single and batched messages, skipping duplicates"""
+    url = f"{config.API_V1_PREFIX}/astrocast/callback"
+
+    response = client.post(url, json=astrocast_messages[:2])
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 2
+
+    # Astrocast retries a delivery, then delivers the next message alone
+    response = client.post(url, json=astrocast_messages[1])
+    assert response.json()["inserted"] == 0
+    assert response.json()["skipped"] == 1
+
+    response = client.post(url, json=astrocast_messages[2])
+    assert response.json()["inserted"] == 1
+
+    res = await async_session.exec(select(AstrocastMessage))
+    assert len(res.all()) == 3
+
+    response = client.post(url, json={"data": "missing guids"})
+    assert response.status_code == 422
@@ -0,0 +1,56 @@
+import pytest
+import datetime
+from uuid import uuid4
+from app.astrocast.classes import AstrocastAPI
+from app.config import config
+from app.tests.test_astrocast.conftest import FakeClient, FakeResponse
+
+
+@pytest.mark.asyncio
+async def test_shared_client_reused_and_closed():
+    """Calls share one client, which is closed on shutdown"""
+    astrocast = AstrocastAPI(api_url="http://astrocast.invalid")
+
+    client = await astrocast.get_client()
+    assert await astrocast.get_client() is client
+    assert not client.closed
+
+    await astrocast.close()
+    assert client.closed
+    assert astrocast.client is None
+    assert astrocast.poll_messages is False
+
+    # A client is opened again if needed after shutdown
+    reopened = await astrocast.get_client()
+    assert reopened is not client
+    await astrocast.close()
+
+
+@pytest.mark.asyncio
+async def test_every_request_has_a_timeout():
+    """A stalled Astrocast call cannot hold up the caller for long"""
+    device_guid = str(uuid4())
+    astrocast = AstrocastAPI(api_url="http://astrocast.invalid")
+    astrocast.client = FakeClient(
+        *[FakeResponse(200, []) for _ in range(5)],
+        FakeResponse(200, {"deviceGuid": device_guid, "deviceType": 1}),
+    )
+
+    await astrocast.get_messages(only_new_messages=False)
+    await astrocast.fetch_messages(
+        datetime.datetime(2020, 1, 1), datetime.datetime(2020, 1, 2)
+    )
+    await astrocast.get_devices()
+    await astrocast.get_device_summaries()
+    await astrocast.update_device_types()
+    await astrocast.get_device(device_guid)
+
+    timeouts = [x["timeout"].total for _, x in astrocast.client.requests]
+    assert timeouts == [
+        config.ASTROCAST_MESSAGES_TIMEOUT_SECONDS,
+        config.ASTROCAST_MESSAGES_TIMEOUT_SECONDS,
+        config.ASTROCAST_DEVICE_TIMEOUT_SECONDS,
+        config.ASTROCAST_DEVICE_TIMEOUT_SECONDS,
+        config.ASTROCAST_DEVICE_TIMEOUT_SECONDS,
+        config.ASTROCAST_DEVICE_TIMEOUT_SECONDS,
+    ]
@@ -0,0 +1,138 @@
+import pytest
+import datetime
+from uuid import uuid4
+from sqlmodel import select
+from app.astrocast.utils import insert_messages
+from app.sensors.models import Sensor
+from app.stations.models import Station, StationSensorAssignments
+from app.stations.data.models import StationData, UndecodedMessage
+from app.stations.data.services import (
+    decode_messages,
+    retry_undecoded_messages,
+)
+
+
+@pytest.mark.asyncio
+async def test_messages_decoded_into_station_data(
+    async_session,
+    astrocast_messages: list[dict],
+):
+    """Values are attributed to the sensor installed when they were recorded"""
+    await insert_messages(
+        async_session, astrocast_messages, datetime.datetime(2020, 1, 27)
+    )
+    await async_session.commit()
+
+    # Without a station the messages are recorded for a later retry, and the
+    # checkpoint moves past them
+    assert await decode_messages(async_session) == 3
+    assert await decode_messages(async_session) == 0
+    await async_session.commit()
+    res = await async_session.exec(select(UndecodedMessage))
+    undecoded = res.all()
+    assert {x.reason for x in undecoded} == {"no_station"}
+    assert all(x.next_attempt_at is not None for x in undecoded)
+
+    # Once the device is installed at a station, the next sweep decodes them
+    station = Station(
+        name="Test Station",
+        associated_astrocast_device=astrocast_messages[0]["deviceGuid"],
+    )
+    sensors = [
+        Sensor(
+            serial_number=str(i),
+            model="XYZ",
+            parameter_id=uuid4(),
+            field_id=f"ABC{i}",
+            calibrations=[
+                {
+                    "calibrated_on": "2020-01-01T00:00:00",
+                    "slope": 2.0,
+                    "intercept": 1.0,
+                    "min_range": 0.0,
+                    "max_range": 4096.0,
+                }
+            ],
+        )
+        for i in range(2)
+    ]
+    async_session.add_all([station, *sensors])
+    async_session.add_all(
+        [
+            StationSensorAssignments(
+                station_id=station.id,
+                sensor_id=sensors[0].id,
+                sensor_position=1,
+                installed_on=datetime.datetime(2020, 1, 1),
+            ),
+            StationSensorAssignments(  # After the first message
+                station_id=station.id,
+                sensor_id=sensors[1].id,
+                sensor_position=2,
+                installed_on=datetime.datetime(2020, 1, 26, 3),
+            ),
+        ]
+    )
+    await retry_undecoded_messages(async_session, {station.id})
+    await async_session.commit()
+
+    assert await decode_messages(async_session, batch_size=2) == 2
+    assert await decode_messages(async_session, batch_size=2) == 1
+    assert await decode_messages(async_session, batch_size=2) == 0
+    await async_session.commit()
+
+    res = await async_session.exec(
+        select(StationData).order_by(StationData.recorded_at)
+    )
+    rows = res.all()
+    assert len(rows) == 5
+    assert rows[0].sensor_id == sensors[0].id
+    assert rows[0].raw_value == 445
+    assert rows[0].corrected_value == pytest.approx(2 * 445 + 1)
+    assert rows[0].recorded_at == datetime.datetime(2020, 1, 26)
+
+    # Decoded messages are no longer retried
+    res = await async_session.exec(select(UndecodedMessage))
+    assert res.all() == []
+
+    # A backdated assignment queues the messages since its installation, the
+    # first message gains its second value once decoded again
+    assignment = (
+        await async_session.exec(
+            select(StationSensorAssignments).where(
+                StationSensorAssignments.sensor_position == 2
+            )
+        )
+    ).one()
+    assignment.installed_on = datetime.datetime(2020, 1, 25)
+    async_session.add(assignment)
+    await retry_undecoded_messages(
+        async_session, {station.id}, since=assignment.installed_on
+    )
+    assert await decode_messages(async_session) == 3
+    await async_session.commit()
+
+    res = await async_session.exec(select(StationData))
+    assert len(res.all()) == 6
+
+
+@pytest.mark.asyncio
+async def test_recent_messages_wait_for_the_lag(
+    async_session,
+    astrocast_messages: list[dict],
+):
+    """The checkpoint does not pass messages that may still be committing"""
+    await insert_messages(
+        async_session, astrocast_messages[:1], datetime.datetime(2020, 1, 27)
+    )
+    await insert_messages(
+        async_session, astrocast_messages[1:], datetime.datetime.utcnow()
+    )
+    await async_session.commit()
+
+    assert await decode_messages(async_session) == 1
+    assert await decode_messages(async_session) == 0
+    await async_session.commit()
+
+    res = await async_session.exec(select(UndecodedMessage))
+    assert len(res.all()) == 1
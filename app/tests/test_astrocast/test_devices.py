@@ -0,0 +1,43 @@
+import pytest
+from uuid import uuid4
+from app.astrocast.models import AstrocastDeviceRead
+from app.astrocast.utils import upsert_devices
+from app.config import config
+
+
+@pytest.mark.asyncio
+async def test_devices_served_from_registry(client, async_session):
+    """Synced devices are upserted on deviceGuid and filtered in SQL"""
+    devices = [
+        AstrocastDeviceRead(
+            deviceGuid=uuid4(),
+            name=f"Station {i}",
+            serialNumber=f"SN-{i}",
+            lastMessageDate="2024-05-01T10:00:00Z",
+        )
+        for i in range(3)
+    ]
+    assert await upsert_devices(async_session, devices) == 3
+    await async_session.commit()
+
+    # A later sync updates the existing row instead of adding one
+    devices[0].name = "Renamed"
+    assert await upsert_devices(async_session, devices[:1]) == 1
+    await async_session.commit()
+
+    response = client.get(
+        f"{config.API_V1_PREFIX}/astrocast/devices/",
+        params={"sort": '["name","DESC"]'},
+    )
+    assert response.status_code == 200
+    assert [x["name"] for x in response.json()] == [
+        "Station 2",
+        "Station 1",
+        "Renamed",
+    ]
+
+    response = client.get(
+        f"{config.API_V1_PREFIX}/astrocast/devices/",
+        params={"filter": '{"serialNumber":"SN-1"}'},
+    )
+    assert [x["id"] for x in response.json()] == [str(devices[1].deviceGuid)]
@@ -0,0 +1,56 @@
+import pytest
+import datetime
+from sqlmodel import select
+from app.astrocast.models import AstrocastMessage
+from app.astrocast.utils import insert_messages, get_checkpoint
+
+
+@pytest.mark.asyncio
+async def test_insert_messages_skips_duplicates(
+    async_session,
+    astrocast_messages: list[dict],
+):
+    """Duplicate messageGuids are skipped by the database, not raised"""
+    requested_at = datetime.datetime(2020, 1, 27)
+
+    result = await insert_messages(
+        async_session, astrocast_messages[:2], requested_at
+    )
+    await async_session.commit()
+    assert (result.inserted, result.skipped) == (2, 0)
+
+    # Re-poll with an overlap and a small batch size to span statements
+    result = await insert_messages(
+        async_session, astrocast_messages, requested_at, batch_size=2
+    )
+    await async_session.commit()
+    assert (result.inserted, result.skipped) == (1, 2)
+
+    res = await async_session.exec(select(AstrocastMessage))
+    stored = res.all()
+    assert len(stored) == 3
+    assert stored[0].receivedDate == datetime.datetime(2020, 1, 26, 0, 5)
+    assert stored[0].decoded_data == (
+        "15799968000445225100030027038822980099008105110000"
+    )
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_advances_with_ingest(
+    async_session,
+    astrocast_messages: list[dict],
+):
+    """The checkpoint follows the latest receivedDate and never moves back"""
+    requested_at = datetime.datetime(2020, 1, 27)
+
+    assert await get_checkpoint(async_session) is None
+
+    await insert_messages(async_session, astrocast_messages, requested_at)
+    await async_session.commit()
+    latest = datetime.datetime(2020, 1, 26, 2, 5)
+    assert await get_checkpoint(async_session) == latest
+
+    # An older batch (ie. a backfill) leaves the checkpoint where it was
+    await insert_messages(async_session, astrocast_messages[:1], requested_at)
+    await async_session.commit()
+    assert await get_checkpoint(async_session) == latest
@@ -0,0 +1,53 @@
+import pytest
+import asyncio
+from app.astrocast.classes import AstrocastAPI, get_astrocast_api
+from app.astrocast.leader import LeaderElection, get_leader_election
+from app.config import config
+from app.main import app
+from app.tests.conftest import engine
+
+
+@pytest.mark.asyncio
+async def test_single_leader_with_failover(tmp_path):
+    """Only one instance holds the lock, another takes over on release"""
+    lock_file = str(tmp_path / "astrocast.lock")
+    first = LeaderElection(db_engine=engine, lock_file=lock_file)
+    second = LeaderElection(db_engine=engine, lock_file=lock_file)
+    second.instance_id = "second-instance"
+
+    assert await first.acquire() is True
+    assert await second.acquire() is False
+    assert await second.get_leader() == first.instance_id
+
+    await first.release()
+    assert await second.acquire() is True
+    assert await first.get_leader() == "second-instance"
+
+    await second.release()
+
+
+def test_only_the_leader_polls(client, tmp_path):
+    """Other instances report the leader and reject poll requests"""
+    lock_file = str(tmp_path / "astrocast.lock")
+    leader = LeaderElection(db_engine=engine, lock_file=lock_file)
+    leader.instance_id = "leader-instance"
+    follower = LeaderElection(db_engine=engine, lock_file=lock_file)
+    astrocast = AstrocastAPI()
+    app.dependency_overrides[get_astrocast_api] = lambda: astrocast
+    app.dependency_overrides[get_leader_election] = lambda: follower
+
+    asyncio.run(leader.acquire())
+    try:
+        response = client.get(f"{config.API_V1_PREFIX}/astrocast/status")
+        assert response.status_code == 200
+        assert response.json()["is_polling_messages"] is False
+        assert response.json()["is_leader"] is False
+        assert response.json()["leader"] == "leader-instance"
+
+        response = client.post(
+            f"{config.API_V1_PREFIX}/astrocast/messages/poll"
+        )
+        assert response.status_code == 409
+        assert "leader-instance" in response.json()["detail"]
+    finally:
+        asyncio.run(leader.release())
@@ -0,0 +1,89 @@
+import pytest
+import asyncio
+import datetime
+import httpx
+from app.astrocast.classes import AstrocastAPI, get_astrocast_api
+from app.astrocast.leader import LeaderElection, get_leader_election
+from app.astrocast.scheduler import PollingScheduler
+from app.config import config
+from app.main import app
+from app.tests.conftest import engine
+
+
+def test_interval_adapts_within_bounds():
+    """Polls with messages shorten the interval, empty polls back off"""
+    scheduler = PollingScheduler(
+        interval_seconds=60,
+        min_interval_seconds=10,
+        max_interval_seconds=600,
+    )
+
+    assert scheduler.record_poll(new_messages=5) == 30
+    assert scheduler.record_poll(new_messages=5) == 15
+    assert scheduler.record_poll(new_messages=5) == 10
+
+    intervals = [scheduler.record_poll(new_messages=0) for _ in range(8)]
+    assert intervals == [20, 40, 80, 160, 320, 600, 600, 600]
+
+
+@pytest.mark.asyncio
+async def test_trigger_wakes_the_poller():
+    """A triggered poll does not wait for the interval to elapse"""
+    scheduler = PollingScheduler(
+        interval_seconds=600,
+        min_interval_seconds=10,
+        max_interval_seconds=600,
+    )
+
+    waiter = asyncio.create_task(scheduler.wait())
+    await asyncio.sleep(0)
+    scheduler.trigger()
+
+    await asyncio.wait_for(waiter, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_poll_endpoint_wakes_the_poller(tmp_path):
+    """POST /messages/poll polls now and returns the scheduler state"""
+    astrocast = AstrocastAPI()
+    leader = LeaderElection(
+        db_engine=engine, lock_file=str(tmp_path / "astrocast.lock")
+    )
+    polled = asyncio.Queue()
+
+    async def get_messages() -> int:
+        polled.put_nowait(datetime.datetime.utcnow())
+        return 0
+
+    astrocast.get_messages = get_messages
+    app.dependency_overrides[get_astrocast_api] = lambda: astrocast
+    app.dependency_overrides[get_leader_election] = lambda: leader
+    await leader.acquire()
+    poller = asyncio.create_task(
+        astrocast.start_collecting_messages(interval_seconds=300)
+    )
+    try:
+        await asyncio.wait_for(polled.get(), timeout=1)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                f"{config.API_V1_PREFIX}/astrocast/messages/poll"
+            )
+        assert response.status_code == 200
+        status = response.json()
+        assert status["is_polling_messages"] is True
+        assert status["is_leader"] is True
+        assert status["polling_interval_seconds"] == 600  # Backed off
+        assert (
+            astrocast.scheduler.next_poll_time
+            <= datetime.datetime.utcnow()
+        )
+
+        # The poller does not wait for the interval to elapse
+        await asyncio.wait_for(polled.get(), timeout=1)
+    finally:
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+        await leader.release()
+        app.dependency_overrides.clear()
@@ -0,0 +1,85 @@
+import pytest
+import datetime
+import numpy as np
+from uuid import uuid4
+from app.sensors.models import Sensor
+from app.sensors.services import CalibrationIndex, calibration_indexes
+from app.config import config
+
+
+@pytest.fixture()
+def calibrations() -> list[dict]:
+    """Calibrations of a sensor, stored out of order"""
+
+    return [
+        {
+            "calibrated_on": "2021-01-01T00:00:00",
+            "slope": 2.0,
+            "intercept": 0.0,
+            "min_range": 0.0,
+            "max_range": 10.0,
+        },
+        {
+            "calibrated_on": "2020-01-01T00:00:00",
+            "slope": 1.0,
+            "intercept": 0.0,
+            "min_range": 0.0,
+            "max_range": 10.0,
+        },
+    ]
+
+
+def test_calibration_index_batch_lookup(calibrations: list[dict]):
+    index = CalibrationIndex(calibrations)
+    timestamps = [
+        datetime.datetime(2019, 6, 1),
+        datetime.datetime(2020, 1, 1),
+        datetime.datetime(2020, 6, 1),
+        datetime.datetime(2022, 1, 1),
+    ]
+
+    assert index.lookup(timestamps).tolist() == [-1, 0, 0, 1]
+
+    parameters = index.parameters_at(timestamps)
+    assert np.isnan(parameters[0]).all()
+    assert parameters[1:, 0].tolist() == [1.0, 1.0, 2.0]
+
+    assert index.at(datetime.datetime(2019, 6, 1)) is None
+    assert index.at(datetime.datetime(2021, 6, 1))["slope"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_calibration_index_invalidated_on_update(
+    client,
+    async_session,
+    calibrations: list[dict],
+):
+    sensor = Sensor(
+        serial_number="12345",
+        model="XYZ",
+        parameter_id=uuid4(),
+        field_id="ABCD",
+        calibrations=calibrations[1:],
+    )
+    async_session.add(sensor)
+    await async_session.commit()
+    sensor_id = sensor.id
+
+    indexes = await calibration_indexes.get_many(async_session, {sensor_id})
+    assert len(indexes[sensor_id]) == 1
+
+    response = client.put(
+        f"{config.API_V1_PREFIX}/sensors/{sensor_id}",
+        json={
+            "serial_number": "12345",
+            "model": "XYZ",
+            "parameter_id": str(sensor.parameter_id),
+            "calibrations": calibrations,
+        },
+    )
+    assert response.status_code == 200
+    assert sensor_id not in calibration_indexes.indexes
+
+    async_session.expire_all()
+    indexes = await calibration_indexes.get_many(async_session, {sensor_id})
+    assert len(indexes[sensor_id]) == 2
@@ -1,3 +1,6 @@
+from app.stations.utils import calibrate_raw_values
+import numpy as np
+
 # from app.stations.utils import StationMeasurement
 # import pytest
 
@@ -58,7 +61,11 @@
 #             # Assert the conversion converts within a threshold of 1.0
 #             assert pytest.approx(conversion) == float(float(values["value"]))
 
-from app.utils import get_unix_time_from_str, extract_raw_values_from_str
+from app.utils import (
+    get_unix_time_from_str,
+    extract_raw_values_from_str,
+    decode_payloads,
+)
 import datetime
 
 
@@ -78,3 +85,78 @@ def test_extract_raw_values_from_str(
     data_string, expected_values, expected_time = data_message
 
     assert extract_raw_values_from_str(data_string) == expected_values
+
+
+def test_decode_payloads_reports_bad_rows(
+    data_message: tuple[str, list[int], datetime.datetime]
+):
+    """Test batch decoding with malformed payloads reported by index"""
+    data_string, expected_values, expected_time = data_message
+
+    decoded = decode_payloads(
+        [data_string, data_string[:-1], data_string.replace("9", "x"), ""]
+        + [data_string]
+    )
+
+    assert decoded.bad_rows.tolist() == [1, 2, 3]
+    assert decoded.values.dtype == np.uint16
+    assert decoded.values[0].tolist() == expected_values
+    assert decoded.values[4].tolist() == expected_values
+    assert decoded.timestamps[4] == expected_time.timestamp()
+
+
+def test_calibrate_raw_values_matches_reference_data(
+    sensor_data_6h: list[dict[str, str]],
+):
+    """The vectorised conversion reproduces the reference measurements"""
+
+    # The barometric pressure is compensated after its conversion
+    names = [
+        key
+        for key in sensor_data_6h[0]
+        if key not in ("Date", "BPhPa") and "_" not in key
+    ]
+
+    def column(prefix: str) -> np.ndarray:
+        return np.array(
+            [
+                [
+                    float(row[f"{prefix}_{name}" if prefix else name])
+                    for name in names
+                ]
+                for row in sensor_data_6h
+            ]
+        )
+
+    values = column("")
+    raw_values = column("Bytes")
+    min_range, max_range = column("Min"), column("Max")
+    output_range = column("OutputRange")
+
+    corrected, quality = calibrate_raw_values(
+        raw_values, 1.0, 0.0, min_range, max_range, output_range
+    )
+
+    assert corrected.shape == values.shape
+    assert quality.all()
+
+    # Raw values of zero are clipped by the logger, others are within a step
+    compared = ~np.isnan(values) & (raw_values > 0)
+    step = (max_range - min_range) / output_range
+    assert np.all(np.abs(corrected - values)[compared] <= step[compared])
+
+
+def test_calibrate_raw_values_flags_bad_quality():
+    """Out of range values and missing calibrations are masked"""
+
+    corrected, quality = calibrate_raw_values(
+        np.array([-1, 0, 2048, 4096, 5000, 100]),
+        slope=np.array([1, 1, 2, 1, 1, np.nan]),
+        intercept=np.array([0, 0, 1, 0, 0, np.nan]),
+        min_range=0,
+        max_range=np.array([10, 10, 10, 10, 10, np.nan]),
+    )
+
+    assert quality.tolist() == [False, True, True, True, False, False]
+    assert corrected[1:4].tolist() == [0.0, 11.0, 10.0]
+    assert np.isnan(corrected[~quality]).all()
@@ -1,6 +1,8 @@
 from fastapi import HTTPException
 import base64
 import datetime
+import numpy as np
+from typing import NamedTuple, Sequence
 
 from app.stations.models import Station
 from app.stations.data.models import (
@@ -39,6 +41,82 @@ def decode_base64(value: str) -> tuple[bytes, str]:
     return rawdata, type
 
 
+TIMESTAMP_LENGTH = 10  # Characters of the unix timestamp prefix
+VALUE_LENGTH = 4  # Characters of each raw value
+
+
+class DecodedPayloads(NamedTuple):
+    timestamps: np.ndarray  # int64 unix timestamps, one per payload
+    values: np.ndarray  # uint16 raw values, one row per payload
+    bad_rows: np.ndarray  # Indices of the payloads that could not be decoded
+
+
+def decode_payloads(
+    payloads: Sequence[str],
+    n_values: int | None = None,
+) -> DecodedPayloads:
+    """Decodes a batch of raw station payloads at once
+
+    Each payload is a 10 digit unix timestamp followed by blocks of four
+    digits, one per raw value. All payloads are parsed together as a single
+    byte buffer rather than slicing each string in Python.
+
+    Args:
+        payloads (Sequence[str]): The full strings given by the stations
+        n_values (int | None): The number of values expected per payload. By
+            default, the most common number of values in the batch
+
+    Returns:
+        DecodedPayloads: The timestamps and the (payloads x n_values) value
+        matrix, aligned with the input. Payloads with the wrong length or
+        non-digit characters are listed in bad_rows by index, and left as
+        zeros in the timestamps and values.
+    """
+
+    lengths = np.fromiter(map(len, payloads), dtype=np.int64, count=-1)
+    if n_values is None:
+        well_formed = lengths[
+            (lengths >= TIMESTAMP_LENGTH)
+            & ((lengths - TIMESTAMP_LENGTH) % VALUE_LENGTH == 0)
+        ]
+        if len(well_formed):
+            most_common = np.bincount(well_formed).argmax()
+            n_values = int(most_common - TIMESTAMP_LENGTH) // VALUE_LENGTH
+        else:
+            n_values = 0
+    width = TIMESTAMP_LENGTH + n_values * VALUE_LENGTH
+
+    timestamps = np.zeros(len(lengths), dtype=np.int64)
+    values = np.zeros((len(lengths), n_values), dtype=np.uint16)
+
+    valid = lengths == width
+    rows = np.flatnonzero(valid)
+    if len(rows):
+        # Non-ascii characters become "?", which fails the digit check below
+        buffer = "".join(payloads[i] for i in rows).encode(
+            "ascii", errors="replace"
+        )
+        digits = np.frombuffer(buffer, dtype=np.uint8)
+        digits = digits.reshape(len(rows), width).astype(np.int64)
+        digits -= ord("0")
+
+        is_digit = ((digits >= 0) & (digits <= 9)).all(axis=1)
+        valid[rows[~is_digit]] = False
+        rows, digits = rows[is_digit], digits[is_digit]
+
+        timestamps[rows] = digits[:, :TIMESTAMP_LENGTH] @ (
+            10 ** np.arange(TIMESTAMP_LENGTH - 1, -1, -1, dtype=np.int64)
+        )
+        values[rows] = (
+            digits[:, TIMESTAMP_LENGTH:].reshape(
+                len(rows), n_values, VALUE_LENGTH
+            )
+            @ (10 ** np.arange(VALUE_LENGTH - 1, -1, -1, dtype=np.int64))
+        ).astype(np.uint16)
+
+    return DecodedPayloads(timestamps, values, np.flatnonzero(~valid))
+
+
 def get_unix_time_from_str(input: str) -> datetime.datetime:
     """Takes the first 10 characters of a string and converts to unix timestamp
 
@@ -52,10 +130,12 @@ def get_unix_time_from_str(input: str) -> datetime.datetime:
         datetime.datetime: A datetime object
     """
 
-    cut_string = int(input[:10])
+    decoded = decode_payloads([input[:TIMESTAMP_LENGTH]], n_values=0)
+    if len(decoded.bad_rows):
+        raise ValueError(f"The string {input} does not start with a timestamp")
 
     return datetime.datetime.fromtimestamp(
-        cut_string, tz=datetime.timezone.utc
+        int(decoded.timestamps[0]), tz=datetime.timezone.utc
     )
 
 
@@ -73,16 +153,18 @@ def extract_raw_values_from_str(input: str) -> list[int]:
         list[int]: A list of split integers
     """
 
-    cut_string = input[10:]
+    cut_string = input[TIMESTAMP_LENGTH:]
 
-    if len(cut_string) % 4 != 0:
+    if len(cut_string) % VALUE_LENGTH != 0:
         raise ValueError(f"The string {cut_string} is not divisible by 4")
 
-    integer_list = []
-    for i in range(0, len(cut_string), 4):
-        integer_list.append(int(cut_string[i : i + 4]))
+    decoded = decode_payloads(
+        [input], n_values=len(cut_string) // VALUE_LENGTH
+    )
+    if len(decoded.bad_rows):
+        raise ValueError(f"The string {cut_string} is not only digits")
 
-    return integer_list
+    return decoded.values[0].tolist()
 
 
 async def parse_station_data(
@@ -7,10 +7,22 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from app.config import config as app_config
 from alembic import context
 from sqlmodel import SQLModel
-from app.stations.models import Station, StationSensorAssignments  # noqa
-from app.astrocast.models import AstrocastMessage  # noqa
+from app.stations.models import (  # noqa
+    Station,
+    StationSensorAssignments,
+    StationCurrentAssignment,
+)
+from app.astrocast.models import (  # noqa
+    AstrocastMessage,
+    AstrocastIngestCheckpoint,
+    AstrocastDevice,
+)
 from app.sensors.models import Sensor  # noqa
-from app.stations.data.models import StationData, ControlMessage  # noqa
+from app.stations.data.models import (  # noqa
+    StationData,
+    ControlMessage,
+    UndecodedMessage,
+)
 from app.sensor_parameters.models import SensorParameter  # noqa
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,55 @@
+"""Add trigram search indexes
+
+Revision ID: 3b8e61f0d2c4
+Revises: a4d9e3b17c60
+Create Date: 2026-10-18 16:42:11.503927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e61f0d2c4'
+down_revision: Union[str, None] = 'a4d9e3b17c60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The searchable text columns, served by GIN indexes of their trigrams
+SEARCHABLE_COLUMNS = [
+    ('station', 'name'),
+    ('station', 'acronym'),
+    ('station', 'catchment_name'),
+    ('sensor', 'serial_number'),
+    ('sensor', 'model'),
+    ('sensor', 'field_id'),
+    ('sensorparameter', 'name'),
+    ('sensorparameter', 'acronym'),
+    ('astrocastdevice', 'name'),
+    ('astrocastdevice', 'serialNumber'),
+]
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table_name, column_name in SEARCHABLE_COLUMNS:
+        op.create_index(
+            f'ix_{table_name}_{column_name}_trgm',
+            table_name,
+            [column_name],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column_name: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    # The pg_trgm extension is left installed, other objects may use it
+    for table_name, column_name in reversed(SEARCHABLE_COLUMNS):
+        op.drop_index(
+            f'ix_{table_name}_{column_name}_trgm',
+            table_name=table_name,
+        )